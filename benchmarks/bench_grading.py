@@ -0,0 +1,186 @@
+"""Benchmark grading throughput, latency and memory across roster sizes.
+
+Each case runs in a fresh worker process so its peak RSS is its own. Results
+are written as JSON; ``--compare`` checks them against a stored baseline and
+exits non-zero when a case regresses.
+
+    python benchmarks/bench_grading.py --output bench.json
+    python benchmarks/bench_grading.py --sizes 1 1000 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grade_calculator import GradeCalculator  # noqa: E402
+
+SIZES = [1, 1000, 100000, 1000000]
+TARGETS = [70, 80, 90]
+CASES = [
+    'calculate_grade',
+    'calculate_needed_grades',
+    'calculate_grades_batch',
+    'calculate_needed_grades_batch'
+]
+
+
+def make_roster(calc, n_students, missing_rate=0.05, seed=0):
+    """Generate a synthetic roster in the ``calculate_grades_batch`` layout.
+
+    Each student is somewhere in the term: assignments past their progress
+    point are not entered yet, and ``missing_rate`` of the rest are missing
+    at random (late or unsubmitted work).
+    """
+    rng = np.random.default_rng(seed)
+    progress = rng.uniform(0.2, 1.0, n_students)
+    roster = {}
+    for category, count in list(calc.assignment_counts.items()) + [('extra_credit', 1)]:
+        cap = calc.max_scores[category]
+        scores = np.clip(rng.normal(0.78 * min(cap, 100), 12, (n_students, count)), 0, cap)
+        due = (np.arange(count) + 1) / count <= progress[:, np.newaxis]
+        missing = ~due | (rng.random((n_students, count)) < missing_rate)
+        roster[category] = np.where(missing, np.nan, np.round(scores, 1))
+    roster['attendance'] = rng.integers(0, 6, n_students).astype(float)
+    return roster
+
+
+def iter_students(roster, limit=None):
+    """Yield per-student grade dicts (``None`` for missing) from a roster."""
+    n = len(roster['attendance'])
+    for row in range(n if limit is None else min(n, limit)):
+        grades = {}
+        for category, scores in roster.items():
+            if category == 'attendance':
+                grades[category] = int(scores[row])
+            else:
+                grades[category] = [None if np.isnan(g) else float(g) for g in scores[row]]
+        yield grades
+
+
+def _percentile(timings, q):
+    return float(np.percentile(timings, q)) if len(timings) else float('nan')
+
+
+def run_case(case, n_students, missing_rate=0.05, seed=0, repeats=5):
+    """Time one case; returns a JSON-ready result dict."""
+    calc = GradeCalculator()
+    roster = make_roster(calc, n_students, missing_rate, seed)
+    timings = []
+
+    if case in ('calculate_grade', 'calculate_needed_grades'):
+        if case == 'calculate_grade':
+            func = calc.calculate_grade
+        else:
+            def func(grades):
+                for target in TARGETS:
+                    calc.calculate_needed_grades(grades, target)
+        for grades in iter_students(roster):
+            start = time.perf_counter_ns()
+            func(grades)
+            timings.append(time.perf_counter_ns() - start)
+        students_timed = n_students
+    else:
+        if case == 'calculate_grades_batch':
+            func = lambda: calc.calculate_grades_batch(roster)
+        else:
+            func = lambda: calc.calculate_needed_grades_batch(roster, TARGETS)
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            func()
+            timings.append(time.perf_counter_ns() - start)
+        students_timed = n_students * repeats
+
+    total_seconds = sum(timings) / 1e9
+    return {
+        'case': case,
+        'students': n_students,
+        'calls': len(timings),
+        'throughput': students_timed / total_seconds if total_seconds else float('inf'),
+        'p50_us': _percentile(timings, 50) / 1000,
+        'p99_us': _percentile(timings, 99) / 1000,
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss /
+                       (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    }
+
+
+def run_suite(sizes, cases, missing_rate=0.05, seed=0):
+    results = []
+    context = get_context('spawn')
+    for n_students in sizes:
+        for case in cases:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_case, case, n_students, missing_rate, seed).result()
+            print(f"{case:32s} {n_students:>9,d} students  {result['throughput']:>14,.0f}/s  "
+                  f"p50 {result['p50_us']:>10.1f}us  p99 {result['p99_us']:>10.1f}us  "
+                  f"rss {result['peak_rss_mb']:.0f}MB", file=sys.stderr)
+            results.append(result)
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'missing_rate': missing_rate,
+            'seed': seed
+        },
+        'results': results
+    }
+
+
+def compare(current, baseline, threshold=0.1):
+    """Return regressions where throughput fell or p99 latency rose by more than ``threshold``."""
+    previous = {(r['case'], r['students']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = previous.get((result['case'], result['students']))
+        if old is None:
+            continue
+        if result['throughput'] < old['throughput'] * (1 - threshold):
+            regressions.append((result, 'throughput', old['throughput'], result['throughput']))
+        if result['p99_us'] > old['p99_us'] * (1 + threshold):
+            regressions.append((result, 'p99_us', old['p99_us'], result['p99_us']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES)
+    parser.add_argument('--missing-rate', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results JSON here (default: stdout)")
+    parser.add_argument('--compare', metavar='BASELINE', help="flag regressions against a stored results JSON")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="relative change that counts as a regression (default: 0.1)")
+    args = parser.parse_args()
+
+    report = run_suite(args.sizes, args.cases, args.missing_rate, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for result, metric, old, new in regressions:
+            print(f"REGRESSION {result['case']} @ {result['students']:,d}: {metric} {old:,.1f} -> {new:,.1f}",
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Load-test the grading HTTP service.
+
+Sends requests from a pool of threads, each reusing one keep-alive
+connection, and reports requests/sec and latency percentiles as JSON. With
+``--serve`` the Flask dev server from ``service.py`` is started in-process on
+a free port first.
+
+    python service.py &
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --endpoint grade
+    python benchmarks/load_test.py --serve --endpoint bulk --bulk-size 1000
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def random_grades(rng):
+    grades = {}
+    for category, count, cap in [('homeworks', 5, 130), ('quizzes', 4, 100), ('projects', 4, 130), ('exams', 2, 100)]:
+        grades[category] = [round(rng.uniform(40, cap), 1) for _ in range(rng.randint(0, count))]
+    grades['extra_credit'] = [round(rng.uniform(0, 100), 1)]
+    grades['attendance'] = rng.randint(0, 5)
+    return grades
+
+
+def make_body(endpoint, rng, bulk_size, distinct):
+    """Build one request; ``distinct`` bounds the payload variety so the cache can hit."""
+    rng = random.Random(rng.randrange(distinct))
+    if endpoint == 'grade':
+        return '/grade', {'grades': random_grades(rng)}
+    if endpoint == 'needed':
+        return '/needed', {'grades': random_grades(rng), 'targets': [70, 80, 90]}
+    return '/grade/bulk', [{'id': i, 'grades': random_grades(rng)} for i in range(bulk_size)]
+
+
+def worker(url, endpoint, n_requests, bulk_size, distinct, seed, latencies, errors):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    for _ in range(n_requests):
+        path, payload = make_body(endpoint, rng, bulk_size, distinct)
+        body = json.dumps(payload)
+        start = time.perf_counter()
+        try:
+            conn.request('POST', path, body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as error:
+            errors.append(str(error))
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def serve_in_background():
+    from werkzeug.serving import make_server
+
+    from service import create_app
+
+    server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--serve', action='store_true', help="start the dev server in-process")
+    parser.add_argument('--endpoint', choices=['grade', 'needed', 'bulk'], default='grade')
+    parser.add_argument('--requests', type=int, default=2000, help="total requests across all threads")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--bulk-size', type=int, default=1000, help="students per bulk request")
+    parser.add_argument('--distinct', type=int, default=1000000,
+                        help="number of distinct payloads (lower it to exercise the response cache)")
+    args = parser.parse_args()
+
+    url = serve_in_background() if args.serve else args.url
+    parsed = urlparse(url)
+    latencies, errors = [], []
+    per_thread = max(1, args.requests // args.concurrency)
+    threads = [threading.Thread(target=worker, args=(parsed, args.endpoint, per_thread, args.bulk_size,
+                                                     args.distinct, seed, latencies, errors))
+               for seed in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    report = {
+        'url': url,
+        'endpoint': args.endpoint,
+        'concurrency': args.concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else None,
+        'p95_ms': float(np.percentile(latencies_ms, 95)) if len(latencies_ms) else None,
+        'p99_ms': float(np.percentile(latencies_ms, 99)) if len(latencies_ms) else None
+    }
+    if args.endpoint == 'bulk':
+        report['students_per_second'] = report['requests_per_second'] * args.bulk_size
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Measure per-interaction server time of the Streamlit app.
+
+Drives ``streamlit_app.py`` (or another revision of it passed with
+``--script``) through Streamlit's ``AppTest`` harness, changing one grade
+input per interaction, and reports script-run latency in milliseconds.
+
+``AppTest`` always reruns the whole script, so ``--fragment`` instead runs a
+stand-in script containing only the exam input fragment and the results
+placeholder, which is the work a fragment-scoped rerun does in the browser.
+
+    python benchmarks/streamlit_rerun.py --interactions 200
+    python benchmarks/streamlit_rerun.py --fragment
+    git show <rev>:streamlit_app.py > /tmp/old_app.py
+    python benchmarks/streamlit_rerun.py --script /tmp/old_app.py
+
+``--roster DB`` instead opens the instructor roster view on ``--course`` in
+that gradebook and reports page-change latency and two first-render times:
+``grid_first_render_ms`` runs a stand-in script with only the roster grid,
+which is when the page appears, and ``first_render_ms`` the whole script,
+which then computes the class statistics and grades every student whose
+cached final grade is stale. ``--cold`` clears the course's cache first.
+
+    python benchmarks/streamlit_rerun.py --roster grades.db --course CS101
+    python benchmarks/streamlit_rerun.py --roster grades.db --course CS101 --cold
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INPUT_KEYS = ['hw_3', 'hw_4', 'quiz_2', 'quiz_3', 'proj_2', 'proj_3', 'exam_0', 'exam_1', 'ec']
+FRAGMENT_KEYS = ['exam_0', 'exam_1']
+
+FRAGMENT_SCRIPT = f"""
+import sys
+sys.path.insert(0, {ROOT!r})
+import streamlit as st
+import streamlit_app as app
+
+calc = app.get_calculator()
+if 'grades' not in st.session_state:
+    st.session_state.grades = {{
+        'homeworks': [89.0, 83.0, 62.0, None, None],
+        'quizzes': [40.0, 62.0, None, None],
+        'projects': [120.0, 127.0, None, None],
+        'exams': [None, None],
+        'extra_credit': [0],
+        'attendance': 0
+    }}
+results = st.empty()
+st.session_state.results_drawn = False
+app.category_inputs(calc, results, 'exams')
+if not st.session_state.results_drawn:
+    app.render_results(calc, results)
+"""
+
+ROSTER_GRID_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import streamlit as st
+import streamlit_app as app
+
+store = app.get_store({db!r})
+app.roster_grid(app.get_calculator(), {db!r}, {course!r}, store.count({course!r}), st.empty())
+"""
+
+
+def measure(script, interactions, keys=INPUT_KEYS, seed=0):
+    rng = random.Random(seed)
+    app = AppTest.from_file(script, default_timeout=60).run()
+    timings = []
+    for _ in range(interactions):
+        widget = app.number_input(key=rng.choice(keys))
+        widget.set_value(float(rng.randint(1, 100)))
+        start = time.perf_counter()
+        app.run()
+        timings.append((time.perf_counter() - start) * 1000)
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+    timings.sort()
+    return {
+        'script': script,
+        'interactions': interactions,
+        'mean_ms': statistics.fmean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p99_ms': timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    }
+
+
+def clear_final_grades(db, course):
+    """Mark every cached final grade in ``course`` stale; returns how many were cleared."""
+    with sqlite3.connect(db) as conn:
+        return conn.execute(
+            'UPDATE enrollments SET final_grade = NULL '
+            'WHERE course_id = (SELECT id FROM courses WHERE code = ?)', (course,)
+        ).rowcount
+
+
+def stale_count(db, course):
+    with sqlite3.connect(db) as conn:
+        return conn.execute(
+            'SELECT COUNT(*) FROM enrollments e JOIN courses c ON c.id = e.course_id '
+            'WHERE c.code = ? AND e.final_grade IS NULL', (course,)
+        ).fetchone()[0]
+
+
+def measure_grid(db, course):
+    """Milliseconds until the roster grid is drawn in a fresh session."""
+    sys.path.insert(0, ROOT)
+    import streamlit_app  # noqa: F401 (importing is not part of a render)
+
+    app = AppTest.from_string(ROSTER_GRID_SCRIPT.format(root=ROOT, db=db, course=course), default_timeout=60)
+    start = time.perf_counter()
+    app.run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return elapsed
+
+
+def measure_roster(script, db, course, interactions, seed=0, cold=False):
+    rng = random.Random(seed)
+    if cold:
+        clear_final_grades(db, course)
+    stale = stale_count(db, course)
+    os.environ['GRADE_DB'] = db
+    app = AppTest.from_file(script, default_timeout=60).run()
+    # The first grid in a process also pays for one-off imports
+    measure_grid(db, course)
+    if cold:
+        clear_final_grades(db, course)
+    grid_first_render = measure_grid(db, course)
+    if cold:
+        clear_final_grades(db, course)
+    app.sidebar.radio(key='view').set_value("Instructor roster")
+    app.sidebar.text_input(key='store_course').set_value(course)
+    start = time.perf_counter()
+    app.run()
+    first_render = (time.perf_counter() - start) * 1000
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    pages = int(app.number_input(key='roster_page_number').max)
+    timings = []
+    for _ in range(interactions):
+        app.number_input(key='roster_page_number').set_value(rng.randint(1, pages))
+        start = time.perf_counter()
+        app.run()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'script': script,
+        'course': course,
+        'pages': pages,
+        'stale_at_start': stale,
+        'grid_first_render_ms': grid_first_render,
+        'first_render_ms': first_render,
+        'page_p50_ms': timings[len(timings) // 2],
+        'page_p99_ms': timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--script', default=os.path.join(ROOT, 'streamlit_app.py'))
+    parser.add_argument('--fragment', action='store_true',
+                        help="time a fragment-scoped rerun of the exam inputs instead of a full rerun")
+    parser.add_argument('--interactions', type=int, default=100)
+    parser.add_argument('--roster', metavar='DB', help="time the instructor roster view on this gradebook")
+    parser.add_argument('--course', default='default', help="course for --roster (default: default)")
+    parser.add_argument('--cold', action='store_true',
+                        help="clear the course's cached final grades before timing --roster")
+    args = parser.parse_args()
+
+    if args.roster:
+        print(json.dumps(measure_roster(args.script, args.roster, args.course, args.interactions,
+                                        cold=args.cold), indent=2))
+        return
+
+    if not args.fragment:
+        print(json.dumps(measure(args.script, args.interactions), indent=2))
+        return
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+        f.write(FRAGMENT_SCRIPT)
+    try:
+        print(json.dumps(measure(f.name, args.interactions, FRAGMENT_KEYS), indent=2))
+    finally:
+        os.unlink(f.name)
+
+
+if __name__ == '__main__':
+    main()
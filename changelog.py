@@ -0,0 +1,255 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from grade_calculator import GradeCalculator
+from gradebook import Gradebook
+
+# One fixed-width little-endian record per edit. ``slot`` indexes the
+# gradebook layout; ABSENCES_SLOT marks an attendance change. A NaN value
+# clears the score.
+EVENT_DTYPE = np.dtype([('time', '<f8'), ('student', '<u4'), ('slot', '<u2'), ('value', '<f4')])
+ABSENCES_SLOT = 0xFFFF
+
+
+class ChangeLog:
+    """Append-only log of score edits with periodic snapshots, for grades as of any time.
+
+    Lives in ``directory``: ``events.bin`` holds ``EVENT_DTYPE`` records in
+    time order, ``students.txt`` maps record student numbers to ids (one per
+    line), and ``snapshots/`` holds ``Gradebook`` snapshots with their
+    computed final grades. Edits are buffered and written on ``flush()``;
+    ``fsync`` runs once every ``fsync_every`` events rather than per edit.
+    ``state_at(t)`` memory-maps the newest snapshot taken at or before ``t``
+    and replays only the events after it, vectorized, keeping the last edit
+    per slot.
+    """
+
+    def __init__(self, directory, calc=None, fsync_every=1000, snapshot_every=100000):
+        self.calc = calc or GradeCalculator()
+        self.directory = directory
+        self.fsync_every = fsync_every
+        self.snapshot_every = snapshot_every
+        empty = Gradebook.empty(self.calc, 0)
+        self.layout, self.slices, self.n_slots = empty.layout, empty.slices, empty.n_slots
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(directory, 'snapshots'), exist_ok=True)
+
+        meta_path = os.path.join(directory, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if [tuple(item) for item in json.load(f)['layout']] != self.layout:
+                    raise ValueError(f"{directory} was written with a different assignment layout")
+        else:
+            with open(meta_path, 'w') as f:
+                json.dump({'layout': self.layout}, f)
+
+        students_path = os.path.join(directory, 'students.txt')
+        self.students = []
+        if os.path.exists(students_path):
+            with open(students_path) as f:
+                self.students = [line.rstrip('\n') for line in f]
+        self.student_index = {student: i for i, student in enumerate(self.students)}
+
+        # Drop a record left half-written by a crash
+        events_path = os.path.join(directory, 'events.bin')
+        size = os.path.getsize(events_path) if os.path.exists(events_path) else 0
+        self.n_events = size // EVENT_DTYPE.itemsize
+        self.events_file = open(events_path, 'ab')
+        self.events_file.truncate(self.n_events * EVENT_DTYPE.itemsize)
+        self.students_file = open(students_path, 'a')
+        self.last_time = float(np.fromfile(events_path, dtype=EVENT_DTYPE, count=1,
+                                           offset=(self.n_events - 1) * EVENT_DTYPE.itemsize)['time'][0]) \
+            if self.n_events else 0.0
+
+        self.pending = []
+        self.unsynced = 0
+        self.snapshots = self._read_snapshots()
+
+    def _read_snapshots(self):
+        """``(events, time, path)`` for every snapshot, oldest first."""
+        snapshots = []
+        folder = os.path.join(self.directory, 'snapshots')
+        for name in os.listdir(folder):
+            if name.endswith('.json'):
+                with open(os.path.join(folder, name)) as f:
+                    meta = json.load(f)
+                if meta['events'] <= self.n_events:
+                    snapshots.append((meta['events'], meta['time'], os.path.join(folder, name[:-5])))
+        return sorted(snapshots)
+
+    def close(self):
+        self.flush(sync=True)
+        self.events_file.close()
+        self.students_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _student(self, student):
+        student = str(student)
+        index = self.student_index.get(student)
+        if index is None:
+            if '\n' in student:
+                raise ValueError("Student ids cannot contain newlines")
+            index = self.student_index[student] = len(self.students)
+            self.students.append(student)
+            self.students_file.write(student + '\n')
+        return index
+
+    def _append(self, at, student, slot, value):
+        at = time.time() if at is None else float(at)
+        with self.lock:
+            if at < self.last_time:
+                raise ValueError("Events must be recorded in time order")
+            self.last_time = at
+            self.pending.append((at, self._student(student), slot, np.nan if value is None else value))
+            full = len(self.pending) >= self.fsync_every
+        if full:
+            self.flush()
+
+    def record_score(self, student, category, index, score, at=None):
+        """Log one score edit; ``None`` clears the score."""
+        s = self.slices.get(category)
+        if s is None or not 0 <= index < s.stop - s.start:
+            raise ValueError(f"No slot {index} in category '{category}'")
+        self._append(at, student, s.start + index, score)
+
+    def record_absences(self, student, absences, at=None):
+        self._append(at, student, ABSENCES_SLOT, absences)
+
+    def record_grades(self, student, grades, at=None):
+        """Log every slot of a grades dict (as ``GradeStore.save_grades`` writes it)."""
+        at = time.time() if at is None else at
+        for category, values in grades.items():
+            if category == 'attendance':
+                self.record_absences(student, values, at)
+                continue
+            for index, score in enumerate(values or []):
+                self.record_score(student, category, index, score, at)
+
+    def flush(self, sync=False):
+        """Write buffered events; fsync if ``sync`` or ``fsync_every`` events are unsynced.
+
+        Takes a snapshot once ``snapshot_every`` events have accumulated since the last one.
+        """
+        self._write(sync)
+        since_snapshot = self.n_events - (self.snapshots[-1][0] if self.snapshots else 0)
+        if self.snapshot_every and since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def _write(self, sync):
+        with self.lock:
+            if self.pending:
+                # Student ids first, so no record points at an unknown student
+                self.students_file.flush()
+                self.events_file.write(np.array(self.pending, dtype=EVENT_DTYPE).tobytes())
+                self.events_file.flush()
+                self.n_events += len(self.pending)
+                self.unsynced += len(self.pending)
+                self.pending = []
+            if self.unsynced and (sync or self.unsynced >= self.fsync_every):
+                os.fsync(self.students_file.fileno())
+                os.fsync(self.events_file.fileno())
+                self.unsynced = 0
+
+    def snapshot(self):
+        """Save the current state and its final grades so later replays start from here."""
+        self._write(sync=True)
+        book, final_grades, _ = self._replay(np.inf)
+        base = os.path.join(self.directory, 'snapshots', f'{self.n_events:012d}')
+        book.save(base + '.grdbook')
+        np.save(base + '.npy', final_grades)
+        # The metadata goes last: a snapshot without it is ignored
+        with open(base + '.json', 'w') as f:
+            json.dump({'events': self.n_events, 'time': self.last_time}, f)
+        self.snapshots.append((self.n_events, self.last_time, base))
+        return base
+
+    def _base(self, at):
+        """The newest snapshot taken at or before ``at`` as ``(events, path)``, or ``None``."""
+        base = None
+        for events, snapshot_time, path in self.snapshots:
+            if snapshot_time <= at:
+                base = (events, path)
+        return base
+
+    def _tail(self, start, at):
+        """Events from number ``start`` on, up to and including time ``at``."""
+        tail = np.fromfile(os.path.join(self.directory, 'events.bin'), dtype=EVENT_DTYPE,
+                           offset=start * EVENT_DTYPE.itemsize)
+        return tail[:np.searchsorted(tail['time'], at, side='right')]
+
+    def state_at(self, at=None):
+        """Reconstruct ``(gradebook, final_grades, ids)`` for every student as of time ``at``.
+
+        ``at=None`` means now. Students without events by then are left out.
+        """
+        self.flush()
+        return self._replay(np.inf if at is None else float(at))
+
+    def _replay(self, at):
+        base = self._base(at)
+        tail = self._tail(base[0] if base else 0, at)
+        if base and not len(tail):
+            # Nothing to replay: the snapshot's stored grades are current
+            book = Gradebook.load(base[1] + '.grdbook')
+            final_grades = np.load(base[1] + '.npy')
+            return book, final_grades, self.students[:len(book)]
+
+        snapshot = Gradebook.load(base[1] + '.grdbook') if base else None
+        n_students = max(len(snapshot) if snapshot else 0, int(tail['student'].max()) + 1 if len(tail) else 0)
+        scores = np.full((n_students, self.n_slots), np.nan, dtype=np.float32)
+        absences = np.zeros(n_students, dtype=np.int8)
+        if snapshot:
+            scores[:len(snapshot)] = snapshot.scores
+            absences[:len(snapshot)] = snapshot.absences
+        self._apply(tail, scores, absences, tail['student'])
+
+        book = Gradebook(self.layout, scores, np.packbits(np.isnan(scores), axis=1), absences)
+        final_grades, _ = self.calc.calculate_grades_batch(book.roster())
+        return book, final_grades, self.students[:n_students]
+
+    def _apply(self, events, scores, absences, rows):
+        """Apply ``events`` to row ``rows[i]`` of the arrays, keeping the last edit per slot."""
+        keys = events['student'].astype(np.int64) * (self.n_slots + 1) + \
+            np.minimum(events['slot'], self.n_slots)
+        _, last = np.unique(keys[::-1], return_index=True)
+        last = len(events) - 1 - last
+        edits, rows = events[last], rows[last]
+        is_absences = edits['slot'] == ABSENCES_SLOT
+        scores[rows[~is_absences], edits['slot'][~is_absences]] = edits['value'][~is_absences]
+        absences[rows[is_absences]] = edits['value'][is_absences]
+
+    def grades_at(self, student, at=None):
+        """One student's ``(grades, final_grade)`` as of ``at``, or ``None`` if unknown then.
+
+        Reads only that student's snapshot row and their events in the tail.
+        """
+        self.flush()
+        at = np.inf if at is None else float(at)
+        row = self.student_index.get(str(student))
+        if row is None:
+            return None
+        base = self._base(at)
+        tail = self._tail(base[0] if base else 0, at)
+        tail = tail[tail['student'] == row]
+        snapshot = Gradebook.load(base[1] + '.grdbook') if base else None
+        if not len(tail) and (snapshot is None or row >= len(snapshot)):
+            return None
+
+        scores = np.full((1, self.n_slots), np.nan, dtype=np.float32)
+        absences = np.zeros(1, dtype=np.int8)
+        if snapshot is not None and row < len(snapshot):
+            scores[0] = snapshot.scores[row]
+            absences[0] = snapshot.absences[row]
+        self._apply(tail, scores, absences, np.zeros(len(tail), dtype=np.int64))
+        book = Gradebook(self.layout, scores, np.packbits(np.isnan(scores), axis=1), absences)
+        grades = book.to_grades(0)
+        return grades, self.calc.calculate_grade(grades)[0]
@@ -0,0 +1,240 @@
+from bisect import bisect_right
+
+import numpy as np
+
+from grade_calculator import GradeCalculator
+from policy import load_policy
+
+# (minimum percentage, letter, grade points), highest first
+DEFAULT_SCALE = (
+    (93, 'A', 4.0),
+    (90, 'A-', 3.7),
+    (87, 'B+', 3.3),
+    (83, 'B', 3.0),
+    (80, 'B-', 2.7),
+    (77, 'C+', 2.3),
+    (73, 'C', 2.0),
+    (70, 'C-', 1.7),
+    (67, 'D+', 1.3),
+    (63, 'D', 1.0),
+    (60, 'D-', 0.7),
+    (0, 'F', 0.0)
+)
+
+
+def letter_grades(percentages, scale=DEFAULT_SCALE):
+    """Map final percentages to ``(letters, points)`` arrays with one ``searchsorted``."""
+    bounds = np.array([bound for bound, _, _ in reversed(scale)], dtype=float)
+    letters = np.array([letter for _, letter, _ in reversed(scale)])
+    points = np.array([p for _, _, p in reversed(scale)], dtype=float)
+    index = np.searchsorted(bounds, np.asarray(percentages, dtype=float), side='right') - 1
+    index = np.maximum(index, 0)
+    return letters[index], points[index]
+
+
+class Course:
+    def __init__(self, code, credits, calc=None, scale=DEFAULT_SCALE):
+        if credits < 0:
+            raise ValueError(f"Credit hours for {code} cannot be negative")
+        self.code = code
+        self.credits = float(credits)
+        self.calc = calc or GradeCalculator()
+        self.scale = scale
+        self._bounds = [bound for bound, _, _ in reversed(scale)]
+
+    def letter(self, percentage):
+        """``(letter, points)`` for one percentage."""
+        _, letter, points = self.scale[-max(bisect_right(self._bounds, percentage), 1)]
+        return letter, points
+
+
+class Catalog:
+    """Courses with their credit hours, grading policies and letter scales.
+
+    Courses sharing a policy share its compiled plan, so a catalog of
+    hundreds of courses costs one plan per distinct syllabus.
+    """
+
+    def __init__(self):
+        self.courses = {}
+
+    def add(self, code, credits, policy=None, scale=DEFAULT_SCALE):
+        """Add a course; ``policy`` is a policy dict or the path of a policy file."""
+        if isinstance(policy, str):
+            policy = load_policy(policy)
+        self.courses[code] = Course(code, credits, GradeCalculator(policy), scale)
+        return self.courses[code]
+
+    def __getitem__(self, code):
+        if code not in self.courses:
+            raise ValueError(f"Unknown course: {code}")
+        return self.courses[code]
+
+    def __contains__(self, code):
+        return code in self.courses
+
+
+class Transcripts:
+    """Course results for many students across ordered terms, with term and cumulative GPA.
+
+    Each (student, term, course) result is one row of flat column arrays
+    (student index, term index, credits, grade points). Term GPAs come from
+    ``np.bincount`` over ``student * n_terms + term`` group ids, giving
+    (students, terms) quality-point and credit matrices; cumulative GPA is a
+    ``cumsum`` along the term axis. Changing one result moves its quality
+    points and credits in those matrices by a delta, so it costs O(1) plus
+    O(terms) to read that student's cumulative GPA back.
+    """
+
+    def __init__(self, catalog, terms):
+        self.catalog = catalog
+        self.terms = list(terms)
+        self.term_index = {term: i for i, term in enumerate(self.terms)}
+        self.student_index = {}
+        self.students = []
+        self.rows = {}
+        self.size = 0
+        self.student = np.zeros(1024, dtype=np.int64)
+        self.term = np.zeros(1024, dtype=np.int64)
+        self.credits = np.zeros(1024)
+        self.points = np.zeros(1024)
+        self.percentage = np.zeros(1024)
+        self.letters = np.empty(1024, dtype=object)
+        self.quality = np.zeros((0, len(self.terms)))
+        self.attempted = np.zeros((0, len(self.terms)))
+
+    def _term(self, term):
+        if term not in self.term_index:
+            raise ValueError(f"Unknown term: {term}")
+        return self.term_index[term]
+
+    def _student(self, student):
+        student = str(student)
+        index = self.student_index.get(student)
+        if index is None:
+            index = self.student_index[student] = len(self.students)
+            self.students.append(student)
+        return index
+
+    def _reserve(self, n):
+        """Grow the row arrays (by doubling) to fit ``n`` more rows."""
+        capacity = len(self.student)
+        if self.size + n > capacity:
+            capacity = max(capacity * 2, self.size + n)
+            for name in ('student', 'term', 'credits', 'points', 'percentage', 'letters'):
+                column = getattr(self, name)
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+
+    def _grow_students(self):
+        if len(self.students) > len(self.quality):
+            extra = max(len(self.students) - len(self.quality), len(self.quality))
+            padding = np.zeros((extra, len(self.terms)))
+            self.quality = np.vstack([self.quality, padding])
+            self.attempted = np.vstack([self.attempted, padding])
+
+    def add_results(self, results):
+        """Record many ``(student, term, course, percentage)`` results at once.
+
+        Percentages are converted to letters per course scale in one
+        vectorized call per course, and the GPA matrices are rebuilt with a
+        grouped reduction. A result for an existing (student, term, course)
+        replaces it.
+        """
+        by_course = {}
+        for student, term, course, percentage in results:
+            by_course.setdefault(course, []).append((student, term, percentage))
+        # Check every term and course before recording anything, so a bad
+        # result leaves the transcripts unchanged.
+        courses = {code: self.catalog[code] for code in by_course}
+        for entries in by_course.values():
+            for _, term, _ in entries:
+                self._term(term)
+
+        for code, entries in by_course.items():
+            course = courses[code]
+            letters, points = letter_grades([p for _, _, p in entries], course.scale)
+            for (student, term, percentage), letter, point in zip(entries, letters, points):
+                key = (str(student), term, code)
+                row = self.rows.get(key)
+                if row is None:
+                    self._reserve(1)
+                    row = self.rows[key] = self.size
+                    self.size += 1
+                    self.student[row] = self._student(student)
+                    self.term[row] = self.term_index[term]
+                    self.credits[row] = course.credits
+                self.percentage[row] = percentage
+                self.points[row] = point
+                self.letters[row] = letter
+        self.recompute()
+
+    def grade_course(self, term, code, students):
+        """Grade a course section from ``(student, grades)`` pairs and record the results."""
+        course = self.catalog[code]
+        final_grades, _ = course.calc.calculate_grades_batch(
+            course.calc.roster_from_grades([grades for _, grades in students])
+        )
+        self.add_results((student, term, code, grade)
+                         for (student, _), grade in zip(students, final_grades))
+        return final_grades
+
+    def recompute(self):
+        """Rebuild the (students, terms) matrices from the row arrays."""
+        n_students, n_terms = len(self.students), len(self.terms)
+        group = self.student[:self.size] * n_terms + self.term[:self.size]
+        credits = self.credits[:self.size]
+        self.quality = np.bincount(group, weights=credits * self.points[:self.size],
+                                   minlength=n_students * n_terms).reshape(n_students, n_terms)
+        self.attempted = np.bincount(group, weights=credits,
+                                     minlength=n_students * n_terms).reshape(n_students, n_terms)
+
+    def set_result(self, student, term, code, percentage):
+        """Record or change one course result, updating the GPA matrices by a delta."""
+        course = self.catalog[code]
+        t = self._term(term)
+        key = (str(student), term, code)
+        row = self.rows.get(key)
+        letter, points = course.letter(percentage)
+        if row is None:
+            self._reserve(1)
+            row = self.rows[key] = self.size
+            self.size += 1
+            self.student[row] = self._student(student)
+            self.term[row] = t
+            self.credits[row] = course.credits
+            self.points[row] = 0.0
+            self._grow_students()
+            self.attempted[self.student[row], self.term[row]] += course.credits
+        s, t = self.student[row], self.term[row]
+        self.quality[s, t] += self.credits[row] * (points - self.points[row])
+        self.percentage[row] = percentage
+        self.points[row] = points
+        self.letters[row] = letter
+
+    def term_gpa(self):
+        """(students, terms) GPA matrix; NaN where a student took no credits that term."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.quality[:len(self.students)] / self.attempted[:len(self.students)]
+
+    def cumulative_gpa(self):
+        """(students, terms) cumulative GPA through each term."""
+        quality = np.cumsum(self.quality[:len(self.students)], axis=1)
+        attempted = np.cumsum(self.attempted[:len(self.students)], axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return quality / attempted
+
+    def student_gpa(self, student):
+        """``{'term': {term: gpa}, 'cumulative': {term: gpa}}`` for one student, in O(terms)."""
+        s = self.student_index.get(str(student))
+        if s is None:
+            raise ValueError(f"Unknown student: {student}")
+        quality, attempted = self.quality[s], self.attempted[s]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            term = quality / attempted
+            cumulative = np.cumsum(quality) / np.cumsum(attempted)
+        return {
+            'term': dict(zip(self.terms, term.tolist())),
+            'cumulative': dict(zip(self.terms, cumulative.tolist()))
+        }
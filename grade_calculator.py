@@ -1,20 +1,33 @@
+import argparse
+import cProfile
+import sys
+
+import numpy as np
+
+from instrumentation import instrument, sink_from_name
+from needed import needed_table
+from policy import compile_policy, load_policy
+from sensitivity import leverage_report
+
+
 class GradeCalculator:
-    def __init__(self):
-        self.weights = {
-            'homeworks': 0.15,
-            'quizzes': 0.15,
-            'projects': 0.20,
-            'exams': 0.50,
-            'extra_credit': 0.07,
-            'attendance': -0.05
-        }
-        self.assignment_counts = {
-            'homeworks': 5,  
-            'quizzes': 4,
-            'projects': 4,
-            'exams': 2
-        }
-        
+    def __init__(self, policy=None):
+        # Weights, counts and caps come from a compiled policy shared by every
+        # calculator built from the same configuration
+        self.plan = compile_policy(policy)
+        self.weights = self.plan.weights
+        self.assignment_counts = self.plan.assignment_counts
+        self.max_scores = self.plan.max_scores
+
+    @classmethod
+    def from_file(cls, path):
+        """Build a calculator from a JSON/TOML/YAML policy file."""
+        return cls(load_policy(path))
+
+    def final_grade(self, grades):
+        """Final grade only, using the compiled plan's dot-product fast path."""
+        return self.plan.final_grade(grades)
+
     def calculate_grade(self, grades):
         """Calculate the final grade based on provided category grades"""
         final_grade = 0
@@ -23,16 +36,16 @@ class GradeCalculator:
         for category, grades_list in grades.items():
             if category == 'attendance':
                 absences = grades_list
-                penalty_per_absence = self.weights[category] / 5
-                impact = absences * penalty_per_absence
+                impact = absences * self.plan.penalty_per_absence
                 final_grade += impact
                 breakdown[category] = {
                     'absences': absences,
                     'impact': impact
                 }
             else:
-                if grades_list:
-                    avg = sum(grades_list) / len(grades_list)
+                valid_grades = [g for g in grades_list if g is not None]
+                if valid_grades:
+                    avg = self.plan.average(category, valid_grades)
                     weighted = avg * self.weights[category]
                     final_grade += weighted
                     breakdown[category] = {
@@ -43,273 +56,523 @@ class GradeCalculator:
         
         return final_grade, breakdown
 
+    def roster_from_grades(self, students):
+        """Pack a list of per-student grade dicts into a roster of score matrices.
+
+        Missing scores (``None`` entries or short lists) become NaN so the
+        result can be passed straight to ``calculate_grades_batch``.
+        """
+        roster = {}
+        categories = list(self.assignment_counts) + ['extra_credit']
+        for category in categories:
+            width = max([self.assignment_counts.get(category, 1)] +
+                        [len(s.get(category) or []) for s in students])
+            scores = np.full((len(students), width), np.nan)
+            for row, student in enumerate(students):
+                for col, g in enumerate(student.get(category) or []):
+                    if g is not None:
+                        scores[row, col] = g
+            roster[category] = scores
+        roster['attendance'] = np.array([s.get('attendance', 0) for s in students], dtype=float)
+        return roster
+
+    def calculate_grades_batch(self, roster):
+        """Calculate final grades for a whole roster at once.
+
+        ``roster`` maps each category to an (N, assignments) score matrix with
+        NaN (or ``None``) marking missing scores, and ``'attendance'`` to a
+        length-N vector of absences. Returns ``(final_grades, breakdown)`` where
+        every value is a NumPy array over students. Categories with no valid
+        scores for a student contribute nothing, matching ``calculate_grade``;
+        their average is NaN and their weighted value 0.
+        """
+        final_grades = None
+        breakdown = {}
+
+        for category, scores in roster.items():
+            if category == 'attendance':
+                absences = np.asarray(scores, dtype=float)
+                impact = absences * self.plan.penalty_per_absence
+                breakdown[category] = {
+                    'absences': absences,
+                    'impact': impact
+                }
+                contribution = impact
+            else:
+                # Float inputs (e.g. float32 Gradebook views) are used as-is to
+                # avoid a copy; sums are always accumulated in float64.
+                scores = np.asarray(scores)
+                if scores.dtype.kind != 'f':
+                    scores = scores.astype(float)
+                if scores.ndim == 1:
+                    scores = scores[:, np.newaxis]
+                valid = ~np.isnan(scores)
+                counts = valid.sum(axis=1)
+                totals = np.where(valid, scores, 0).sum(axis=1, dtype=np.float64)
+                rule = self.plan.rules.get(category)
+                if rule:
+                    avg = rule.average_batch(scores, counts)
+                else:
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        avg = totals / counts
+                weighted = np.where(counts > 0, avg * self.weights[category], 0.0)
+                breakdown[category] = {
+                    'count': counts,
+                    'average': avg,
+                    'weighted': weighted
+                }
+                contribution = weighted
+
+            if final_grades is None:
+                final_grades = np.zeros(len(contribution))
+            final_grades += contribution
+
+        if final_grades is None:
+            final_grades = np.zeros(0)
+        return final_grades, breakdown
+
     def calculate_needed_grades(self, current_grades, target_grade):
-        """Calculate needed grades for remaining assignments to reach target"""
-        current_grade, breakdown = self.calculate_grade(current_grades)
-        
-        # Calculate remaining weight percentages
-        remaining_weights = {
-            'homeworks': 0,
-            'quizzes': 0,
-            'projects': 0,
-            'exams': 0
+        """Calculate needed grades for remaining assignments to reach target
+
+        ``needed_average`` is the score that, earned on every remaining
+        assignment, brings the completed-course grade to the target (each
+        category averaged over all its assignments, rules applied).
+        ``points_needed`` is what the remaining work has to add to the grade
+        earned with zero on all of it, ``max_achievable`` is the grade with
+        maximum scores everywhere, and ``secured``/``unreachable`` say whether
+        the target is met already or out of reach. Returns ``None`` when no
+        work remains.
+        """
+        if self.plan.rules:
+            return self.needed_results(self._needed_grades(self.roster_from_grades([current_grades]),
+                                                           [target_grade]))[0]
+        return self._needed_grade_plain(current_grades, target_grade)
+
+    def _needed_grade_plain(self, grades, target):
+        """``calculate_needed_grades`` in closed form, for policies without category rules.
+
+        The completed grade is ``floor`` plus, per category with remaining
+        work, ``weight * remaining / count`` times the fill score capped at
+        that category's max score: piecewise linear, with breakpoints at the
+        caps. Walking the pieces in cap order finds the fill score directly.
+        """
+        floor, terms = self.completion_plan(grades)
+        if not terms:
+            return None
+        pieces = sorted((self.max_scores[category], coef * remaining) for category, (coef, remaining) in terms.items())
+        total = sum(slope for _, slope in pieces)
+        max_achievable = floor + sum(cap * slope for cap, slope in pieces)
+        if target <= floor:
+            needed_average = 0.0
+        elif target > max_achievable:
+            top = max(self.max_scores[category] for category in self.assignment_counts)
+            needed_average = top + (target - max_achievable) / total
+        else:
+            fill, value, slope = 0.0, floor, total
+            for cap, piece in pieces:
+                reach = value + slope * (cap - fill)
+                if reach >= target:
+                    break
+                fill, value, slope = cap, reach, slope - piece
+            needed_average = fill + (target - value) / slope
+        remaining_weights = {category: 0.0 for category in self.assignment_counts}
+        remaining_weights.update((category, coef * remaining) for category, (coef, remaining) in terms.items())
+        return {
+            'current_grade': self.final_grade(grades),
+            'points_needed': target - floor,
+            'needed_average': needed_average,
+            'remaining_weights': remaining_weights,
+            'max_achievable': max_achievable,
+            'secured': target <= floor,
+            'unreachable': target > max_achievable
         }
-        
-        # Count remaining assignments
-        for category in remaining_weights:
-            if category in self.assignment_counts:
-                remaining = self.assignment_counts[category] - len(current_grades[category])
-                if remaining > 0:
-                    remaining_weights[category] = self.weights[category] * remaining / self.assignment_counts[category]
-        
+
+    def needed_results(self, result, row=0):
+        """Per-target ``calculate_needed_grades`` dicts for one student of a batch result.
+
+        ``result`` is a ``calculate_needed_grades_batch`` result; returns a
+        list with one entry per target, or ``None`` entries when the student
+        has no work remaining.
+        """
+        targets = result['points_needed'].shape[1]
+        if not result['total_remaining_weight'][row]:
+            return [None] * targets
+        remaining_weights = {category: float(weight[row]) for category, weight in result['remaining_weights'].items()}
+        return [{
+            'current_grade': float(result['current_grade'][row]),
+            'points_needed': float(result['points_needed'][row, col]),
+            'needed_average': float(result['needed_average'][row, col]),
+            'remaining_weights': dict(remaining_weights),
+            'max_achievable': float(result['max_achievable'][row]),
+            'secured': bool(result['secured'][row, col]),
+            'unreachable': bool(result['unreachable'][row, col])
+        } for col in range(targets)]
+
+    def completion_plan(self, grades):
+        """Reduce grades to the linear form of the final grade once all work is in.
+
+        Returns ``(base, terms)`` where ``terms`` maps each category with
+        remaining assignments to ``(coef, remaining)``, so that the final grade
+        is ``base + sum(coef * total of the remaining scores in the category)``.
+        Extra credit and attendance are taken as already final. Category
+        rules make the final grade non-linear, so they raise ``ValueError``
+        for any category that still has work remaining.
+        """
+        fixed = {category: value for category, value in grades.items()
+                 if category not in self.assignment_counts}
+        base = self.final_grade(fixed)
+        terms = {}
+        for category, count in self.assignment_counts.items():
+            scores = [g for g in grades.get(category) or [] if g is not None]
+            remaining = count - len(scores)
+            if remaining > 0:
+                if category in self.plan.rules:
+                    raise ValueError(f"Category rules for '{category}' have no linear completion plan")
+                coef = self.weights[category] / count
+                base += coef * sum(scores)
+                terms[category] = (coef, remaining)
+            elif scores:
+                base += self.weights[category] * self.plan.average(category, scores)
+        return base, terms
+
+    def calculate_needed_grades_batch(self, roster, targets):
+        """Solve needed averages for N students x K targets in one pass.
+
+        Current grade and remaining weight are computed once per student from a
+        ``calculate_grades_batch`` roster. Returns arrays: ``current_grade``,
+        ``total_remaining_weight`` and ``max_achievable`` of shape (N,),
+        ``remaining_weights`` per category, and (N, K) ``points_needed``/
+        ``needed_average`` matrices with boolean ``secured`` (target met even
+        with zero on the remaining work) and ``unreachable`` (target above
+        ``max_achievable``) flags, all as in ``calculate_needed_grades``.
+        ``needed_average`` is NaN where no work remains.
+        """
+        return self._needed_grades(roster, targets)
+
+    def _needed_grades(self, roster, targets):
+        current_grade, breakdown = self.calculate_grades_batch(roster)
+        targets = np.asarray(targets, dtype=float)
+
+        remaining_weights = {}
+        for category, count in self.assignment_counts.items():
+            entered = breakdown[category]['count'] if category in breakdown else 0
+            remaining_weights[category] = self.weights[category] * np.maximum(count - entered, 0) / count
         total_remaining_weight = sum(remaining_weights.values())
-        if total_remaining_weight == 0:
-            return None
-        
-        # Calculate needed average on remaining assignments
-        points_needed = target_grade - current_grade
-        needed_average = points_needed / total_remaining_weight * 100
-        
+
+        fixed, terms = self._completion_terms(roster, breakdown, current_grade)
+        needed_average, floor, max_achievable = self._solve_completion(fixed, terms, targets,
+                                                                       total_remaining_weight)
+        points_needed = targets[np.newaxis, :] - floor[:, np.newaxis]
         return {
             'current_grade': current_grade,
+            'total_remaining_weight': total_remaining_weight,
+            'remaining_weights': remaining_weights,
             'points_needed': points_needed,
             'needed_average': needed_average,
-            'remaining_weights': remaining_weights
+            'secured': points_needed <= 0,
+            'unreachable': targets[np.newaxis, :] > max_achievable[:, np.newaxis],
+            'max_achievable': max_achievable
         }
 
-def main():
-    calc = GradeCalculator()
-    
-    # Your actual grades
-    grades = {
-        'homeworks': [89, 83, 62],  
-        'quizzes': [40, 62],        
-        'projects': [120, 127],      
-        'exams': [],                
-        'extra_credit': [100],      
-        'attendance': 0             
-    }
-    
+    def solve_remaining(self, floor, remaining, targets):
+        """Needed averages from a floor grade and remaining counts alone, under a plain policy.
+
+        Without category rules the completed grade is ``floor`` (the grade
+        with zero on every remaining assignment) plus ``weight / count`` per
+        point earned on each remaining one, so students sharing ``remaining``
+        (counts per category, in policy order) differ only in ``floor``.
+        Returns ``(needed_average, max_achievable)`` for an (N,) ``floor``
+        and K ``targets``, solved like ``calculate_needed_grades_batch``.
+        """
+        if self.plan.rules:
+            raise ValueError("Policies with category rules need every score to solve for needed grades")
+        floor = np.asarray(floor, dtype=float)
+        n = len(floor)
+        terms = [(category, np.full(n, count - left), np.full(n, left), np.zeros(n), None)
+                 for (category, count), left in zip(self.assignment_counts.items(), remaining)]
+        weight = np.full(n, sum(self.weights[category] * left / count
+                                for (category, count), left in zip(self.assignment_counts.items(), remaining)))
+        needed_average, _, max_achievable = self._solve_completion(floor, terms, np.asarray(targets, dtype=float),
+                                                                   weight)
+        return needed_average, max_achievable
+
+    def _completion_terms(self, roster, breakdown, current_grade):
+        """Per-category pieces of the completed grade, computed once before bisecting.
+
+        Returns ``(fixed, terms)``: ``fixed`` is everything remaining work
+        cannot change (extra credit, attendance) and each term holds a
+        category's entered count, remaining count, entered total and, for
+        categories with rules, the entered score matrix.
+        """
+        n = len(current_grade)
+        fixed = current_grade.copy()
+        terms = []
+        for category, count in self.assignment_counts.items():
+            if category in breakdown:
+                fixed -= breakdown[category]['weighted']
+                scores = np.asarray(roster[category], dtype=float).reshape(n, -1)
+                entered = breakdown[category]['count']
+            else:
+                scores = np.empty((n, 0))
+                entered = np.zeros(n, dtype=int)
+            rule = self.plan.rules.get(category)
+            terms.append((category, entered, np.maximum(count - entered, 0),
+                          np.nansum(scores, axis=1), scores if rule else None))
+        return fixed, terms
+
+    def _completion_grades_batch(self, fixed, terms, scores, rows=slice(None)):
+        """Vectorized ``_completion_grade`` for ``rows``, each with its remaining work scored ``scores``.
+
+        Plain categories are linear in the fill score and use their entered
+        totals; only categories with rules rebuild a score matrix.
+        """
+        final = fixed[rows].copy()
+        for category, entered, remaining, totals, matrix in terms:
+            entered, remaining = entered[rows], remaining[rows]
+            fill = np.minimum(scores, self.max_scores[category])
+            n = entered + remaining
+            if matrix is None:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    avg = (totals[rows] + remaining * fill) / n
+            else:
+                count = self.assignment_counts[category]
+                extra = np.where(np.arange(count) < remaining[:, np.newaxis], fill[:, np.newaxis], np.nan)
+                avg = self.plan.rules[category].average_batch(np.hstack([matrix[rows], extra]), n)
+            final += np.where(n > 0, avg * self.weights[category], 0.0)
+        return final
+
+    def _solve_completion(self, fixed, terms, targets, total_remaining_weight, iterations=100):
+        """Bisect for the uniform remaining score that brings each completed grade to each target.
+
+        The completed grade never decreases as the remaining scores rise, even
+        with drops and caps, so the answer lies in [0, highest max score].
+        Returns ``(needed_average, floor, max_achievable)``, where ``floor``
+        is the completed grade with zero on all remaining work. Out-of-reach
+        targets are extrapolated past the maximum over the remaining weight.
+        """
+        n, k = len(fixed), len(targets)
+        top = float(max(self.max_scores[category] for category in self.assignment_counts))
+        max_achievable = self._completion_grades_batch(fixed, terms, np.full(n, top))
+        floor = self._completion_grades_batch(fixed, terms, np.zeros(n))
+        weight = total_remaining_weight[:, np.newaxis]
+        goal = np.broadcast_to(targets[np.newaxis, :], (n, k))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            needed = np.where(goal > max_achievable[:, np.newaxis],
+                              top + (goal - max_achievable[:, np.newaxis]) / weight, 0.0)
+
+        # Solve only the student x target pairs whose answer lies inside
+        # [0, top]. The completed grade is piecewise linear in the fill score,
+        # so interpolation steps land exactly once a bracket sits on one
+        # piece; alternating them with bisection keeps the bracket halving.
+        rows, cols = np.nonzero((weight > 0) & (goal <= max_achievable[:, np.newaxis]) &
+                                (goal > floor[:, np.newaxis]))
+        lo, hi = np.zeros(len(rows)), np.full(len(rows), top)
+        f_lo, f_hi = floor[rows], max_achievable[rows]
+        goal_rows = targets[cols]
+        active = np.arange(len(rows))
+        for step in range(iterations):
+            if not len(active):
+                break
+            a, b, fa, fb, g = lo[active], hi[active], f_lo[active], f_hi[active], goal_rows[active]
+            mid = (a + b) / 2 if step % 2 else a + (g - fa) * (b - a) / (fb - fa)
+            value = self._completion_grades_batch(fixed, terms, mid, rows[active])
+            reached = value >= g
+            lo[active], f_lo[active] = np.where(reached, a, mid), np.where(reached, fa, value)
+            hi[active], f_hi[active] = np.where(reached, mid, b), np.where(reached, value, fb)
+            exact = np.abs(value - g) < 1e-9
+            hi[active[exact]] = mid[exact]
+            active = active[~exact & (hi[active] - lo[active] > 1e-9)]
+        needed[rows, cols] = hi
+        return np.where(weight > 0, needed, np.nan), floor, max_achievable
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Grade Calculator")
+    parser.add_argument('--input', help="grade a CSV/JSONL export (student, category, assignment, score) "
+                                        "non-interactively; use '-' for stdin")
+    parser.add_argument('--output', default='-', help="where to write graded results as CSV (default: stdout)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="input format (default: from file extension)")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="rows parsed per chunk (default: 10000)")
+    parser.add_argument('--policy', metavar='PATH',
+                        help="grading policy file (JSON, TOML or YAML; default: the built-in policy)")
+    parser.add_argument('--report-cards', metavar='DIR',
+                        help="with --input, render per-student report cards into DIR instead of the results CSV")
+    parser.add_argument('--report-formats', default='csv,json,html',
+                        help="comma-separated report card formats: csv, json, html (default: all)")
+    parser.add_argument('--workers', type=int, help="report rendering processes (default: CPU count; 0 = inline)")
+    parser.add_argument('--db', metavar='PATH', help="SQLite gradebook to load grades from and save them to")
+    parser.add_argument('--course', default='default', help="course code in --db (default: default)")
+    parser.add_argument('--student', default='me', help="student id in --db for the interactive menu (default: me)")
+    parser.add_argument('--profile', metavar='PATH', help="write cProfile stats for the run to PATH (read with pstats)")
+    parser.add_argument('--metrics', choices=['none', 'prometheus', 'json'], default='none',
+                        help="record grading metrics and dump them when the run ends (default: none)")
+    parser.add_argument('--metrics-output', metavar='PATH', help="file for --metrics (default: stderr)")
+    return parser.parse_args(argv)
+
+def run_batch(args, calc, store=None):
+    from ingest import run_pipeline
+
+    stats = run_pipeline(args.input, args.output, chunk_size=args.chunk_size, fmt=args.format, calc=calc,
+                         store=store, course=args.course)
+    print(f"Graded {stats['students']} students from {stats['rows']} rows "
+          f"in {stats['seconds']:.2f}s ({stats['rows_per_second']:,.0f} rows/s)", file=sys.stderr)
+
+def run_reports(args, calc):
+    from reports import render_export
+
+    stats = render_export(args.input, args.report_cards, chunk_size=args.chunk_size, fmt=args.format, calc=calc,
+                          formats=[f.strip() for f in args.report_formats.split(',') if f.strip()],
+                          workers=args.workers)
+    print(f"Rendered {stats['students']} report cards in {stats['seconds']:.2f}s "
+          f"({stats['students_per_second']:,.0f} students/s)", file=sys.stderr)
+
+ASSIGNMENT_NAMES = {'homeworks': 'Homework', 'quizzes': 'Quiz', 'projects': 'Project', 'exams': 'Exam'}
+EXAM_NAMES = ['Midterm Exam', 'Final Exam']
+
+# The sample student the CLI starts from without a gradebook
+SAMPLE_GRADES = {
+    'homeworks': [89, 83, 62],
+    'quizzes': [40, 62],
+    'projects': [120, 127],
+    'exams': [],
+    'extra_credit': [100],
+    'attendance': 0
+}
+
+def assignment_label(category, index):
+    """Display name of one assignment slot, e.g. ``Homework 3`` or ``Midterm Exam``."""
+    if category == 'exams' and index < len(EXAM_NAMES):
+        return EXAM_NAMES[index]
+    name = ASSIGNMENT_NAMES.get(category, category.replace('_', ' ').title())
+    return f"{name} {index + 1}"
+
+def sample_grades(calc):
+    """``SAMPLE_GRADES`` fitted to the policy's categories and assignment counts."""
+    grades = {category: SAMPLE_GRADES.get(category, [])[:count]
+              for category, count in calc.assignment_counts.items()}
+    grades['extra_credit'] = list(SAMPLE_GRADES['extra_credit'])
+    grades['attendance'] = SAMPLE_GRADES['attendance']
+    return grades
+
+def prompt_score(prompt, cap):
+    """Ask until a score in ``0..cap`` is entered; ``None`` if left blank."""
+    while True:
+        value = input(prompt)
+        if not value.strip():
+            return None
+        try:
+            grade = float(value)
+        except ValueError:
+            print("Please enter a valid number")
+            continue
+        if 0 <= grade <= cap:
+            return grade
+        print(f"Please enter a grade between 0 and {cap:g}")
+
+def run_menu(calc, grades, save=None):
+    from reports import format_breakdown
+
     while True:
         print("\n=== Grade Calculator Menu ===")
         print("1. Show current grade breakdown")
         print("2. Calculate needed grades for targets")
         print("3. Try hypothetical grades")
-        print("4. Exit")
+        print("4. Simulate final grade outcomes")
+        print("5. Exit")
         
-        choice = input("\nEnter your choice (1-4): ")
+        choice = input("\nEnter your choice (1-5): ")
         
         if choice == '1':
             final_grade, breakdown = calc.calculate_grade(grades)
             print("\nCurrent Grade Breakdown:")
             print("-" * 50)
-            
-            print("Homeworks (15%):")
-            if 'homeworks' in breakdown:
-                hw = breakdown['homeworks']
-                print(f"  Grades: {hw['grades']}")
-                print(f"  Average: {hw['average']:.2f}%")
-                print(f"  Weighted: {hw['weighted']:.2f}%")
-                print(f"  Completed: {len(hw['grades'])}/{calc.assignment_counts['homeworks']}")
-            
-            print("\nQuizzes (15%):")
-            if 'quizzes' in breakdown:
-                q = breakdown['quizzes']
-                print(f"  Grades: {q['grades']}")
-                print(f"  Average: {q['average']:.2f}%")
-                print(f"  Weighted: {q['weighted']:.2f}%")
-                print(f"  Completed: {len(q['grades'])}/{calc.assignment_counts['quizzes']}")
-            
-            print("\nProjects (20%):")
-            if 'projects' in breakdown:
-                p = breakdown['projects']
-                print(f"  Grades: {p['grades']}")
-                print(f"  Average: {p['average']:.2f}%")
-                print(f"  Weighted: {p['weighted']:.2f}%")
-                print(f"  Completed: {len(p['grades'])}/{calc.assignment_counts['projects']}")
-            
-            print("\nExams (50%):")
-            if 'exams' in breakdown:
-                e = breakdown['exams']
-                print(f"  Grades: {e['grades']}")
-                print(f"  Average: {e['average']:.2f}%")
-                print(f"  Weighted: {e['weighted']:.2f}%")
-                print(f"  Completed: {len(e['grades'])}/{calc.assignment_counts['exams']}")
-            
-            print("\nExtra Credit (7%):")
-            if 'extra_credit' in breakdown:
-                ec = breakdown['extra_credit']
-                print(f"  Score: {ec['grades'][0]}%")
-                print(f"  Weighted: {ec['weighted']:.2f}%")
-            
-            print("\nAttendance (-5%):")
-            if 'attendance' in breakdown:
-                att = breakdown['attendance']
-                print(f"  Absences: {att['absences']}/5")
-                print(f"  Impact: {att['impact']:.2f}% (0 = no penalty, -5 = max penalty)")
+            print(format_breakdown(calc, breakdown))
             
             print("\n" + "-" * 50)
             print(f"Current Grade: {final_grade:.2f}%")
             
         elif choice == '2':
             print("\nCalculating needed grades for different targets...")
-            for target in [70, 80, 90]:
-                needed = calc.calculate_needed_grades(grades, target)
-                print(f"\nTo get a {target}%:")
-                print(f"  Points needed: {needed['points_needed']:.2f}%")
-                print(f"  Average needed on remaining work: {needed['needed_average']:.2f}%")
+            targets = [70, 80, 90]
+            results = needed_table(calc).needed_many(grades, targets)
+            if results[0] is None:
+                print(f"\nNo remaining assignments. Final grade: {calc.final_grade(grades):.2f}%")
+            else:
+                for target, needed in zip(targets, results):
+                    print(f"\nTo get a {target}%:")
+                    print(f"  Points needed: {needed['points_needed']:.2f}%")
+                    print(f"  Average needed on remaining work: {needed['needed_average']:.2f}%")
+                    if needed['secured']:
+                        print("  Already secured")
+                    elif needed['unreachable']:
+                        print("  Unreachable, even with maximum scores on all remaining work")
                 print("\nRemaining work weight distribution:")
-                for category, weight in needed['remaining_weights'].items():
+                for category, weight in results[0]['remaining_weights'].items():
                     if weight > 0:
-                        remaining = calc.assignment_counts[category] - len(grades[category])
+                        remaining = round(weight / calc.weights[category] * calc.assignment_counts[category])
                         print(f"  {category.title()}: {weight*100:.1f}% ({remaining} remaining)")
+                print("\nHighest-leverage remaining work (grade points per assignment point):")
+                for item in leverage_report(calc, calc.roster_from_grades([grades]), top=3)[0]:
+                    print(f"  {item['category'].title()} #{item['assignment']}: {item['final']:.3f} at the end, "
+                          f"{item['current']:.3f} now above {item['break_even']:.1f}%")
                         
         elif choice == '3':
             print("\nEnter hypothetical grades (press Enter to skip):")
-            print("Note: Homeworks and Projects can score up to 130%")
+            bonus = [category.title() for category, cap in calc.max_scores.items()
+                     if cap > 100 and category in calc.assignment_counts]
+            if bonus:
+                print(f"Note: {' and '.join(bonus)} can score above 100%")
             
-            # Create a copy of current grades
-            new_grades = grades.copy()
+            # Copy the current grades, then offer each assignment not yet entered
             new_grades = {k: list(v) if isinstance(v, list) else v for k, v in grades.items()}
+            for category, count in calc.assignment_counts.items():
+                cap = calc.max_scores[category]
+                entered = new_grades.setdefault(category, [])
+                for index in range(len(entered), count):
+                    entered.append(prompt_score(f"{assignment_label(category, index)} grade (0-{cap:g}): ", cap))
+                # A skipped assignment keeps its slot only if a later one was entered
+                new_grades[category] = _trim_missing(entered)
             
-            # Remaining Homeworks (0-130)
-            remaining_hw = calc.assignment_counts['homeworks'] - len(new_grades['homeworks'])
-            for hw_num in range(len(new_grades['homeworks']) + 1, calc.assignment_counts['homeworks'] + 1):
-                while True:
-                    hw = input(f"Homework {hw_num} grade (0-130): ")
-                    if not hw.strip():
-                        break
-                    try:
-                        grade = float(hw)
-                        if 0 <= grade <= 130:
-                            new_grades['homeworks'].append(grade)
-                            break
-                        else:
-                            print("Please enter a grade between 0 and 130")
-                    except ValueError:
-                        print("Please enter a valid number")
-            
-            # Quiz 3 & 4 (0-100)
-            for quiz_num in range(len(new_grades['quizzes']) + 1, calc.assignment_counts['quizzes'] + 1):
-                while True:
-                    quiz = input(f"Quiz {quiz_num} grade (0-100): ")
-                    if not quiz.strip():
-                        break
-                    try:
-                        grade = float(quiz)
-                        if 0 <= grade <= 100:
-                            new_grades['quizzes'].append(grade)
-                            break
-                        else:
-                            print("Please enter a grade between 0 and 100")
-                    except ValueError:
-                        print("Please enter a valid number")
-            
-            # Project 3 & 4 (0-130)
-            for proj_num in range(len(new_grades['projects']) + 1, calc.assignment_counts['projects'] + 1):
-                while True:
-                    proj = input(f"Project {proj_num} grade (0-130): ")
-                    if not proj.strip():
-                        break
-                    try:
-                        grade = float(proj)
-                        if 0 <= grade <= 130:
-                            new_grades['projects'].append(grade)
-                            break
-                        else:
-                            print("Please enter a grade between 0 and 130")
-                    except ValueError:
-                        print("Please enter a valid number")
-            
-            # Midterm & Final (0-100)
-            exam_names = ["Midterm", "Final"]
-            for exam_num in range(len(new_grades['exams']), calc.assignment_counts['exams']):
-                while True:
-                    exam = input(f"{exam_names[exam_num]} exam grade (0-100): ")
-                    if not exam.strip():
-                        break
-                    try:
-                        grade = float(exam)
-                        if 0 <= grade <= 100:
-                            new_grades['exams'].append(grade)
-                            break
-                        else:
-                            print("Please enter a grade between 0 and 100")
-                    except ValueError:
-                        print("Please enter a valid number")
-            
-            # Extra Credit (0-100%)
-            print("\nExtra Credit (7% of total grade):")
-            while True:
-                ec = input("Extra Credit score (0-100): ")
-                if not ec.strip():
-                    break
-                try:
-                    grade = float(ec)
-                    if 0 <= grade <= 100:
-                        new_grades['extra_credit'] = [grade]  
-                        break
-                    else:
-                        print("Please enter a grade between 0 and 100")
-                except ValueError:
-                    print("Please enter a valid number")
+            # Extra Credit
+            print(f"\nExtra Credit ({calc.weights['extra_credit']:.0%} of total grade):")
+            cap = calc.max_scores['extra_credit']
+            grade = prompt_score(f"Extra Credit score (0-{cap:g}): ", cap)
+            if grade is not None:
+                new_grades['extra_credit'] = [grade]
             
             # Calculate new grade
             new_final_grade, new_breakdown = calc.calculate_grade(new_grades)
             print("\nHypothetical Grade Breakdown:")
             print("-" * 50)
             
-            # Show detailed breakdown
-            print("Homeworks (15%):")
-            if 'homeworks' in new_breakdown:
-                hw = new_breakdown['homeworks']
-                print(f"  Grades: {hw['grades']}")
-                print(f"  Average: {hw['average']:.2f}%")
-                print(f"  Weighted: {hw['weighted']:.2f}%")
-                print(f"  Completed: {len(hw['grades'])}/{calc.assignment_counts['homeworks']}")
-            
-            print("\nQuizzes (15%):")
-            if 'quizzes' in new_breakdown:
-                q = new_breakdown['quizzes']
-                print(f"  Grades: {q['grades']}")
-                print(f"  Average: {q['average']:.2f}%")
-                print(f"  Weighted: {q['weighted']:.2f}%")
-                print(f"  Completed: {len(q['grades'])}/{calc.assignment_counts['quizzes']}")
-            
-            print("\nProjects (20%):")
-            if 'projects' in new_breakdown:
-                p = new_breakdown['projects']
-                print(f"  Grades: {p['grades']}")
-                print(f"  Average: {p['average']:.2f}%")
-                print(f"  Weighted: {p['weighted']:.2f}%")
-                print(f"  Completed: {len(p['grades'])}/{calc.assignment_counts['projects']}")
-            
-            print("\nExams (50%):")
-            if 'exams' in new_breakdown:
-                e = new_breakdown['exams']
-                print(f"  Grades: {e['grades']}")
-                print(f"  Average: {e['average']:.2f}%")
-                print(f"  Weighted: {e['weighted']:.2f}%")
-                print(f"  Completed: {len(e['grades'])}/{calc.assignment_counts['exams']}")
-            
-            print("\nExtra Credit (7%):")
-            if 'extra_credit' in new_breakdown:
-                ec = new_breakdown['extra_credit']
-                print(f"  Score: {ec['grades'][0]}%")
-                print(f"  Weighted: {ec['weighted']:.2f}%")
-            
-            print("\nAttendance (-5%):")
-            if 'attendance' in new_breakdown:
-                att = new_breakdown['attendance']
-                print(f"  Absences: {att['absences']}/5")
-                print(f"  Impact: {att['impact']:.2f}% (0 = no penalty, -5 = max penalty)")
+            print(format_breakdown(calc, new_breakdown))
             
             print("\n" + "-" * 50)
-            print(f"Current grade: {calc.calculate_grade(grades)[0]:.2f}%")
+            print(f"Current grade: {calc.final_grade(grades):.2f}%")
             print(f"Hypothetical grade: {new_final_grade:.2f}%")
-            print(f"Difference: {new_final_grade - calc.calculate_grade(grades)[0]:+.2f}%")
+            print(f"Difference: {new_final_grade - calc.final_grade(grades):+.2f}%")
+            
+            if save and input("\nSave these as your grades? (y/N): ").strip().lower() == 'y':
+                save(new_grades)
+                grades = new_grades
+                print("Saved.")
             
         elif choice == '4':
+            from simulation import simulate_final_grades
+
+            print("\nSimulating remaining assignments from your current scores...")
+            targets = [70, 80, 90]
+            try:
+                sim = simulate_final_grades(calc, [grades], thresholds=targets, n_draws=200000, workers=0)
+            except ValueError as error:
+                print(f"Cannot simulate: {error}")
+                input("\nPress Enter to continue...")
+                continue
+            print(f"Expected final grade: {sim['mean'][0]:.2f}% (std {sim['std'][0]:.2f})")
+            for k, target in enumerate(targets):
+                print(f"  P(final >= {target}%): {sim['probability'][0, k]:.1%} "
+                      f"[{sim['ci_low'][0, k]:.1%}, {sim['ci_high'][0, k]:.1%}]")
+            
+        elif choice == '5':
             print("\nGoodbye!")
             break
         
@@ -318,5 +581,53 @@ def main():
         
         input("\nPress Enter to continue...")
 
+def _trim_missing(values):
+    """``values`` without its trailing ``None`` slots."""
+    end = len(values)
+    while end and values[end - 1] is None:
+        end -= 1
+    return values[:end]
+
+def main(argv=None):
+    args = parse_args(argv)
+    sink = sink_from_name(args.metrics, args.metrics_output)
+    calc = instrument(GradeCalculator.from_file(args.policy) if args.policy else GradeCalculator(), sink)
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    store = None
+    if args.db:
+        from storage import GradeStore
+        store = GradeStore(args.db, calc)
+    try:
+        if args.input and args.report_cards:
+            run_reports(args, calc)
+            return
+        if args.input:
+            run_batch(args, calc, store)
+            return
+        
+        # Your actual grades
+        grades = sample_grades(calc)
+        save = None
+        if store:
+            loaded = store.load_grades(args.course, args.student)
+            if loaded is None:
+                store.save_grades(args.course, args.student, grades)
+            else:
+                # The menu adds scores after the last entered one, so only the
+                # trailing empty slots go; gaps keep every score in its slot
+                grades = {k: _trim_missing(v) if isinstance(v, list) else v for k, v in loaded.items()}
+            def save(new_grades):
+                store.save_grades(args.course, args.student, new_grades)
+        run_menu(calc, grades, save)
+    finally:
+        if store:
+            store.close()
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        sink.flush()
+
 if __name__ == "__main__":
     main()
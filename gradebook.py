@@ -0,0 +1,172 @@
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b'GRDBOOK1'
+HEADER_SIZE = 4096
+ALIGNMENT = 64
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class Gradebook:
+    """Compact column store for a whole roster.
+
+    Scores live in a single (students, slots) float32 matrix whose columns are
+    laid out category by category, using the widths from
+    ``GradeCalculator.assignment_counts`` plus one extra-credit slot. Missing
+    scores are tracked in a packed bitmask (one bit per slot) and are also
+    stored as NaN, so the per-category views returned by ``roster()`` can be
+    fed to ``calculate_grades_batch`` without copying. Absences are an int8
+    column. A snapshot written with ``save()`` can be reopened with ``load()``
+    as memory-mapped arrays, which costs no parsing regardless of size.
+    """
+
+    def __init__(self, layout, scores, missing, absences, ids=None):
+        self.layout = [(category, int(width)) for category, width in layout]
+        self.scores = scores
+        self.missing = missing
+        self.absences = absences
+        self.ids = ids
+
+        self.slices = {}
+        start = 0
+        for category, width in self.layout:
+            self.slices[category] = slice(start, start + width)
+            start += width
+        self.n_slots = start
+
+    @classmethod
+    def empty(cls, calc, n_students, ids=None):
+        """Create an empty gradebook sized from ``calc.assignment_counts``."""
+        layout = list(calc.assignment_counts.items()) + [('extra_credit', 1)]
+        n_slots = sum(width for _, width in layout)
+        scores = np.full((n_students, n_slots), np.nan, dtype=np.float32)
+        missing = np.packbits(np.ones((n_students, n_slots), dtype=bool), axis=1)
+        absences = np.zeros(n_students, dtype=np.int8)
+        if ids is not None:
+            ids = np.array([str(i).encode() for i in ids])
+            if len(ids) != n_students:
+                raise ValueError("ids must have one entry per student")
+        return cls(layout, scores, missing, absences, ids)
+
+    @classmethod
+    def from_grades(cls, calc, students, ids=None):
+        """Build a gradebook from a list of per-student grade dicts."""
+        book = cls.empty(calc, len(students), ids)
+        for row, grades in enumerate(students):
+            for category, _ in book.layout:
+                for index, score in enumerate(grades.get(category) or []):
+                    if score is not None:
+                        book.set_score(row, category, index, score)
+            book.set_absences(row, grades.get('attendance', 0))
+        return book
+
+    def __len__(self):
+        return len(self.absences)
+
+    def _slot(self, category, index):
+        if category not in self.slices:
+            raise KeyError(f"Unknown category '{category}'")
+        s = self.slices[category]
+        if not 0 <= index < s.stop - s.start:
+            raise IndexError(f"{category} has {s.stop - s.start} slots, got index {index}")
+        return s.start + index
+
+    def set_score(self, row, category, index, score):
+        """Set one score; ``None`` marks the slot as missing."""
+        slot = self._slot(category, index)
+        byte, bit = divmod(slot, 8)
+        mask = np.uint8(0x80 >> bit)
+        if score is None:
+            self.scores[row, slot] = np.nan
+            self.missing[row, byte] |= mask
+        else:
+            self.scores[row, slot] = score
+            self.missing[row, byte] &= ~mask
+
+    def set_absences(self, row, absences):
+        if not 0 <= absences <= np.iinfo(np.int8).max:
+            raise ValueError(f"Absences out of range: {absences}")
+        self.absences[row] = absences
+
+    def missing_mask(self, category=None):
+        """Return a boolean (students, slots) matrix of missing scores."""
+        mask = np.unpackbits(self.missing, axis=1, count=self.n_slots).astype(bool)
+        return mask if category is None else mask[:, self.slices[category]]
+
+    def roster(self):
+        """Return per-category score views in the ``calculate_grades_batch`` layout."""
+        roster = {category: self.scores[:, s] for category, s in self.slices.items()}
+        roster['attendance'] = self.absences
+        return roster
+
+    def to_grades(self, row, compact=False):
+        """Return one student's grades in the dict-of-lists format.
+
+        Missing scores are ``None`` as in the Streamlit app; with ``compact``
+        they are dropped instead, matching the CLI's hard-coded ``grades``.
+        """
+        missing = np.unpackbits(self.missing[row], count=self.n_slots).astype(bool)
+        grades = {}
+        for category, s in self.slices.items():
+            values = [None if missing[slot] else float(self.scores[row, slot])
+                      for slot in range(s.start, s.stop)]
+            grades[category] = [v for v in values if v is not None] if compact else values
+        grades['attendance'] = int(self.absences[row])
+        return grades
+
+    def _arrays(self):
+        arrays = [('scores', self.scores), ('missing', self.missing), ('absences', self.absences)]
+        if self.ids is not None:
+            arrays.append(('ids', self.ids))
+        return arrays
+
+    def save(self, path):
+        """Write a binary snapshot that ``load()`` can memory-map."""
+        header = {'version': 1, 'n_students': len(self), 'layout': self.layout, 'arrays': {}}
+        offset = HEADER_SIZE
+        for name, array in self._arrays():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset = _align(offset + array.nbytes)
+        encoded = json.dumps(header).encode()
+        if len(MAGIC) + 4 + len(encoded) > HEADER_SIZE:
+            raise ValueError("Gradebook layout is too large for the snapshot header")
+
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(encoded)))
+            f.write(encoded)
+            for name, array in self._arrays():
+                f.seek(header['arrays'][name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(offset)
+
+    @classmethod
+    def load(cls, path, mode='r'):
+        """Open a snapshot as memory-mapped arrays.
+
+        ``mode`` is passed to ``np.memmap``: ``'r'`` for read-only zero-copy
+        access, ``'r+'`` to edit the file in place, ``'c'`` for copy-on-write.
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a gradebook snapshot")
+            (length,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(length))
+        if header['version'] != 1:
+            raise ValueError(f"Unsupported gradebook version: {header['version']}")
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            shape = tuple(spec['shape'])
+            if 0 in shape:
+                arrays[name] = np.empty(shape, dtype=spec['dtype'])
+            else:
+                arrays[name] = np.memmap(path, dtype=spec['dtype'], mode=mode,
+                                         offset=spec['offset'], shape=shape)
+        return cls(header['layout'], arrays['scores'], arrays['missing'],
+                   arrays['absences'], arrays.get('ids'))
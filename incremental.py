@@ -0,0 +1,95 @@
+from grade_calculator import GradeCalculator
+
+
+class IncrementalGrade:
+    """Live grade for one student, updated in O(1) per score change.
+
+    Keeps a running sum and count of entered scores for every category, so
+    ``set_score``/``clear_score`` adjust the category and final grade by a
+    delta instead of rescanning the grade lists. Categories with drop or cap
+    rules are re-averaged on each change to them instead. ``final_grade`` and
+    ``breakdown()`` agree with ``GradeCalculator.calculate_grade`` on
+    ``to_grades()``.
+    """
+
+    def __init__(self, calc=None, grades=None):
+        self.calc = calc or GradeCalculator()
+        self.scores = {category: [None] * count for category, count in self.calc.assignment_counts.items()}
+        self.scores['extra_credit'] = [None]
+        self.sums = {category: 0.0 for category in self.scores}
+        self.counts = {category: 0 for category in self.scores}
+        self.absences = 0
+        self.final_grade = 0.0
+
+        for category, values in (grades or {}).items():
+            if category == 'attendance':
+                self.set_absences(values)
+                continue
+            for index, value in enumerate(values):
+                if value is not None:
+                    self.set_score(category, index, value)
+
+    def _average(self, category):
+        if category in self.calc.plan.rules:
+            # Drops and caps depend on every score, not just the running sum
+            return self.calc.plan.average(category, [g for g in self.scores[category] if g is not None])
+        return self.sums[category] / self.counts[category]
+
+    def _weighted(self, category):
+        if not self.counts[category]:
+            return 0.0
+        return self._average(category) * self.calc.weights[category]
+
+    def _update(self, category, index, new):
+        slots = self.scores[category]
+        old = slots[index]
+        before = self._weighted(category)
+        slots[index] = new
+        if old is not None:
+            self.sums[category] -= old
+            self.counts[category] -= 1
+        if new is not None:
+            self.sums[category] += new
+            self.counts[category] += 1
+        if not self.counts[category]:
+            # Reset so rounding error cannot survive an emptied category.
+            self.sums[category] = 0.0
+        self.final_grade += self._weighted(category) - before
+
+    def set_score(self, category, index, value):
+        """Enter or replace one score."""
+        slots = self.scores[category]
+        if index >= len(slots):
+            slots.extend([None] * (index + 1 - len(slots)))
+        self._update(category, index, value)
+
+    def clear_score(self, category, index):
+        """Remove one score, as if it had never been entered."""
+        self.set_score(category, index, None)
+
+    def set_absences(self, absences):
+        self.final_grade += (absences - self.absences) * self.calc.plan.penalty_per_absence
+        self.absences = absences
+
+    def breakdown(self):
+        """Return the breakdown dict in the ``calculate_grade`` format."""
+        breakdown = {}
+        for category, slots in self.scores.items():
+            if self.counts[category]:
+                avg = self._average(category)
+                breakdown[category] = {
+                    'grades': list(slots),
+                    'average': avg,
+                    'weighted': avg * self.calc.weights[category]
+                }
+        breakdown['attendance'] = {
+            'absences': self.absences,
+            'impact': self.absences * self.calc.plan.penalty_per_absence
+        }
+        return breakdown
+
+    def to_grades(self):
+        grades = {category: list(slots) for category, slots in self.scores.items()}
+        grades['attendance'] = self.absences
+        return grades
+
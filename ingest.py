@@ -0,0 +1,218 @@
+import csv
+import json
+import math
+import sys
+import time
+
+from grade_calculator import GradeCalculator
+
+def read_rows(path, fmt=None, calc=None):
+    """Yield (student, category, assignment, score) tuples from a CSV or JSONL export.
+
+    ``assignment`` is the 1-based assignment number within the category and is
+    ignored for ``attendance`` rows, whose score is the number of absences.
+    Empty scores are yielded as ``None``. With ``calc``, rows are checked
+    with a ``RowChecker`` as they are read. Bad rows raise ``ValueError``
+    naming the file and line.
+    """
+    if fmt is None:
+        fmt = 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+    stream = sys.stdin if path == '-' else open(path, newline='')
+    checker = RowChecker(calc) if calc is not None else None
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(stream)
+            records = ((reader.line_num, record) for record in reader)
+        elif fmt == 'jsonl':
+            records = ((n, line) for n, line in enumerate(stream, 1) if line.strip())
+        else:
+            raise ValueError(f"Unknown input format: {fmt}")
+
+        for line, record in records:
+            try:
+                row = parse_record(json.loads(record) if fmt == 'jsonl' else record)
+                if checker:
+                    checker.check(*row[:3])
+            except ValueError as error:
+                raise ValueError(f"{path}, line {line}: {error}") from None
+            yield row
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def parse_record(record):
+    """Normalize one export record (a dict) into a ``(student, category, assignment, score)`` tuple."""
+    score = record.get('score')
+    assignment = record.get('assignment')
+    return (
+        str(record['student']),
+        record['category'],
+        int(assignment) if assignment not in (None, '') else 1,
+        float(score) if score not in (None, '') else None
+    )
+
+
+class RowChecker:
+    """Rejects rows that would be silently misread when grouping students.
+
+    An assignment number must lie in ``1..count`` for its category, and a
+    student's rows must be contiguous: a student listed again after other
+    students would otherwise be graded as several partial students. Keeps
+    the ids of every finished student to tell.
+    """
+
+    def __init__(self, calc):
+        self.counts = dict(calc.assignment_counts, extra_credit=1)
+        self.current = None
+        self.finished = set()
+
+    def check(self, student, category, assignment):
+        if student != self.current:
+            if student in self.finished:
+                raise ValueError(f"Rows for student {student} are not contiguous; group the export by student")
+            if self.current is not None:
+                self.finished.add(self.current)
+            self.current = student
+        if category == 'attendance':
+            return
+        count = self.counts.get(category)
+        if count is None:
+            raise ValueError(f"Unknown category '{category}' for student {student}")
+        if not 1 <= assignment <= count:
+            raise ValueError(f"{category} assignment {assignment} for student {student} is outside 1..{count}")
+
+
+def iter_chunks(rows, chunk_size):
+    """Yield lists of at most ``chunk_size`` rows."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _empty_grades(calc):
+    grades = {category: [None] * count for category, count in calc.assignment_counts.items()}
+    grades['extra_credit'] = []
+    grades['attendance'] = 0
+    return grades
+
+
+def group_students(chunks, calc, check=True):
+    """Group chunked rows into per-student grade dicts.
+
+    Yields one list of ``(student, grades)`` pairs per chunk. Rows must be
+    grouped by student (as term exports are); a student whose rows straddle a
+    chunk boundary is carried over and emitted with the next chunk, so only one
+    partial student is ever held between chunks. Rows are checked with a
+    ``RowChecker`` unless ``check`` is false (``read_rows`` did it already).
+    """
+    checker = RowChecker(calc) if check else None
+    current_id = None
+    current = None
+    for chunk in chunks:
+        finished = []
+        for student, category, assignment, score in chunk:
+            if checker:
+                checker.check(student, category, assignment)
+            if student != current_id:
+                if current is not None:
+                    finished.append((current_id, current))
+                current_id, current = student, _empty_grades(calc)
+
+            if category == 'attendance':
+                current['attendance'] = score or 0
+                continue
+            slots = current[category]
+            if assignment > len(slots):
+                slots.extend([None] * (assignment - len(slots)))
+            slots[assignment - 1] = score
+        yield finished
+    if current is not None:
+        yield [(current_id, current)]
+
+
+def grade_groups(groups, calc):
+    """Grade each group of students with the batch grader and yield result rows."""
+    categories = list(calc.assignment_counts) + ['extra_credit']
+    for group in groups:
+        if not group:
+            continue
+        ids = [student for student, _ in group]
+        final_grades, breakdown = calc.calculate_grades_batch(
+            calc.roster_from_grades([grades for _, grades in group])
+        )
+        for row, student in enumerate(ids):
+            result = {'student': student, 'final_grade': final_grades[row]}
+            for category in categories:
+                result[f'{category}_average'] = breakdown[category]['average'][row]
+            result['attendance_impact'] = breakdown['attendance']['impact'][row]
+            yield result
+
+
+def persist_groups(groups, store, course):
+    """Save each group of students to a ``GradeStore`` before passing it on."""
+    for group in groups:
+        store.bulk_upsert(course, group)
+        yield group
+
+
+def write_results(results, out, calc):
+    """Write result rows to ``out`` as CSV, one row at a time. Returns the row count."""
+    fieldnames = (['student', 'final_grade'] +
+                  [f'{c}_average' for c in list(calc.assignment_counts) + ['extra_credit']] +
+                  ['attendance_impact'])
+    writer = csv.DictWriter(out, fieldnames=fieldnames)
+    writer.writeheader()
+    count = 0
+    for result in results:
+        writer.writerow({
+            key: value if isinstance(value, str) else ('' if math.isnan(value) else f'{value:.4f}')
+            for key, value in result.items()
+        })
+        count += 1
+    return count
+
+
+def run_pipeline(input_path, output_path='-', chunk_size=10000, fmt=None, calc=None,
+                 store=None, course='default'):
+    """Stream a gradebook export through parsing, grouping, grading and output.
+
+    Memory stays bounded by ``chunk_size`` regardless of the input size, apart
+    from the ids of students already graded (kept to reject students whose
+    rows are not contiguous). With
+    a ``GradeStore`` the parsed grades are also saved under ``course``.
+    Returns a dict of run statistics including ``rows_per_second``.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    calc = calc or GradeCalculator()
+    stats = {'rows': 0, 'students': 0}
+
+    def counted(rows):
+        for row in rows:
+            stats['rows'] += 1
+            yield row
+
+    start = time.perf_counter()
+    chunks = iter_chunks(counted(read_rows(input_path, fmt, calc)), chunk_size)
+    groups = group_students(chunks, calc, check=False)
+    if store is not None:
+        groups = persist_groups(groups, store, course)
+    results = grade_groups(groups, calc)
+
+    out = sys.stdout if output_path == '-' else open(output_path, 'w', newline='')
+    try:
+        stats['students'] = write_results(results, out, calc)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    stats['seconds'] = time.perf_counter() - start
+    stats['rows_per_second'] = stats['rows'] / stats['seconds'] if stats['seconds'] else 0.0
+    return stats
@@ -0,0 +1,294 @@
+import atexit
+import functools
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# Upper bounds in seconds, Prometheus style; the last bucket catches the rest.
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float('inf'))
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    """Thread-safe registry of counters and latency histograms keyed by (name, labels)."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+
+class NullSink:
+    """Disabled instrumentation: every hook is a no-op."""
+
+    enabled = False
+
+    def inc(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def flush(self):
+        pass
+
+
+class MetricsSink(NullSink):
+    """Base for sinks that record into a ``Metrics`` registry."""
+
+    enabled = True
+
+    def __init__(self):
+        self.metrics = Metrics()
+
+    def inc(self, name, value=1, **labels):
+        self.metrics.inc(name, value, **labels)
+
+    def observe(self, name, value, **labels):
+        self.metrics.observe(name, value, **labels)
+
+
+def _labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+
+class PrometheusSink(MetricsSink):
+    """Renders metrics in the Prometheus text exposition format."""
+
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path
+
+    def render(self):
+        lines = []
+        with self.metrics.lock:
+            for name in sorted({name for name, _ in self.metrics.counters}):
+                lines.append(f'# TYPE {name} counter')
+                for (n, labels), value in sorted(self.metrics.counters.items()):
+                    if n == name:
+                        lines.append(f'{name}{_labels(labels)} {value}')
+            for name in sorted({name for name, _ in self.metrics.histograms}):
+                lines.append(f'# TYPE {name} histogram')
+                for (n, labels), hist in sorted(self.metrics.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f'{name}_bucket{_labels(labels, [("le", le)])} {cumulative}')
+                    lines.append(f'{name}_sum{_labels(labels)} {hist.total}')
+                    lines.append(f'{name}_count{_labels(labels)} {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        if self.path is None:
+            sys.stderr.write(self.render())
+            return
+        with open(self.path, 'w') as f:
+            f.write(self.render())
+
+
+class JsonLogSink(MetricsSink):
+    """Writes a JSON snapshot of all metrics as one log line per flush."""
+
+    def __init__(self, stream=None):
+        super().__init__()
+        self.stream = stream or sys.stderr
+
+    def snapshot(self):
+        with self.metrics.lock:
+            return {
+                'timestamp': time.time(),
+                'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                             for (name, labels), value in self.metrics.counters.items()],
+                'histograms': [{'name': name, 'labels': dict(labels), 'count': hist.count, 'sum': hist.total,
+                                'buckets': [[bound if bound != float('inf') else '+Inf', count]
+                                            for bound, count in zip(hist.buckets, hist.counts)]}
+                               for (name, labels), hist in self.metrics.histograms.items()]
+            }
+
+    def flush(self):
+        self.stream.write(json.dumps(self.snapshot()) + '\n')
+        self.stream.flush()
+
+
+def _input_size(method, grades):
+    """Return (students, assignments) for the grades passed to a grading method."""
+    if method.endswith('_batch'):
+        students = len(grades['attendance']) if 'attendance' in grades else len(next(iter(grades.values()), ()))
+        assignments = sum(np.shape(v)[1] if np.ndim(v) > 1 else 1
+                          for k, v in grades.items() if k != 'attendance')
+        return students, assignments
+    return 1, sum(len(v) for k, v in grades.items() if k != 'attendance' and v)
+
+
+def _missing_count(grades):
+    """Scores the caller passed as an explicit ``None``.
+
+    Short lists and NaN padding are assignments not entered yet, not
+    missing work, so they are not counted.
+    """
+    missing = 0
+    for category, values in grades.items():
+        if category == 'attendance' or values is None:
+            continue
+        if isinstance(values, np.ndarray):
+            if values.dtype == object:
+                missing += int(np.equal(values, None).sum())
+            continue
+        for g in values:
+            if isinstance(g, (list, tuple, np.ndarray)):
+                missing += sum(1 for x in g if x is None)
+            elif g is None:
+                missing += 1
+    return missing
+
+
+def _unreachable_count(method, result):
+    if method == 'calculate_needed_grades_batch':
+        return int(result['unreachable'].sum())
+    if method == 'calculate_needed_grades' and result is not None:
+        return 1 if result['unreachable'] else 0
+    return 0
+
+
+INSTRUMENTED_METHODS = (
+    'calculate_grade',
+    'final_grade',
+    'calculate_needed_grades',
+    'calculate_grades_batch',
+    'calculate_needed_grades_batch'
+)
+
+
+def instrument(calc, sink):
+    """Wrap ``calc``'s grading methods so each call reports to ``sink``.
+
+    Records ``grading_calls_total``, a ``grading_latency_seconds`` histogram,
+    ``grading_students_total``/``grading_assignments_total`` input sizes,
+    ``grading_missing_scores_total`` (explicit ``None`` scores in the
+    input), ``grading_unreachable_total`` for
+    targets above what maximum scores can reach, and
+    ``grading_needed_none_total`` for ``calculate_needed_grades`` calls that
+    return ``None`` because no work remains. Only the outermost call is
+    recorded: grading methods the calculator calls internally (say
+    ``calculate_needed_grades`` grading through ``calculate_grades_batch``)
+    are not counted again. With a ``NullSink`` the calculator is returned
+    untouched, so disabled instrumentation costs nothing.
+    """
+    if not sink.enabled:
+        return calc
+    # Per-thread nesting depth of instrumented calls on this calculator
+    calls = threading.local()
+    for method in INSTRUMENTED_METHODS:
+        original = getattr(calc, method, None)
+        if original is not None:
+            setattr(calc, method, _wrap(calc, method, original, sink, calls))
+    return calc
+
+
+def _wrap(calc, method, func, sink, calls):
+    @functools.wraps(func)
+    def wrapper(grades, *args, **kwargs):
+        if getattr(calls, 'depth', 0):
+            return func(grades, *args, **kwargs)
+        calls.depth = 1
+        start = time.perf_counter()
+        try:
+            result = func(grades, *args, **kwargs)
+        finally:
+            calls.depth = 0
+        sink.observe('grading_latency_seconds', time.perf_counter() - start, method=method)
+        sink.inc('grading_calls_total', method=method)
+        students, assignments = _input_size(method, grades)
+        sink.inc('grading_students_total', students, method=method)
+        sink.inc('grading_assignments_total', assignments, method=method)
+        missing = _missing_count(grades)
+        if missing:
+            sink.inc('grading_missing_scores_total', missing, method=method)
+        unreachable = _unreachable_count(method, result)
+        if unreachable:
+            sink.inc('grading_unreachable_total', unreachable, method=method)
+        if method == 'calculate_needed_grades' and result is None:
+            sink.inc('grading_needed_none_total', method=method)
+        return result
+    return wrapper
+
+
+@contextmanager
+def timed(sink, name, **labels):
+    """Record the latency of a block (e.g. a Streamlit render) as ``<name>_seconds``."""
+    if not sink.enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sink.observe(f'{name}_seconds', time.perf_counter() - start, **labels)
+        sink.inc(f'{name}_total', **labels)
+
+
+def flush_periodically(sink, interval=60.0):
+    """Flush ``sink`` every ``interval`` seconds from a daemon thread, and once more at exit.
+
+    For long-running processes such as the Streamlit app, where flushing
+    after every rerun would write a full snapshot per widget change.
+    """
+    if not sink.enabled:
+        return sink
+
+    def run():
+        while True:
+            time.sleep(interval)
+            sink.flush()
+
+    threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+    atexit.register(sink.flush)
+    return sink
+
+
+def sink_from_name(name, path=None):
+    """Build a sink from a CLI/env name: ``prometheus``, ``json`` or ``none``."""
+    if name in (None, '', 'none'):
+        return NullSink()
+    if name == 'prometheus':
+        return PrometheusSink(path)
+    if name == 'json':
+        return JsonLogSink(open(path, 'a') if path else None)
+    raise ValueError(f"Unknown metrics sink: {name}")
@@ -0,0 +1,465 @@
+"""Sync scores from an LMS export API into graded results.
+
+The export API serves one paginated score listing per course section:
+
+    GET {base}/sections/{section}/scores?page={n}
+    -> {"rows": [{"student": ..., "category": ..., "assignment": ..., "score": ...}, ...],
+        "next_page": n + 1 or null}
+
+Rows use the ``ingest`` export fields. ``sync_sections`` fetches sections
+concurrently, grades each one as it arrives and writes the results in
+batches. ``StandInLMS`` serves generated sections locally for testing and
+benchmarking:
+
+    python lms_sync.py --stand-in 200 --output results.csv
+    python lms_sync.py --url https://lms.example.edu/api --sections sections.txt --db grades.db
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import random
+import ssl
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+from grade_calculator import GradeCalculator
+from ingest import group_students, parse_record
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """A page could not be fetched; ``retryable`` says whether trying again may help."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class Connection:
+    """One persistent HTTP/1.1 connection, reopened when the server closes it.
+
+    Each fetcher owns one, so every page after the first reuses the socket
+    instead of paying for a new TCP (and TLS) handshake.
+    """
+
+    def __init__(self, base_url, timeout=30.0):
+        url = urlparse(base_url)
+        if url.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {url.scheme}")
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == 'https' else 80)
+        self.ssl = ssl.create_default_context() if url.scheme == 'https' else None
+        self.prefix = url.path.rstrip('/')
+        self.timeout = timeout
+        self.reader = self.writer = None
+        self.opened = 0
+
+    async def _open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        self.opened += 1
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def get_json(self, path):
+        """GET ``path`` (relative to the base URL) and decode the JSON body.
+
+        A reused connection that fails before answering has usually been
+        closed by the server while idle, so it is reopened and the request
+        sent once more straight away; other failures raise a retryable
+        ``FetchError``.
+        """
+        while True:
+            reused = self.writer is not None
+            try:
+                return await asyncio.wait_for(self._get(self.prefix + path), self.timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as error:
+                self.close()
+                if not reused or isinstance(error, asyncio.TimeoutError):
+                    raise FetchError(f"GET {path} failed: {error!r}") from None
+
+    async def _get(self, path):
+        if self.writer is None:
+            await self._open()
+        self.writer.write(f'GET {path} HTTP/1.1\r\nHost: {self.host}\r\n'
+                          'Accept: application/json\r\nConnection: keep-alive\r\n\r\n'.encode('latin-1'))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        parts = status_line.split()
+        if len(parts) < 2 or not parts[1].isdigit():
+            # Empty when the server closed the connection instead of answering
+            raise ConnectionResetError(f"Bad status line {status_line!r}")
+        status = int(parts[1])
+        headers = {}
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+
+        if status != 200:
+            raise FetchError(f"GET {path} returned {status}", retryable=status in RETRY_STATUSES)
+        return json.loads(body)
+
+
+async def fetch_section(conn, section, retries=5, backoff=0.1, max_backoff=5.0, rng=random, stats=None):
+    """All score rows of one section, following ``next_page`` links.
+
+    Failed pages are retried up to ``retries`` times with exponential backoff
+    and full jitter (a random wait up to ``backoff * 2**attempt`` seconds,
+    capped at ``max_backoff``), so fetchers that fail together do not retry
+    in lockstep.
+    """
+    rows = []
+    page = 1
+    while page is not None:
+        path = f'/sections/{quote(str(section), safe="")}/scores?page={page}'
+        for attempt in range(retries + 1):
+            try:
+                data = await conn.get_json(path)
+                break
+            except FetchError as error:
+                if not error.retryable or attempt == retries:
+                    raise
+                if stats is not None:
+                    stats['retries'] += 1
+                await asyncio.sleep(rng.uniform(0, min(max_backoff, backoff * 2 ** attempt)))
+        rows.extend(parse_record(record) for record in data['rows'])
+        page = data.get('next_page')
+        if stats is not None:
+            stats['pages'] += 1
+    return rows
+
+
+class ResultWriter:
+    """Writes graded sections in batches: result rows to CSV and/or scores to a ``GradeStore``.
+
+    All writes happen on one dedicated thread so the event loop keeps
+    fetching while a batch is flushed. Without a ``course``, each section is
+    stored as its own course.
+    """
+
+    COLUMNS = ['section', 'student', 'final_grade']
+
+    def __init__(self, calc, output=None, db=None, course=None, batch_size=1000):
+        self.calc = calc
+        self.batch_size = batch_size
+        self.course = course
+        self.pending = []
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.batches = 0
+        self.out = self.writer = self.store = None
+        if output:
+            self.out = sys.stdout if output == '-' else open(output, 'w', newline='')
+            self.writer = csv.writer(self.out)
+            self.writer.writerow(self.COLUMNS + [f'{c}_average' for c in self.categories()] +
+                                 ['attendance_impact'])
+        if db:
+            from storage import GradeStore
+            self.store = GradeStore(db, calc)
+
+    def categories(self):
+        return list(self.calc.assignment_counts) + ['extra_credit']
+
+    async def add(self, section, students, final_grades, breakdown):
+        self.pending.append((section, students, final_grades, breakdown))
+        if sum(len(students) for _, students, _, _ in self.pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if self.pending:
+            batch, self.pending = self.pending, []
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._write, batch)
+            self.batches += 1
+
+    def _write(self, batch):
+        for section, students, final_grades, breakdown in batch:
+            if self.writer:
+                averages = [breakdown[c]['average'] for c in self.categories()]
+                impact = breakdown['attendance']['impact']
+                for row, (student, _) in enumerate(students):
+                    values = [final_grades[row]] + [a[row] for a in averages] + [impact[row]]
+                    self.writer.writerow([section, student] +
+                                         ['' if math.isnan(v) else f'{v:.4f}' for v in values])
+            if self.store:
+                self.store.bulk_upsert(self.course or str(section), students)
+        if self.out:
+            self.out.flush()
+
+    def close(self):
+        self.executor.shutdown()
+        if self.out and self.out is not sys.stdout:
+            self.out.close()
+        if self.store:
+            self.store.close()
+
+
+async def sync_sections(base_url, sections, calc=None, output=None, db=None, course=None, concurrency=8,
+                        queue_size=16, batch_size=1000, retries=5, backoff=0.1, timeout=30.0,
+                        sample_interval=0.5, seed=None):
+    """Fetch, grade and write every section; returns run statistics.
+
+    ``concurrency`` fetchers each reuse one connection and push fetched
+    sections into a queue of at most ``queue_size`` sections. A single
+    grading stage drains it, batch-grading each section off the event loop,
+    so when grading falls behind the queue fills and fetchers wait instead
+    of buffering the whole export. Results go to ``output`` (CSV, ``'-'`` for
+    stdout) and/or the ``db`` gradebook in batches of ``batch_size`` students.
+
+    Sections that still fail after ``retries`` are listed under ``failed``.
+    If grading or writing fails, the fetchers are cancelled and the error is
+    raised.
+    Statistics include ``sections_per_second`` end to end and
+    ``queue_depth``: ``(seconds, sections waiting)`` samples every
+    ``sample_interval`` seconds.
+    """
+    calc = calc or GradeCalculator()
+    rng = random.Random(seed)
+    todo = asyncio.Queue()
+    for section in sections:
+        todo.put_nowait(section)
+    fetched = asyncio.Queue(maxsize=queue_size)
+    stats = {'sections': 0, 'pages': 0, 'students': 0, 'retries': 0, 'connections': 0,
+             'failed': [], 'queue_depth': [], 'max_queue_depth': 0}
+    writer = ResultWriter(calc, output, db, course, batch_size)
+    start = time.perf_counter()
+
+    async def fetcher():
+        conn = Connection(base_url, timeout)
+        try:
+            while True:
+                try:
+                    section = todo.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    rows = await fetch_section(conn, section, retries, backoff, rng=rng, stats=stats)
+                    students = [pair for group in group_students([rows], calc) for pair in group]
+                except (FetchError, ValueError, KeyError) as error:
+                    stats['failed'].append((section, str(error)))
+                    continue
+                # Blocks while the grading stage is behind
+                await fetched.put((section, students))
+        finally:
+            stats['connections'] += conn.opened
+            conn.close()
+
+    def grade(students):
+        return calc.calculate_grades_batch(calc.roster_from_grades([grades for _, grades in students]))
+
+    async def grader():
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await fetched.get()
+            if item is None:
+                break
+            section, students = item
+            if students:
+                final_grades, breakdown = await loop.run_in_executor(None, grade, students)
+                await writer.add(section, students, final_grades, breakdown)
+            stats['sections'] += 1
+            stats['students'] += len(students)
+        await writer.flush()
+
+    async def monitor():
+        while True:
+            depth = fetched.qsize()
+            stats['queue_depth'].append((round(time.perf_counter() - start, 3), depth))
+            stats['max_queue_depth'] = max(stats['max_queue_depth'], depth)
+            await asyncio.sleep(sample_interval)
+
+    async def unless_grading_fails(awaitable):
+        # A dead grader never drains the queue, so anything waiting on it
+        # would block forever; raise the grader's error instead.
+        task = asyncio.ensure_future(awaitable)
+        try:
+            await asyncio.wait([task, grading], return_when=asyncio.FIRST_COMPLETED)
+            if not task.done():
+                grading.result()
+            return task.result()
+        finally:
+            task.cancel()
+            # Let cancelled fetchers close their connections
+            await asyncio.gather(task, return_exceptions=True)
+
+    sampler = asyncio.create_task(monitor())
+    grading = asyncio.create_task(grader())
+    try:
+        await unless_grading_fails(asyncio.gather(*(fetcher() for _ in range(max(1, concurrency)))))
+        await unless_grading_fails(fetched.put(None))
+        await grading
+    finally:
+        grading.cancel()
+        sampler.cancel()
+        writer.close()
+
+    stats['batches'] = writer.batches
+    stats['seconds'] = time.perf_counter() - start
+    stats['sections_per_second'] = stats['sections'] / stats['seconds'] if stats['seconds'] else 0.0
+    return stats
+
+
+class StandInLMS:
+    """Local stand-in for the LMS export API, serving generated sections.
+
+    Section ``i`` (``'S0001'`` and so on) has ``students`` students with
+    deterministic random scores, served ``page_size`` rows per page over
+    keep-alive HTTP/1.1. ``latency`` delays every response and
+    ``failure_rate`` answers that fraction of requests with 503 to exercise
+    retries. Use as a context manager; ``url`` is its base URL.
+    """
+
+    def __init__(self, n_sections=100, students=40, page_size=200, latency=0.0, failure_rate=0.0, seed=0):
+        self.sections = [f'S{i:04d}' for i in range(1, n_sections + 1)]
+        self.students = students
+        self.page_size = page_size
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.requests = 0
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.thread = None
+
+    def rows(self, section):
+        """Every score row of ``section``, grouped by student as exports are."""
+        rng = random.Random(f'{self.seed}:{section}')
+        rows = []
+        for n in range(self.students):
+            student = f'{section}-{n:03d}'
+            for category, count, cap in [('homeworks', 5, 130), ('quizzes', 4, 100),
+                                         ('projects', 4, 130), ('exams', 2, 100), ('extra_credit', 1, 100)]:
+                for assignment in range(1, count + 1):
+                    score = None if rng.random() < 0.1 else round(rng.uniform(40, cap), 1)
+                    rows.append({'student': student, 'category': category,
+                                 'assignment': assignment, 'score': score})
+            rows.append({'student': student, 'category': 'attendance', 'assignment': None,
+                         'score': rng.randint(0, 5)})
+        return rows
+
+    def _handler(self):
+        lms = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with lms.lock:
+                    lms.requests += 1
+                    fail = lms.rng.random() < lms.failure_rate
+                if lms.latency:
+                    time.sleep(lms.latency)
+                url = urlparse(self.path)
+                parts = url.path.strip('/').split('/')
+                if fail:
+                    return self._send(503, {'error': 'unavailable'})
+                if len(parts) != 3 or parts[0] != 'sections' or parts[2] != 'scores' \
+                        or parts[1] not in lms.sections:
+                    return self._send(404, {'error': 'not found'})
+                page = int(parse_qs(url.query).get('page', ['1'])[0])
+                rows = lms.rows(parts[1])
+                start = (page - 1) * lms.page_size
+                more = start + lms.page_size < len(rows)
+                self._send(200, {'rows': rows[start:start + lms.page_size], 'next_page': page + 1 if more else None})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sync LMS section scores into graded results")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--url', help="base URL of the LMS export API")
+    source.add_argument('--stand-in', type=int, metavar='N', help="sync N generated sections from a local stand-in LMS")
+    parser.add_argument('--sections', metavar='PATH', help="file of section ids, one per line (with --url)")
+    parser.add_argument('--output', help="CSV file for graded results ('-' for stdout)")
+    parser.add_argument('--db', metavar='PATH', help="SQLite gradebook to save the synced scores to")
+    parser.add_argument('--course', help="course code in --db (default: one course per section)")
+    parser.add_argument('--policy', metavar='PATH', help="grading policy file (default: the built-in policy)")
+    parser.add_argument('--concurrency', type=int, default=8, help="concurrent section fetches (default: 8)")
+    parser.add_argument('--queue-size', type=int, default=16, help="fetched sections waiting to be graded (default: 16)")
+    parser.add_argument('--batch-size', type=int, default=1000, help="students per result write (default: 1000)")
+    parser.add_argument('--retries', type=int, default=5, help="retries per page (default: 5)")
+    parser.add_argument('--latency', type=float, default=0.0, help="stand-in response delay in seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="stand-in fraction of 503 responses")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    calc = GradeCalculator.from_file(args.policy) if args.policy else GradeCalculator()
+
+    def run(url, sections):
+        return asyncio.run(sync_sections(url, sections, calc, args.output, args.db, args.course,
+                                         args.concurrency, args.queue_size, args.batch_size, args.retries))
+
+    if args.stand_in:
+        with StandInLMS(args.stand_in, latency=args.latency, failure_rate=args.failure_rate) as lms:
+            stats = run(lms.url, lms.sections)
+    else:
+        if not args.sections:
+            raise SystemExit("--sections is required with --url")
+        with open(args.sections) as f:
+            stats = run(args.url, [line.strip() for line in f if line.strip()])
+
+    print(f"Synced {stats['sections']} sections ({stats['students']} students, {stats['pages']} pages) "
+          f"in {stats['seconds']:.2f}s ({stats['sections_per_second']:,.1f} sections/s, "
+          f"{stats['retries']} retries, peak queue depth {stats['max_queue_depth']})", file=sys.stderr)
+    for section, error in stats['failed']:
+        print(f"Failed to sync {section}: {error}", file=sys.stderr)
+    json.dump({'queue_depth': stats['queue_depth']}, sys.stderr)
+    print(file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
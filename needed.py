@@ -0,0 +1,236 @@
+import itertools
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class NeededGradeTable:
+    """Memoized ``calculate_needed_grades`` answers, keyed on a normalized state signature.
+
+    Under a plain policy the completed-course grade depends only on how many
+    assignments remain per category and the floor grade (the completed
+    grade with zero on all of them), so many students share one entry. The
+    signature is the remaining counts, the floor grade rounded to
+    ``precision`` points, and the target; answers are solved from the
+    rounded floor with ``GradeCalculator.solve_remaining``, so the target is
+    met to within ``precision / 2`` grade points. Remaining weights are
+    computed once per combination of remaining counts.
+
+    Policies with category rules have no such reduction (drops and caps
+    depend on the individual scores), so their signature is the full set
+    of entered scores and answers are exact.
+
+    Entries live in a bounded LRU of ``maxsize`` entries and the table is
+    safe to share between threads. ``hits``, ``misses`` and ``evictions``
+    count lookups; ``warm`` precomputes every entry for a grade range.
+    """
+
+    def __init__(self, calc, precision=0.1, maxsize=100000):
+        if precision <= 0:
+            raise ValueError("precision must be positive")
+        self.calc = calc
+        self.precision = precision
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.combos = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _state(self, grades):
+        """Remaining counts per category, the floor grade and the current grade, in one pass.
+
+        Both grades are only computed under a plain policy.
+        """
+        weights = self.calc.weights
+        remaining = []
+        current = floor = grades.get('attendance', 0) * self.calc.plan.penalty_per_absence
+        for category, count in self.calc.assignment_counts.items():
+            valid = [g for g in grades.get(category) or [] if g is not None]
+            remaining.append(max(count - len(valid), 0))
+            if valid and not self.calc.plan.rules:
+                points = sum(valid) * weights[category]
+                current += points / len(valid)
+                floor += points / max(len(valid), count)
+        extra = [g for g in grades.get('extra_credit') or [] if g is not None]
+        if extra:
+            points = sum(extra) / len(extra) * weights['extra_credit']
+            current += points
+            floor += points
+        return tuple(remaining), floor, current
+
+    def _combo(self, remaining):
+        """``(remaining_weights, total_remaining_weight)`` for one set of remaining counts."""
+        combo = self.combos.get(remaining)
+        if combo is None:
+            weights = {
+                category: self.calc.weights[category] * left / count if left else 0
+                for (category, count), left in zip(self.calc.assignment_counts.items(), remaining)
+            }
+            combo = self.combos.setdefault(remaining, (weights, sum(weights.values())))
+        return combo
+
+    def _state_key(self, grades, remaining, floor):
+        """The target-independent part of the signature."""
+        if self.calc.plan.rules:
+            scores = tuple(
+                (category, tuple(sorted(g for g in grades.get(category) or [] if g is not None)))
+                for category in list(self.calc.assignment_counts) + ['extra_credit']
+            )
+            return scores, grades.get('attendance', 0)
+        return remaining, round(floor / self.precision)
+
+    def signature(self, grades, target):
+        """The cache key for ``grades`` and ``target``, or ``None`` when no work remains."""
+        remaining, floor, _ = self._state(grades)
+        if not self._combo(remaining)[1]:
+            return None
+        return self._state_key(grades, remaining, floor) + (float(target),)
+
+    def _get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def _plain_entries(self, remaining, buckets, targets):
+        """Entries for every bucket x target of one combination: rows of
+        ``(points_needed, needed_average, secured, unreachable, max_achievable)``.
+        """
+        floor = np.asarray(buckets, dtype=float) * self.precision
+        targets = np.asarray(targets, dtype=float)
+        needed_average, max_achievable = self.calc.solve_remaining(floor, remaining, targets)
+        points_needed = targets[np.newaxis, :] - floor[:, np.newaxis]
+        max_achievable = np.broadcast_to(max_achievable[:, np.newaxis], points_needed.shape)
+        return [list(zip(*columns)) for columns in zip(
+            points_needed.tolist(), needed_average.tolist(), (points_needed <= 0).tolist(),
+            (targets[np.newaxis, :] > max_achievable).tolist(), max_achievable.tolist())]
+
+    def needed(self, grades, target):
+        """``calculate_needed_grades(grades, target)``, memoized.
+
+        Returns ``None`` when no work remains. Under a plain policy
+        ``points_needed`` and ``max_achievable`` come from the rounded floor
+        grade the answer was solved from.
+        """
+        return self.needed_many(grades, [target])[0]
+
+    def needed_many(self, grades, targets):
+        """``needed`` for several targets, normalizing ``grades`` and solving misses only once."""
+        remaining, floor, current = self._state(grades)
+        if not self._combo(remaining)[1]:
+            return [None for _ in targets]
+        state = self._state_key(grades, remaining, floor)
+        keys = [state + (float(target),) for target in targets]
+        entries = [self._get(key) for key in keys]
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        if missing and self.calc.plan.rules:
+            result = self.calc.calculate_needed_grades_batch(self.calc.roster_from_grades([grades]),
+                                                             [targets[i] for i in missing])
+            for i, entry in zip(missing, self.calc.needed_results(result)):
+                entries[i] = entry
+        elif missing:
+            entries_for = self._plain_entries(remaining, [state[1]], [keys[i][-1] for i in missing])[0]
+            for i, entry in zip(missing, entries_for):
+                entries[i] = entry
+        for i in missing:
+            self._put(keys[i], entries[i])
+        return [self._result(remaining, current, entry) for entry in entries]
+
+    def _result(self, remaining, current, entry):
+        if self.calc.plan.rules:
+            return dict(entry, remaining_weights=dict(entry['remaining_weights']))
+        points_needed, needed_average, secured, unreachable, max_achievable = entry
+        return {
+            'current_grade': current,
+            'points_needed': points_needed,
+            'needed_average': needed_average,
+            'remaining_weights': dict(self._combo(remaining)[0]),
+            'max_achievable': max_achievable,
+            'secured': secured,
+            'unreachable': unreachable
+        }
+
+    def warm(self, targets, low=0.0, high=100.0):
+        """Precompute entries for floor grades in ``[low, high]`` and ``targets``.
+
+        Covers every combination of remaining assignment counts, solved in
+        one vectorized call per combination, for as many combinations as fit
+        in ``maxsize``; the rest are skipped with a logged warning and filled
+        on demand. Only plain policies can be warmed. Returns the number of
+        entries added.
+        """
+        if self.calc.plan.rules:
+            raise ValueError("Tables for policies with category rules depend on every score and cannot be warmed")
+        targets = [float(t) for t in targets]
+        buckets = list(range(round(low / self.precision), round(high / self.precision) + 1))
+        combos = [remaining for remaining in itertools.product(
+            *(range(count + 1) for count in self.calc.assignment_counts.values())) if any(remaining)]
+        per_combo = len(buckets) * len(targets)
+        fits = min(len(combos), self.maxsize // per_combo) if per_combo else len(combos)
+        if fits < len(combos):
+            logger.warning("Warming %d of %d needed-grade entries: %d of %d combinations of remaining counts "
+                           "do not fit in maxsize %d", fits * per_combo, len(combos) * per_combo,
+                           len(combos) - fits, len(combos), self.maxsize)
+
+        for remaining in combos[:fits]:
+            rows = self._plain_entries(remaining, buckets, targets)
+            with self.lock:
+                for bucket, row in zip(buckets, rows):
+                    for target, entry in zip(targets, row):
+                        self.entries[(remaining, bucket, target)] = entry
+        with self.lock:
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return fits * per_combo
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+_TABLES = {}
+_TABLES_LOCK = threading.Lock()
+
+
+def needed_table(calc, precision=0.1, maxsize=100000):
+    """The process-wide table for ``calc``'s policy, so every front end shares one cache.
+
+    ``precision`` and ``maxsize`` apply when the table is first created.
+    """
+    with _TABLES_LOCK:
+        table = _TABLES.get(calc.plan.key)
+        if table is None:
+            table = _TABLES[calc.plan.key] = NeededGradeTable(calc, precision, maxsize)
+        return table
@@ -0,0 +1,129 @@
+import math
+
+import numpy as np
+
+
+def category_sum_counts(remaining, levels):
+    """Count the ways ``remaining`` items, each scored 0..levels-1 steps, reach each total.
+
+    Element ``j`` of the result is the number of score combinations whose
+    total is ``j`` steps, built by repeated convolution instead of a
+    cartesian product.
+    """
+    item = np.ones(levels)
+    counts = np.ones(1)
+    for _ in range(remaining):
+        counts = np.convolve(counts, item)
+    return counts
+
+
+def _frontier(base, terms, target, step, max_points):
+    """Pareto-minimal per-category totals (in steps) that reach ``target``.
+
+    The category with the most reachable totals is solved for in closed form;
+    every combination of the others is enumerated on the step grid. Returns
+    ``None`` when that grid would have more than ``max_points`` points.
+    """
+    order = sorted(terms, key=lambda t: t['levels'])
+    solved, enumerated = order[-1], order[:-1]
+    shape = tuple(t['levels'] for t in enumerated)
+    if math.prod(shape) > max_points:
+        return None
+
+    need = np.full(shape, target - base)
+    for axis, t in enumerate(enumerated):
+        totals = np.arange(t['levels']) * step * t['coef']
+        need = need - totals.reshape([-1 if a == axis else 1 for a in range(len(shape))])
+    # Smallest total on the solved category; a tiny slack absorbs rounding.
+    last = np.asarray(np.maximum(np.ceil(need / (solved['coef'] * step) - 1e-9), 0))
+    last[last > solved['levels'] - 1] = np.inf
+
+    minimal = np.isfinite(last)
+    for axis in range(len(shape)):
+        lower = np.take(last, range(shape[axis] - 1), axis=axis)
+        upper = np.take(last, range(1, shape[axis]), axis=axis)
+        # Dropping this category by one step must cost something on the
+        # solved one, otherwise the point is dominated.
+        dominated = np.zeros(shape, dtype=bool)
+        index = [slice(None)] * len(shape)
+        index[axis] = slice(1, None)
+        dominated[tuple(index)] = lower <= upper
+        minimal &= ~dominated
+
+    points = np.argwhere(minimal)
+    steps = np.column_stack([points, last[minimal]])
+    names = [t['category'] for t in enumerated] + [solved['category']]
+    remaining = np.array([t['remaining'] for t in enumerated] + [solved['remaining']])
+    return {
+        'categories': names,
+        'averages': steps * step / remaining,
+        'truncated': False
+    }
+
+
+def explore_outcomes(calc, grades, targets=(70, 80, 90), step=1.0, resolution=0.01, frontier=False,
+                     max_frontier_points=2000000):
+    """Enumerate every reachable final grade over the remaining assignments.
+
+    Each remaining homework/quiz/project/exam is scored on a grid of ``step``
+    points up to its ``max_scores`` cap. Per-category totals are counted by
+    convolution (``category_sum_counts``) and combined by convolving their
+    contributions to the final grade on a ``resolution``-wide grid, so the
+    work grows with the number of distinct totals rather than the number of
+    score combinations.
+
+    Returns the final ``grades`` grid, the share of combinations landing on
+    each grade (``probability``), the ``min_grade``/``max_grade`` reachable,
+    and for each target the share of combinations reaching it. Shares are
+    exact up to the ``resolution`` binning of the final grade.
+
+    With ``frontier=True`` each target also gets a ``frontier``: the
+    Pareto-minimal average needed on the remaining items of each category.
+    Unlike ``calculate_needed_grades``, which gives one uniform average, it
+    shows every trade-off between categories. Its grid grows with the
+    product of the per-category totals, so above ``max_frontier_points``
+    the frontier is left empty and marked ``truncated``; a coarser ``step``
+    shrinks it.
+    """
+    base, plan = calc.completion_plan(grades)
+    terms = []
+    for category, (coef, remaining) in plan.items():
+        levels = int(calc.max_scores[category] // step) + 1
+        terms.append({
+            'category': category,
+            'coef': coef,
+            'remaining': remaining,
+            'levels': remaining * (levels - 1) + 1,
+            'counts': category_sum_counts(remaining, levels)
+        })
+
+    distribution = np.ones(1)
+    for t in terms:
+        bins = np.rint(np.arange(len(t['counts'])) * step * t['coef'] / resolution).astype(np.int64)
+        distribution = np.convolve(distribution, np.bincount(bins, weights=t['counts']))
+    grades_grid = base + np.arange(len(distribution)) * resolution
+    probability = distribution / distribution.sum()
+    reachable = np.flatnonzero(distribution)
+
+    results = {}
+    for target in targets:
+        result = {'probability': float(probability[grades_grid >= target - resolution / 2].sum())}
+        if frontier and not terms:
+            result['frontier'] = None
+        elif frontier:
+            empty = {'categories': [t['category'] for t in terms],
+                     'averages': np.empty((0, len(terms))), 'truncated': False}
+            if base + sum(t['coef'] * (t['levels'] - 1) * step for t in terms) < target:
+                result['frontier'] = empty
+            else:
+                result['frontier'] = (_frontier(base, terms, target, step, max_frontier_points) or
+                                      dict(empty, truncated=True))
+        results[target] = result
+
+    return {
+        'grades': grades_grid,
+        'probability': probability,
+        'min_grade': grades_grid[reachable[0]],
+        'max_grade': grades_grid[reachable[-1]],
+        'targets': results
+    }
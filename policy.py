@@ -0,0 +1,259 @@
+import hashlib
+import heapq
+import json
+import os
+
+import numpy as np
+
+DEFAULT_POLICY = {
+    'weights': {
+        'homeworks': 0.15,
+        'quizzes': 0.15,
+        'projects': 0.20,
+        'exams': 0.50,
+        'extra_credit': 0.07,
+        'attendance': -0.05
+    },
+    'assignment_counts': {
+        'homeworks': 5,
+        'quizzes': 4,
+        'projects': 4,
+        'exams': 2
+    },
+    'max_scores': {
+        'homeworks': 130,
+        'quizzes': 100,
+        'projects': 130,
+        'exams': 100,
+        'extra_credit': 100
+    },
+    # The full attendance weight is lost at this many absences
+    'max_absences': 5,
+    # Per-category selection and cap rules, e.g.
+    # {'quizzes': {'drop_lowest': 1}, 'homeworks': {'keep_best': 4, 'item_cap': 100}}
+    'category_rules': {}
+}
+
+
+def load_policy(path):
+    """Read a grading policy from a JSON, TOML or YAML file.
+
+    Keys left out of the file fall back to ``DEFAULT_POLICY``; a file that
+    sets ``assignment_counts`` replaces the whole category list.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.json':
+        with open(path) as f:
+            data = json.load(f)
+    elif ext == '.toml':
+        import tomllib
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    elif ext in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML policies need PyYAML (pip install pyyaml)") from None
+        with open(path) as f:
+            data = yaml.safe_load(f) or {}
+    else:
+        raise ValueError(f"Unknown policy format: {path}")
+    if not isinstance(data, dict):
+        raise ValueError(f"Policy file {path} must contain a mapping")
+    return {key: data.get(key, default) for key, default in DEFAULT_POLICY.items()}
+
+
+def policy_hash(policy):
+    """Stable hash of a policy's contents, used as the plan cache key."""
+    normalized = json.dumps(policy, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class CategoryRule:
+    """How one category turns its entered scores into an average.
+
+    Each score is first capped at ``item_cap``. Of the ``n`` scores entered,
+    the ``counted(n)`` highest are averaged: the lowest ``drop_lowest`` are
+    dropped and at most ``keep_best`` kept, but never fewer than
+    ``min_count`` (or all of them, if fewer were entered). The average is
+    then capped at ``category_cap``. Selection is partial (a heap for one
+    student, ``np.partition`` for a roster), so only the dropped or kept
+    side is ever ordered.
+    """
+
+    def __init__(self, category, drop_lowest=0, keep_best=None, item_cap=None, category_cap=None,
+                 min_count=1):
+        if not isinstance(drop_lowest, int) or drop_lowest < 0:
+            raise ValueError(f"drop_lowest for '{category}' must be a non-negative integer")
+        if keep_best is not None and (not isinstance(keep_best, int) or keep_best < 1):
+            raise ValueError(f"keep_best for '{category}' must be a positive integer")
+        if not isinstance(min_count, int) or min_count < 1:
+            raise ValueError(f"min_count for '{category}' must be a positive integer")
+        self.category = category
+        self.drop_lowest = drop_lowest
+        self.keep_best = keep_best
+        self.item_cap = item_cap
+        self.category_cap = category_cap
+        self.min_count = min_count
+
+    def counted(self, entered):
+        """Number of scores that count when ``entered`` are in (scalar or array)."""
+        kept = entered - self.drop_lowest
+        if self.keep_best is not None:
+            kept = np.minimum(kept, self.keep_best)
+        return np.maximum(kept, np.minimum(self.min_count, entered))
+
+    def average(self, scores):
+        """Average of a list of entered scores under this rule; ``None`` if empty."""
+        if not scores:
+            return None
+        if self.item_cap is not None:
+            scores = [min(g, self.item_cap) for g in scores]
+        n = int(self.counted(len(scores)))
+        dropped = len(scores) - n
+        if dropped == 0:
+            total = sum(scores)
+        elif n <= dropped:
+            total = sum(heapq.nlargest(n, scores))
+        else:
+            total = sum(scores) - sum(heapq.nsmallest(dropped, scores))
+        avg = total / n
+        if self.category_cap is not None:
+            avg = min(avg, self.category_cap)
+        return avg
+
+    def average_batch(self, scores, counts):
+        """Row-wise ``average`` of an (N, M) score matrix with NaN for missing.
+
+        ``counts`` holds the entered scores per row. Rows with nothing
+        entered average to NaN.
+        """
+        scores = np.array(scores, dtype=np.float64)
+        if self.item_cap is not None:
+            np.minimum(scores, self.item_cap, out=scores)
+        kept = self.counted(counts)
+        dropped = counts - kept
+        totals = np.nansum(scores, axis=1)
+        most_dropped = int(dropped.max(initial=0))
+        most_kept = int(kept.max(initial=0))
+        rows = np.arange(len(scores))
+        if most_dropped and most_kept < most_dropped:
+            # Fewer kept than dropped: sum the kept side directly. Missing
+            # scores become -inf so they sort below every entered one.
+            top = -np.partition(np.where(np.isnan(scores), np.inf, -scores), most_kept - 1, axis=1)[:, :most_kept]
+            top = np.cumsum(-np.sort(-top, axis=1), axis=1)
+            totals = np.where(kept > 0, top[rows, np.maximum(kept - 1, 0)], 0.0)
+        elif most_dropped:
+            low = np.partition(np.where(np.isnan(scores), np.inf, scores), most_dropped - 1, axis=1)[:, :most_dropped]
+            low = np.cumsum(np.sort(low, axis=1), axis=1)
+            totals = totals - np.where(dropped > 0, low[rows, np.maximum(dropped - 1, 0)], 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg = totals / kept
+        if self.category_cap is not None:
+            avg = np.minimum(avg, self.category_cap)
+        return avg
+
+
+class GradingPlan:
+    """A policy compiled into a flat coefficient vector over a fixed slot layout.
+
+    Every assignment slot (``layout`` lists ``(category, count)`` in slot
+    order, extra credit last with one slot) gets the coefficient
+    ``weight / count``. When every slot is entered, the category averages
+    expand to exactly that dot product, so a fully-entered student is graded
+    with one ``sum`` over the slots plus ``absences * penalty_per_absence``.
+    Partially-entered categories, and policies with ``category_rules``, fall
+    back to averaging the entered scores per category.
+    """
+
+    def __init__(self, policy):
+        weights = dict(policy['weights'])
+        counts = dict(policy['assignment_counts'])
+        max_scores = dict(policy['max_scores'])
+        max_absences = policy['max_absences']
+        weights.setdefault('extra_credit', 0.0)
+        weights.setdefault('attendance', 0.0)
+        max_scores.setdefault('extra_credit', 100)
+        for category, count in counts.items():
+            if category in ('extra_credit', 'attendance'):
+                raise ValueError(f"'{category}' cannot be an assignment category")
+            if not isinstance(count, int) or count < 1:
+                raise ValueError(f"assignment count for '{category}' must be a positive integer")
+            if category not in weights or category not in max_scores:
+                raise ValueError(f"category '{category}' needs a weight and a max score")
+        unknown = set(weights) - set(counts) - {'extra_credit', 'attendance'}
+        if unknown:
+            raise ValueError(f"weights given for unknown categories: {', '.join(sorted(unknown))}")
+        if max_absences < 1:
+            raise ValueError("max_absences must be at least 1")
+        rules = {}
+        for category, options in (policy.get('category_rules') or {}).items():
+            if category not in counts:
+                raise ValueError(f"category rules given for unknown category '{category}'")
+            try:
+                rules[category] = CategoryRule(category, **options)
+            except TypeError:
+                raise ValueError(f"unknown option in category rules for '{category}'") from None
+            if rules[category].drop_lowest >= counts[category]:
+                raise ValueError(f"drop_lowest for '{category}' must be below its assignment count")
+
+        self.policy = policy
+        self.key = policy_hash(policy)
+        self.weights = weights
+        self.assignment_counts = counts
+        self.max_scores = max_scores
+        self.max_absences = max_absences
+        self.rules = rules
+        self.penalty_per_absence = weights['attendance'] / max_absences
+        self.layout = list(counts.items()) + [('extra_credit', 1)]
+        self.coefficients = tuple(weights[category] / count
+                                  for category, count in self.layout for _ in range(count))
+
+    def final_grade(self, grades):
+        """Final grade for one student in the dict-of-lists format."""
+        if self.rules:
+            return self._final_grade_partial(grades)
+        flat = []
+        for category, count in self.layout:
+            values = grades.get(category)
+            if not values or len(values) != count or None in values:
+                return self._final_grade_partial(grades)
+            flat.extend(values)
+        return sum(map(float.__mul__, self.coefficients, map(float, flat))) + \
+            grades.get('attendance', 0) * self.penalty_per_absence
+
+    def _final_grade_partial(self, grades):
+        final_grade = 0.0
+        for category, values in grades.items():
+            if category == 'attendance':
+                final_grade += values * self.penalty_per_absence
+                continue
+            valid = [g for g in values or [] if g is not None]
+            if not valid:
+                continue
+            rule = self.rules.get(category)
+            avg = rule.average(valid) if rule else sum(valid) / len(valid)
+            final_grade += avg * self.weights[category]
+        return final_grade
+
+    def average(self, category, valid):
+        """Category average of a non-empty list of entered scores."""
+        rule = self.rules.get(category)
+        return rule.average(valid) if rule else sum(valid) / len(valid)
+
+
+_PLANS = {}
+
+
+def compile_policy(policy=None):
+    """Return the ``GradingPlan`` for ``policy``, compiling it at most once per process."""
+    policy = DEFAULT_POLICY if policy is None else policy
+    key = policy_hash(policy)
+    plan = _PLANS.get(key)
+    if plan is None:
+        plan = _PLANS.setdefault(key, GradingPlan(policy))
+    return plan
+
+
+def load_plan(path):
+    return compile_policy(load_policy(path))
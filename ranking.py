@@ -0,0 +1,277 @@
+import math
+from bisect import bisect_left, bisect_right, insort
+
+import numpy as np
+
+
+class SortedGrades:
+    """A sorted multiset of grades kept in blocks of at most ``2 * load`` values.
+
+    An insert or delete shifts one short block instead of the whole list,
+    and a Fenwick tree over the block lengths maps between blocks and
+    positions in O(log n), so updates stay cheap however large the class.
+    Supports ``len``, indexing and ``bisect_left``/``bisect_right``.
+    """
+
+    def __init__(self, values=(), load=1000):
+        values = sorted(values)
+        self.load = load
+        self.blocks = [values[i:i + load] for i in range(0, len(values), load)]
+        self.maxes = [block[-1] for block in self.blocks]
+        self.size = len(values)
+        self._build()
+
+    def _build(self):
+        # Fenwick tree over block lengths (1-based), built in O(blocks)
+        tree = [0] + [len(block) for block in self.blocks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def _grow(self, block, delta):
+        i = block + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def _before(self, block):
+        """Number of values in the blocks before ``block``."""
+        total = 0
+        i = block
+        while i:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def __len__(self):
+        return self.size
+
+    def add(self, value):
+        if not self.blocks:
+            self.blocks.append([value])
+            self.maxes.append(value)
+            self.size = 1
+            self._build()
+            return
+        b = min(bisect_left(self.maxes, value), len(self.blocks) - 1)
+        block = self.blocks[b]
+        insort(block, value)
+        self.maxes[b] = block[-1]
+        self.size += 1
+        if len(block) > 2 * self.load:
+            self.blocks[b:b + 1] = [block[:self.load], block[self.load:]]
+            self.maxes[b:b + 1] = [self.blocks[b][-1], block[-1]]
+            self._build()
+        else:
+            self._grow(b, 1)
+
+    def remove(self, value):
+        """Remove one occurrence of ``value``, which must be present."""
+        b = bisect_left(self.maxes, value)
+        block = self.blocks[b]
+        del block[bisect_left(block, value)]
+        self.size -= 1
+        if block:
+            self.maxes[b] = block[-1]
+            self._grow(b, -1)
+        else:
+            del self.blocks[b]
+            del self.maxes[b]
+            self._build()
+
+    def bisect_left(self, value):
+        b = bisect_left(self.maxes, value)
+        if b == len(self.blocks):
+            return self.size
+        return self._before(b) + bisect_left(self.blocks[b], value)
+
+    def bisect_right(self, value):
+        b = bisect_right(self.maxes, value)
+        if b == len(self.blocks):
+            return self.size
+        return self._before(b) + bisect_right(self.blocks[b], value)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("SortedGrades index out of range")
+        # Descend the Fenwick tree to the last block starting at or before ``index``
+        block = 0
+        step = 1 << (len(self.tree) - 1).bit_length() - 1
+        while step:
+            if block + step < len(self.tree) and self.tree[block + step] <= index:
+                block += step
+                index -= self.tree[block]
+            step >>= 1
+        return self.blocks[block][index]
+
+    def __iter__(self):
+        for block in self.blocks:
+            yield from block
+
+
+class CohortStats:
+    """Order statistics for a class's final grades, kept up to date per score.
+
+    Grades are held in a ``SortedGrades`` alongside running sums, so each
+    ``update`` is a binary search plus an insert into one short block (no
+    re-sort, no O(n) shift), and rank, percentile and quantile lookups are
+    O(log n). Mean and standard deviation come from the running sums, which
+    the curve helpers use.
+    """
+
+    def __init__(self, grades=None):
+        # Built with one sort rather than an insert per student
+        self.grades = {student: float(grade) for student, grade in (grades or {}).items()}
+        self.sorted = SortedGrades(self.grades.values())
+        self.total = math.fsum(self.sorted)
+        self.total_squares = math.fsum(grade * grade for grade in self.sorted)
+
+    @classmethod
+    def from_calculator(cls, calc, students):
+        """Build from ``{student: grades}`` dicts, grading the whole class in one batch."""
+        ids = list(students)
+        final_grades, _ = calc.calculate_grades_batch(calc.roster_from_grades([students[s] for s in ids]))
+        return cls(dict(zip(ids, final_grades.tolist())))
+
+    def __len__(self):
+        return len(self.sorted)
+
+    def update(self, student, grade):
+        """Add a student's final grade or replace their previous one."""
+        self.remove(student)
+        grade = float(grade)
+        self.grades[student] = grade
+        self.sorted.add(grade)
+        self.total += grade
+        self.total_squares += grade * grade
+
+    def remove(self, student):
+        grade = self.grades.pop(student, None)
+        if grade is None:
+            return
+        self.sorted.remove(grade)
+        self.total -= grade
+        self.total_squares -= grade * grade
+        if not self.sorted:
+            # Reset so rounding error cannot survive an emptied class.
+            self.total = self.total_squares = 0.0
+
+    @property
+    def mean(self):
+        return self.total / len(self.sorted) if self.sorted else math.nan
+
+    @property
+    def std(self):
+        """Population standard deviation of the class's grades."""
+        if not self.sorted:
+            return math.nan
+        return math.sqrt(max(self.total_squares / len(self.sorted) - self.mean ** 2, 0.0))
+
+    def rank(self, student):
+        """1-based rank from the top; tied students share the best rank."""
+        return len(self.sorted) - self.sorted.bisect_right(self.grades[student]) + 1
+
+    def percentile_rank(self, grade):
+        """Percent of the class below ``grade``, counting ties as half (0-100)."""
+        if not self.sorted:
+            return math.nan
+        below = self.sorted.bisect_left(grade)
+        ties = self.sorted.bisect_right(grade) - below
+        return 100.0 * (below + 0.5 * ties) / len(self.sorted)
+
+    def student_percentile(self, student):
+        return self.percentile_rank(self.grades[student])
+
+    def quantiles(self, qs=(0.25, 0.5, 0.75)):
+        """Linearly interpolated quantiles (``qs`` in 0-1), as ``np.quantile`` computes them."""
+        n = len(self.sorted)
+        if not n:
+            return [math.nan for _ in qs]
+        result = []
+        for q in qs:
+            position = q * (n - 1)
+            lower = math.floor(position)
+            upper = min(lower + 1, n - 1)
+            result.append(self.sorted[lower] + (self.sorted[upper] - self.sorted[lower]) * (position - lower))
+        return result
+
+    def histogram(self, edges=(0, 60, 70, 80, 90, math.inf)):
+        """Counts per ``[edges[i], edges[i+1])`` bin, one search per edge."""
+        positions = [self.sorted.bisect_left(edge) for edge in edges]
+        return [after - before for before, after in zip(positions, positions[1:])]
+
+    def summary(self):
+        low, median, high = self.quantiles()
+        return {
+            'count': len(self.sorted),
+            'mean': self.mean,
+            'std': self.std,
+            'min': self.sorted[0] if self.sorted else math.nan,
+            'q1': low,
+            'median': median,
+            'q3': high,
+            'max': self.sorted[-1] if self.sorted else math.nan
+        }
+
+    def curve(self, method, **params):
+        """Return a function mapping raw final grades to curved ones under the current stats.
+
+        Methods:
+        - ``'shift'``: add a constant so the class mean becomes ``target_mean``.
+        - ``'zscore'``: rescale to ``target_mean`` and ``target_std``.
+        - ``'top'``: scale so the top grade becomes ``top`` (default 100).
+
+        ``cap`` (default none) bounds curved grades from above, and with
+        ``no_lower=True`` a curve never lowers anyone's grade. The function
+        accepts scalars or NumPy arrays.
+        """
+        if not self.sorted:
+            raise ValueError("Cannot curve an empty class")
+        if method == 'shift':
+            shift = params.pop('target_mean') - self.mean
+
+            def apply(grade):
+                return grade + shift
+        elif method == 'zscore':
+            target_mean, target_std = params.pop('target_mean'), params.pop('target_std')
+            mean, std = self.mean, self.std
+            if std == 0:
+                raise ValueError("Cannot z-score a class whose grades are all equal")
+
+            def apply(grade):
+                return target_mean + (grade - mean) / std * target_std
+        elif method == 'top':
+            best = self.sorted[-1]
+            if best <= 0:
+                raise ValueError("Cannot normalize to a top grade that is not positive")
+            scale = params.pop('top', 100.0) / best
+
+            def apply(grade):
+                return grade * scale
+        else:
+            raise ValueError(f"Unknown curve: {method}")
+
+        cap = params.pop('cap', None)
+        no_lower = params.pop('no_lower', False)
+        if params:
+            raise ValueError(f"Unknown curve parameters: {', '.join(params)}")
+
+        def curved(grade):
+            value = apply(grade)
+            if no_lower:
+                value = np.maximum(value, grade)
+            if cap is not None:
+                value = np.minimum(value, cap)
+            return value
+        return curved
+
+    def curved_grades(self, method, **params):
+        """``{student: curved grade}`` for the whole class."""
+        curve = self.curve(method, **params)
+        ids = list(self.grades)
+        values = curve(np.array([self.grades[s] for s in ids]))
+        return dict(zip(ids, values.tolist()))
@@ -0,0 +1,281 @@
+import csv
+import io
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+from urllib.parse import quote
+
+from gpa import letter_grades
+from grade_calculator import GradeCalculator
+
+FORMATS = ('csv', 'json', 'html')
+
+
+def format_breakdown(calc, breakdown):
+    """Plain-text breakdown of one ``calculate_grade`` result, as the CLI menu prints it."""
+    lines = []
+    for category, count in calc.assignment_counts.items():
+        lines.append(f"{category.title()} ({calc.weights[category]:.0%}):")
+        b = breakdown.get(category)
+        if b:
+            lines.append(f"  Grades: {b['grades']}")
+            lines.append(f"  Average: {b['average']:.2f}%")
+            lines.append(f"  Weighted: {b['weighted']:.2f}%")
+            lines.append(f"  Completed: {sum(g is not None for g in b['grades'])}/{count}")
+        lines.append("")
+
+    lines.append(f"Extra Credit ({calc.weights['extra_credit']:.0%}):")
+    if 'extra_credit' in breakdown:
+        ec = breakdown['extra_credit']
+        lines.append(f"  Score: {ec['grades'][0]}%")
+        lines.append(f"  Weighted: {ec['weighted']:.2f}%")
+    lines.append("")
+
+    penalty = calc.weights['attendance'] * 100
+    lines.append(f"Attendance ({penalty:.0f}%):")
+    if 'attendance' in breakdown:
+        att = breakdown['attendance']
+        lines.append(f"  Absences: {att['absences']}/{calc.plan.max_absences}")
+        lines.append(f"  Impact: {att['impact']:.2f}% (0 = no penalty, {penalty:.0f} = max penalty)")
+    return '\n'.join(lines)
+
+
+def _number(value, digits=2):
+    return '' if math.isnan(value) else f'{value:.{digits}f}'
+
+
+class ReportTemplates:
+    """Report-card renderers specialized to one policy's categories.
+
+    The CSV columns and the HTML page (one table row per category) are laid
+    out once here, so rendering a student is a single ``format_map`` call.
+    """
+
+    def __init__(self, calc):
+        self.calc = calc
+        self.categories = list(calc.assignment_counts) + ['extra_credit']
+        self.columns = ['student', 'final_grade', 'letter']
+        for category in self.categories:
+            self.columns += [f'{category}_average', f'{category}_weighted', f'{category}_completed']
+        self.columns += ['absences', 'attendance_impact']
+
+        rows = ''.join(
+            f'<tr><th>{escape(category.replace("_", " ").title())} ({calc.weights[category]:.0%})</th>'
+            f'<td>{{{category}_grades}}</td><td>{{{category}_average}}</td>'
+            f'<td>{{{category}_weighted}}</td><td>{{{category}_completed}}</td></tr>\n'
+            for category in self.categories
+        )
+        # Braces in the static markup are doubled so only the fields are substituted
+        self.html = (
+            '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Report card: {student}</title>\n'
+            '<style>body{{font-family:sans-serif;margin:2em}}table{{border-collapse:collapse}}'
+            'td,th{{border:1px solid #ccc;padding:4px 8px;text-align:left}}</style></head>\n'
+            '<body><h1>Report card: {student}</h1>\n'
+            '<p>Final grade: <strong>{final_grade}%</strong> ({letter})</p>\n'
+            '<table><tr><th>Category</th><th>Scores</th><th>Average</th><th>Weighted</th><th>Completed</th></tr>\n'
+            + rows +
+            '<tr><th>Attendance</th><td>{absences} absences</td><td></td><td>{attendance_impact}</td><td></td></tr>\n'
+            '</table></body></html>\n'
+        )
+
+    def records(self, group):
+        """Grade a list of ``(student, grades)`` pairs in one batch and yield report records."""
+        calc = self.calc
+        final_grades, breakdown = calc.calculate_grades_batch(
+            calc.roster_from_grades([grades for _, grades in group]))
+        letters, _ = letter_grades(final_grades)
+        for row, (student, grades) in enumerate(group):
+            absences = grades.get('attendance', 0)
+            if isinstance(absences, float) and absences.is_integer():
+                absences = int(absences)
+            record = {
+                'student': student,
+                'final_grade': float(final_grades[row]),
+                'letter': str(letters[row]),
+                'categories': {},
+                'absences': absences,
+                'attendance_impact': float(breakdown['attendance']['impact'][row])
+            }
+            for category in self.categories:
+                scores = grades.get(category) or []
+                record['categories'][category] = {
+                    'grades': scores,
+                    'average': float(breakdown[category]['average'][row]),
+                    'weighted': float(breakdown[category]['weighted'][row]),
+                    'completed': int(breakdown[category]['count'][row]),
+                    'count': calc.assignment_counts.get(category, 1)
+                }
+            yield record
+
+    def csv_row(self, record):
+        row = [record['student'], _number(record['final_grade'], 4), record['letter']]
+        for category in self.categories:
+            c = record['categories'][category]
+            row += [_number(c['average'], 4), _number(c['weighted'], 4), c['completed']]
+        row += [record['absences'], _number(record['attendance_impact'], 4)]
+        return row
+
+    def json_line(self, record):
+        def clean(value):
+            return None if isinstance(value, float) and math.isnan(value) else value
+
+        categories = {
+            category: {key: clean(value) for key, value in c.items()}
+            for category, c in record['categories'].items()
+        }
+        return json.dumps(dict(record, categories=categories), separators=(',', ':')) + '\n'
+
+    def html_page(self, record):
+        fields = {
+            'student': escape(record['student']),
+            'final_grade': _number(record['final_grade']),
+            'letter': record['letter'],
+            'absences': record['absences'],
+            'attendance_impact': _number(record['attendance_impact'])
+        }
+        for category, c in record['categories'].items():
+            fields[f'{category}_grades'] = ', '.join('&mdash;' if g is None else f'{g:g}' for g in c['grades'])
+            fields[f'{category}_average'] = _number(c['average']) or '&mdash;'
+            fields[f'{category}_weighted'] = _number(c['weighted'])
+            fields[f'{category}_completed'] = f"{c['completed']}/{c['count']}"
+        return self.html.format_map(fields)
+
+
+def report_path(directory, student, copy=1):
+    """Where a student's HTML report card goes; ids are percent-encoded into safe file names.
+
+    The ``copy``-th card for a repeated id gets a ``~<copy>`` suffix; ``~``
+    is encoded in the id itself, so the suffix cannot collide with another id.
+    """
+    name = quote(student, safe='').replace('~', '%7E')
+    return os.path.join(directory, name + (f'~{copy}' if copy > 1 else '') + '.html')
+
+
+# Set once per worker process by ``_init_worker``
+_worker = {}
+
+
+def _init_worker(policy, html_dir, formats):
+    _worker['templates'] = ReportTemplates(GradeCalculator(policy))
+    _worker['html_dir'] = html_dir
+    _worker['formats'] = formats
+
+
+def _render_group(group, copies=None):
+    """Render one group: HTML pages are written here, CSV and JSON text is returned to the writer.
+
+    ``copies`` numbers each student's occurrence of their id, for ``report_path``.
+    """
+    templates, formats = _worker['templates'], _worker['formats']
+    csv_text = io.StringIO()
+    writer = csv.writer(csv_text)
+    json_lines = []
+    for row, record in enumerate(templates.records(group)):
+        if 'csv' in formats:
+            writer.writerow(templates.csv_row(record))
+        if 'json' in formats:
+            json_lines.append(templates.json_line(record))
+        if 'html' in formats:
+            path = report_path(_worker['html_dir'], record['student'], copies[row] if copies else 1)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(templates.html_page(record))
+    return len(group), csv_text.getvalue(), ''.join(json_lines)
+
+
+def render_reports(groups, out_dir, calc=None, formats=FORMATS, workers=None, max_pending=None):
+    """Render report cards for groups of ``(student, grades)`` pairs into ``out_dir``.
+
+    Writes ``report_cards.csv`` (one row per student), ``report_cards.jsonl``
+    (one JSON object per student) and ``html/<student>.html`` for the
+    requested ``formats``; a repeated id gets ``html/<student>~2.html`` and so
+    on rather than overwriting the first card. Each group is graded in one
+    batch and rendered on a ``ProcessPoolExecutor`` (``workers=0`` renders
+    inline); every worker builds its templates once. At most ``max_pending``
+    groups (default two per worker) are in flight and results are written in
+    input order as they finish, so memory stays flat however many students
+    there are, apart from the ids seen when writing HTML. Returns run
+    statistics including ``students_per_second``.
+    """
+    formats = tuple(formats)
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown report formats: {', '.join(sorted(unknown))}")
+    calc = calc or GradeCalculator()
+    html_dir = os.path.join(out_dir, 'html')
+    os.makedirs(html_dir if 'html' in formats else out_dir, exist_ok=True)
+    columns = ReportTemplates(calc).columns
+
+    start = time.perf_counter()
+    stats = {'students': 0, 'groups': 0}
+    seen = {}
+
+    def copies(group):
+        """Number each id's occurrences across the run, so repeated ids get their own pages."""
+        if 'html' not in formats:
+            return None
+        numbers = []
+        for student, _ in group:
+            seen[student] = seen.get(student, 0) + 1
+            numbers.append(seen[student])
+        return numbers
+
+    csv_file = open(os.path.join(out_dir, 'report_cards.csv'), 'w', newline='') if 'csv' in formats else None
+    json_file = open(os.path.join(out_dir, 'report_cards.jsonl'), 'w') if 'json' in formats else None
+    executor = None
+    try:
+        if csv_file:
+            csv.writer(csv_file).writerow(columns)
+
+        def write(result):
+            count, csv_text, json_text = result
+            stats['students'] += count
+            stats['groups'] += 1
+            if csv_file:
+                csv_file.write(csv_text)
+            if json_file:
+                json_file.write(json_text)
+
+        if workers == 0:
+            _init_worker(calc.plan.policy, html_dir, formats)
+            for group in groups:
+                if group:
+                    write(_render_group(group, copies(group)))
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                           initargs=(calc.plan.policy, html_dir, formats))
+            limit = max_pending or 2 * (workers or os.cpu_count() or 1)
+            pending = deque()
+            for group in groups:
+                if not group:
+                    continue
+                pending.append(executor.submit(_render_group, group, copies(group)))
+                if len(pending) >= limit:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        for f in (csv_file, json_file):
+            if f:
+                f.close()
+
+    stats['seconds'] = time.perf_counter() - start
+    stats['students_per_second'] = stats['students'] / stats['seconds'] if stats['seconds'] else 0.0
+    return stats
+
+
+def render_export(input_path, out_dir, chunk_size=10000, fmt=None, calc=None, formats=FORMATS, workers=None):
+    """Stream a CSV/JSONL gradebook export (as ``ingest`` reads it) into report cards."""
+    from ingest import group_students, iter_chunks, read_rows
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    calc = calc or GradeCalculator()
+    groups = group_students(iter_chunks(read_rows(input_path, fmt, calc), chunk_size), calc, check=False)
+    return render_reports(groups, out_dir, calc, formats, workers)
+
@@ -0,0 +1,133 @@
+import numpy as np
+
+
+def _category_scores(roster, category, count, n):
+    scores = roster.get(category)
+    if scores is None:
+        return np.full((n, count), np.nan)
+    scores = np.asarray(scores, dtype=float).reshape(n, -1)
+    if scores.shape[1] < count:
+        scores = np.hstack([scores, np.full((n, count - scores.shape[1]), np.nan)])
+    return scores
+
+
+def leverage(calc, roster):
+    """Marginal effect of one point on every assignment slot, for a whole roster.
+
+    ``roster`` is in the ``calculate_grades_batch`` format. For each category
+    (extra credit included) returns (N, slots) arrays:
+
+    - ``entered``: whether the slot has a score.
+    - ``current``: grade points gained now per point on the slot. An entered
+      score moves its category mean by ``1 / entered``; entering a new one
+      also grows the denominator, so each point is worth ``w / (entered + 1)``
+      and the grade only rises once the score beats ``break_even``.
+    - ``break_even``: for a missing slot, the score that leaves the current
+      grade unchanged (the category average; 0 for an empty category). Under
+      drop/best-k rules it is the lowest counted score when a new score
+      would have to displace one.
+    - ``final``: grade points per point once every assignment is in
+      (``w / count`` for a plain mean).
+
+    Category rules are taken into account at the current scores: dropped
+    items, items at ``item_cap`` and categories at ``category_cap`` have no
+    leverage, and counted items share the weight over the counted number.
+    """
+    n = len(roster['attendance'])
+    report = {}
+    for category, count in list(calc.assignment_counts.items()) + [('extra_credit', 1)]:
+        weight = calc.weights[category]
+        scores = _category_scores(roster, category, count, n)
+        width = scores.shape[1]
+        entered = ~np.isnan(scores)
+        n_entered = entered.sum(axis=1)
+        totals = np.where(entered, scores, 0.0).sum(axis=1)
+        rule = calc.plan.rules.get(category)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if rule is None:
+                average = totals / n_entered
+                current_entered = np.broadcast_to((weight / n_entered)[:, np.newaxis], (n, width))
+                current_missing = weight / (n_entered + 1)
+                final = np.full((n, width), weight / np.maximum(count, n_entered)[:, np.newaxis])
+            else:
+                capped = scores if rule.item_cap is None else np.minimum(scores, rule.item_cap)
+                kept = rule.counted(n_entered)
+                # An entered item counts if it ranks among the ``kept`` best
+                order = np.argsort(-np.where(entered, capped, -np.inf), axis=1, kind='stable')
+                ranks = np.empty_like(order)
+                np.put_along_axis(ranks, order, np.broadcast_to(np.arange(width), (n, width)), axis=1)
+                counted = entered & (ranks < kept[:, np.newaxis])
+                average = rule.average_batch(scores, n_entered)
+                open_cap = np.ones(n, dtype=bool) if rule.category_cap is None else ~(average >= rule.category_cap)
+                below_item_cap = True if rule.item_cap is None else scores < rule.item_cap
+                current_entered = np.where(counted & below_item_cap & open_cap[:, np.newaxis],
+                                           (weight / kept)[:, np.newaxis], 0.0)
+
+                # A new score either joins a growing counted set (break-even at
+                # the counted mean) or replaces the lowest counted score
+                best = np.take_along_axis(np.where(entered, capped, 0.0), order, axis=1)
+                kept_total = np.take_along_axis(np.cumsum(best, axis=1), np.maximum(kept - 1, 0)[:, np.newaxis],
+                                                axis=1)[:, 0]
+                lowest_kept = best[np.arange(n), np.maximum(kept - 1, 0)]
+                grows = rule.counted(n_entered + 1) > kept
+                average = np.where(n_entered == 0, 0.0,
+                                   np.where(grows, kept_total / kept, lowest_kept))
+                current_missing = np.where(grows, weight / rule.counted(n_entered + 1), weight / kept)
+                reachable = open_cap if rule.item_cap is None else open_cap & (average < rule.item_cap)
+                current_missing = np.where(reachable, current_missing, 0.0)
+                final_kept = rule.counted(np.maximum(count, n_entered))
+                final = np.where(entered & ~counted, 0.0, (weight / final_kept)[:, np.newaxis])
+
+        # Slots past the category's assignment count are not assignments
+        valid = entered | (np.arange(width) < count)
+        report[category] = {
+            'entered': entered,
+            'current': np.where(entered, current_entered, current_missing[:, np.newaxis]),
+            'break_even': np.where(entered, np.nan, np.where(n_entered > 0, average, 0.0)[:, np.newaxis]),
+            'final': np.where(valid, final, np.nan)
+        }
+    return report
+
+
+def leverage_report(calc, roster, top=5, include_entered=False, ids=None):
+    """Rank each student's highest-leverage assignments.
+
+    Items are ordered by ``final`` (points per point once all work is in),
+    then by ``current``. Only missing assignments are ranked unless
+    ``include_entered``. Returns one list per student (or a dict keyed by
+    ``ids``) of up to ``top`` items: ``category``, 1-based ``assignment``,
+    ``entered``, ``final``, ``current`` and ``break_even``.
+    """
+    report = leverage(calc, roster)
+    labels = [(category, index) for category, parts in report.items()
+              for index in range(parts['final'].shape[1])]
+    final = np.hstack([parts['final'] for parts in report.values()])
+    current = np.hstack([parts['current'] for parts in report.values()])
+    break_even = np.hstack([parts['break_even'] for parts in report.values()])
+    entered = np.hstack([parts['entered'] for parts in report.values()])
+
+    eligible = ~np.isnan(final) & (include_entered | ~entered)
+    primary = np.where(eligible, final, -np.inf)
+    secondary = np.where(eligible, current, -np.inf)
+    k = min(top, final.shape[1])
+    # lexsort is ascending and uses its last key first
+    order = np.lexsort((-secondary, -primary), axis=1)[:, :k]
+
+    ranked = []
+    for row in range(len(final)):
+        items = []
+        for slot in order[row]:
+            if not eligible[row, slot]:
+                break
+            category, index = labels[slot]
+            items.append({
+                'category': category,
+                'assignment': index + 1,
+                'entered': bool(entered[row, slot]),
+                'final': float(final[row, slot]),
+                'current': float(current[row, slot]),
+                'break_even': None if entered[row, slot] else float(break_even[row, slot])
+            })
+        ranked.append(items)
+    return ranked if ids is None else dict(zip(ids, ranked))
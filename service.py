@@ -0,0 +1,231 @@
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+from grade_calculator import GradeCalculator
+
+MAX_CONTENT_LENGTH = 32 * 1024 * 1024
+MAX_BULK_STUDENTS = 100000
+BULK_BATCH_SIZE = 1000
+
+
+class ResponseCache:
+    """Bounded LRU of JSON responses keyed on a hash of the normalized payload."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(endpoint, payload):
+        normalized = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(f'{endpoint}:{normalized}'.encode()).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _is_number(value):
+    """True for JSON numbers; ``true``/``false`` are not scores even though ``bool`` is an ``int``."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def normalize_grades(calc, grades):
+    """Validate a grades payload and coerce scores to floats (``None`` = missing)."""
+    if not isinstance(grades, dict):
+        raise BadRequest("grades must be an object")
+    normalized = {}
+    for category, value in grades.items():
+        if category == 'attendance':
+            if not _is_number(value) or not 0 <= value <= calc.plan.max_absences:
+                raise BadRequest(f"attendance must be a number of absences between 0 and {calc.plan.max_absences}")
+            normalized[category] = value
+            continue
+        if category not in calc.weights:
+            raise BadRequest(f"unknown category '{category}'")
+        if not isinstance(value, list):
+            raise BadRequest(f"{category} must be a list of scores")
+        scores = []
+        for g in value:
+            if g is not None and (not _is_number(g) or not 0 <= g <= calc.max_scores[category]):
+                raise BadRequest(f"{category} scores must be between 0 and {calc.max_scores[category]}")
+            scores.append(None if g is None else float(g))
+        normalized[category] = scores
+    return normalized
+
+
+def _clean(value):
+    """Make NumPy scalars and NaN JSON-serializable."""
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _iter_ndjson(stream):
+    """Yield one record per NDJSON line; unparseable lines yield ``None``."""
+    for line in stream:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def create_app(calc=None, cache_size=10000, max_bulk_students=MAX_BULK_STUDENTS):
+    """Build the grading service around one shared ``GradeCalculator``."""
+    calc = calc or GradeCalculator()
+    cache = ResponseCache(cache_size)
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+
+    @app.errorhandler(BadRequest)
+    def bad_request(error):
+        return jsonify({'error': str(error)}), 400
+
+    @app.errorhandler(413)
+    def too_large(error):
+        return jsonify({'error': f"request body exceeds {MAX_CONTENT_LENGTH} bytes"}), 413
+
+    def cached(endpoint, payload, compute):
+        key = ResponseCache.key(endpoint, payload)
+        body = cache.get(key)
+        if body is None:
+            body = json.dumps(_clean(compute()))
+            cache.put(key, body)
+        return Response(body, mimetype='application/json')
+
+    @app.get('/health')
+    def health():
+        return jsonify({'status': 'ok', 'cache': {'entries': len(cache.entries),
+                                                  'hits': cache.hits, 'misses': cache.misses}})
+
+    @app.post('/grade')
+    def grade():
+        """Grade one student: ``{"grades": {...}}``."""
+        payload = request.get_json(silent=True) or {}
+        grades = normalize_grades(calc, payload.get('grades'))
+
+        def compute():
+            final_grade, breakdown = calc.calculate_grade(grades)
+            return {'final_grade': final_grade, 'breakdown': breakdown}
+        return cached('grade', grades, compute)
+
+    @app.post('/needed')
+    def needed():
+        """Needed averages per target: ``{"grades": {...}, "targets": [70, 80, 90]}``."""
+        payload = request.get_json(silent=True) or {}
+        grades = normalize_grades(calc, payload.get('grades'))
+        targets = payload.get('targets', [70, 80, 90])
+        if not isinstance(targets, list) or not all(_is_number(t) for t in targets):
+            raise BadRequest("targets must be a list of numbers")
+
+        def compute():
+            # Every target in one solve
+            result = calc.calculate_needed_grades_batch(calc.roster_from_grades([grades]), targets)
+            results = calc.needed_results(result)
+            return {'current_grade': calc.final_grade(grades),
+                    'targets': {str(target): entry for target, entry in zip(targets, results)}}
+        return cached('needed', {'grades': grades, 'targets': targets}, compute)
+
+    @app.post('/what-if')
+    def what_if():
+        """Compare current grades with hypothetical ones: ``{"grades": {...}, "hypothetical": {...}}``."""
+        payload = request.get_json(silent=True) or {}
+        grades = normalize_grades(calc, payload.get('grades'))
+        hypothetical = dict(grades)
+        hypothetical.update(normalize_grades(calc, payload.get('hypothetical') or {}))
+
+        def compute():
+            current = calc.final_grade(grades)
+            new_final_grade, new_breakdown = calc.calculate_grade(hypothetical)
+            return {'current_grade': current, 'hypothetical_grade': new_final_grade,
+                    'difference': new_final_grade - current, 'breakdown': new_breakdown}
+        return cached('what-if', {'grades': grades, 'hypothetical': hypothetical}, compute)
+
+    @app.post('/grade/bulk')
+    def grade_bulk():
+        """Grade many students; body is a JSON array or NDJSON of ``{"id", "grades"}``.
+
+        Results stream back as NDJSON, graded ``BULK_BATCH_SIZE`` students at a
+        time with ``calculate_grades_batch``.
+        """
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            students = _iter_ndjson(request.stream)
+        else:
+            students = request.get_json(silent=True)
+            if not isinstance(students, list):
+                raise BadRequest("bulk body must be a JSON array or NDJSON")
+            if len(students) > max_bulk_students:
+                raise BadRequest(f"bulk requests are limited to {max_bulk_students} students")
+        categories = list(calc.assignment_counts) + ['extra_credit']
+
+        def grade_batch(batch):
+            final_grades, breakdown = calc.calculate_grades_batch(
+                calc.roster_from_grades([grades for _, grades in batch])
+            )
+            for row, (student_id, _) in enumerate(batch):
+                yield json.dumps(_clean({
+                    'id': student_id,
+                    'final_grade': final_grades[row],
+                    'averages': {c: breakdown[c]['average'][row] for c in categories}
+                })) + '\n'
+
+        def generate():
+            batch = []
+            for count, record in enumerate(students, 1):
+                if count > max_bulk_students:
+                    yield json.dumps({'error': f"bulk requests are limited to {max_bulk_students} students"}) + '\n'
+                    return
+                if not isinstance(record, dict):
+                    yield json.dumps({'id': None, 'error': "each student must be a JSON object"}) + '\n'
+                    continue
+                try:
+                    batch.append((record.get('id'), normalize_grades(calc, record.get('grades'))))
+                except BadRequest as error:
+                    yield json.dumps({'id': record.get('id'), 'error': str(error)}) + '\n'
+                    continue
+                if len(batch) >= BULK_BATCH_SIZE:
+                    yield from grade_batch(batch)
+                    batch = []
+            if batch:
+                yield from grade_batch(batch)
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    app.cache = cache
+    return app
+
+
+if __name__ == '__main__':
+    create_app().run(threaded=True)
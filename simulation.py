@@ -0,0 +1,126 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+DEFAULT_STD = 10.0
+
+
+def _valid(scores):
+    return [g for g in scores or [] if g is not None]
+
+
+def fit_cohort(calc, students):
+    """Fit a (mean, std) score distribution per category from a whole cohort."""
+    params = {}
+    for category in calc.assignment_counts:
+        scores = [g for s in students for g in _valid(s.get(category))]
+        if len(scores) >= 2:
+            params[category] = (float(np.mean(scores)), float(np.std(scores, ddof=1)))
+        elif scores:
+            params[category] = (float(scores[0]), DEFAULT_STD)
+    return params
+
+
+def fit_distributions(calc, grades, cohort=None):
+    """Fit a (mean, std) distribution per category for one student.
+
+    Categories with two or more entered scores use the student's own mean and
+    spread. Otherwise the cohort parameters from ``fit_cohort`` are used when
+    given, falling back to the student's scores pooled across categories.
+    """
+    pooled = [g for category in calc.assignment_counts for g in _valid(grades.get(category))]
+    params = {}
+    for category in calc.assignment_counts:
+        scores = _valid(grades.get(category))
+        if len(scores) >= 2:
+            params[category] = (float(np.mean(scores)), float(np.std(scores, ddof=1)))
+        elif cohort and category in cohort:
+            mean, std = cohort[category]
+            params[category] = (float(scores[0]) if scores else mean, std)
+        elif scores:
+            params[category] = (float(scores[0]), DEFAULT_STD)
+        elif pooled:
+            params[category] = (float(np.mean(pooled)), DEFAULT_STD)
+        else:
+            raise ValueError(f"No scores to fit a distribution for {category}; pass a cohort")
+    return params
+
+
+def _plan(calc, grades, params):
+    base, terms = calc.completion_plan(grades)
+    return base, [(coef, remaining) + tuple(params[category]) + (calc.max_scores[category],)
+                  for category, (coef, remaining) in terms.items()]
+
+
+def _simulate_shard(task):
+    base, terms, thresholds, n_draws, seed = task
+    rng = np.random.default_rng(seed)
+    final = np.full(n_draws, base)
+    for coef, remaining, mean, std, cap in terms:
+        draws = rng.normal(mean, std, size=(n_draws, remaining))
+        np.clip(draws, 0, cap, out=draws)
+        final += coef * draws.sum(axis=1)
+    hits = (final[:, np.newaxis] >= thresholds).sum(axis=0)
+    return hits, final.sum(), np.square(final).sum()
+
+
+def simulate_final_grades(calc, students, thresholds=(70, 80, 90), n_draws=100000,
+                          cohort=None, seed=0, shard_size=250000, workers=None):
+    """Estimate final-grade probabilities by sampling the remaining assignments.
+
+    Each student's remaining homeworks/quizzes/projects/exams are drawn from
+    normal distributions fitted by ``fit_distributions`` and clipped to
+    ``calc.max_scores``. Draws are split into shards of ``shard_size`` and run
+    on a ``ProcessPoolExecutor`` (``workers=0`` runs inline). Every shard gets
+    its own child of ``np.random.SeedSequence(seed)``, so results depend only
+    on ``seed`` and ``shard_size``, not on the number of workers.
+
+    Returns a dict of (N, T) ``probability`` arrays with Wilson 95%
+    ``ci_low``/``ci_high`` bounds, and per-student ``mean`` and ``std``.
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    student_seeds = np.random.SeedSequence(seed).spawn(len(students))
+
+    tasks = []
+    owners = []
+    for row, grades in enumerate(students):
+        base, terms = _plan(calc, grades, fit_distributions(calc, grades, cohort))
+        n_shards = math.ceil(n_draws / shard_size)
+        for shard, shard_seed in enumerate(student_seeds[row].spawn(n_shards)):
+            size = min(shard_size, n_draws - shard * shard_size)
+            tasks.append((base, terms, thresholds, size, shard_seed))
+            owners.append(row)
+
+    hits = np.zeros((len(students), len(thresholds)))
+    totals = np.zeros(len(students))
+    squares = np.zeros(len(students))
+    if workers == 0:
+        results = map(_simulate_shard, tasks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_simulate_shard, tasks, chunksize=max(1, len(tasks) // 64))
+    try:
+        for row, (shard_hits, shard_total, shard_squares) in zip(owners, results):
+            hits[row] += shard_hits
+            totals[row] += shard_total
+            squares[row] += shard_squares
+    finally:
+        if workers != 0:
+            executor.shutdown()
+
+    p = hits / n_draws
+    z = NormalDist().inv_cdf(0.975)
+    denom = 1 + z ** 2 / n_draws
+    center = (p + z ** 2 / (2 * n_draws)) / denom
+    margin = z * np.sqrt(p * (1 - p) / n_draws + z ** 2 / (4 * n_draws ** 2)) / denom
+    mean = totals / n_draws
+    return {
+        'thresholds': thresholds,
+        'probability': p,
+        'ci_low': center - margin,
+        'ci_high': center + margin,
+        'mean': mean,
+        'std': np.sqrt(np.maximum(squares / n_draws - mean ** 2, 0))
+    }
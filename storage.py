@@ -0,0 +1,320 @@
+import sqlite3
+
+from grade_calculator import GradeCalculator
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY,
+    external_id TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    course_id INTEGER NOT NULL REFERENCES courses(id),
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    max_score REAL NOT NULL,
+    PRIMARY KEY (course_id, category, position)
+) WITHOUT ROWID;
+-- One row per (course, student): absences plus the cached final grade,
+-- which is NULL whenever that student's scores changed since grading.
+CREATE TABLE IF NOT EXISTS enrollments (
+    course_id INTEGER NOT NULL REFERENCES courses(id),
+    student_id INTEGER NOT NULL REFERENCES students(id),
+    absences INTEGER NOT NULL DEFAULT 0,
+    final_grade REAL,
+    PRIMARY KEY (course_id, student_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scores (
+    course_id INTEGER NOT NULL,
+    student_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (course_id, student_id, category, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scores_course_category ON scores (course_id, category);
+"""
+
+
+class GradeStore:
+    """SQLite-backed gradebook for many courses and students.
+
+    Scores are keyed by (course, student, category, position), so loading one
+    student is a single range scan on the primary key no matter how large the
+    course is. Each enrollment caches its computed final grade; writes clear
+    the cache only for the students they touch.
+    """
+
+    def __init__(self, path, calc=None):
+        self.calc = calc or GradeCalculator()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self._course_ids = {}
+        self._student_ids = {}
+
+    def close(self):
+        self.conn.close()
+
+    def course_id(self, code):
+        """Return the id for a course code, creating it and its assignments if needed."""
+        if code not in self._course_ids:
+            row = self.conn.execute('SELECT id FROM courses WHERE code = ?', (code,)).fetchone()
+            if row is None:
+                with self.conn:
+                    cursor = self.conn.execute('INSERT INTO courses (code) VALUES (?)', (code,))
+                    self.conn.executemany(
+                        'INSERT INTO assignments (course_id, category, position, max_score) VALUES (?, ?, ?, ?)',
+                        [(cursor.lastrowid, category, position, self.calc.max_scores[category])
+                         for category, count in list(self.calc.assignment_counts.items()) + [('extra_credit', 1)]
+                         for position in range(count)]
+                    )
+                row = (cursor.lastrowid,)
+            self._course_ids[code] = row[0]
+        return self._course_ids[code]
+
+    def _student_id(self, external_id, create=True):
+        external_id = str(external_id)
+        if external_id not in self._student_ids:
+            if create:
+                self.conn.execute('INSERT OR IGNORE INTO students (external_id) VALUES (?)', (external_id,))
+            row = self.conn.execute('SELECT id FROM students WHERE external_id = ?', (external_id,)).fetchone()
+            if row is None:
+                return None
+            self._student_ids[external_id] = row[0]
+        return self._student_ids[external_id]
+
+    def bulk_upsert(self, course, records, batch_size=5000):
+        """Upsert ``(student, grades)`` pairs in batched transactions.
+
+        ``grades`` uses the dict-of-lists format, with list positions as
+        assignment slots. Each listed slot is written, ``None`` slots and any
+        slots past the end of a listed category are deleted, and categories
+        that are left out are not touched. Returns the number of students
+        written.
+        """
+        course_id = self.course_id(course)
+        written = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                written += self._upsert_batch(course_id, batch)
+                batch = []
+        if batch:
+            written += self._upsert_batch(course_id, batch)
+        return written
+
+    def _upsert_batch(self, course_id, batch):
+        upserts, deletes, truncates, enrollments = [], [], [], []
+        with self.conn:
+            for student, grades in batch:
+                student_id = self._student_id(student)
+                for category, values in grades.items():
+                    if category == 'attendance' or values is None:
+                        continue
+                    for position, score in enumerate(values):
+                        key = (course_id, student_id, category, position)
+                        if score is None:
+                            deletes.append(key)
+                        else:
+                            upserts.append(key + (float(score),))
+                    truncates.append((course_id, student_id, category, len(values)))
+                absences = grades.get('attendance')
+                enrollments.append((course_id, student_id, absences, absences))
+            self.conn.executemany(
+                'INSERT INTO scores (course_id, student_id, category, position, score) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (course_id, student_id, category, position) DO UPDATE SET score = excluded.score',
+                upserts
+            )
+            self.conn.executemany(
+                'DELETE FROM scores WHERE course_id = ? AND student_id = ? AND category = ? AND position = ?',
+                deletes
+            )
+            # A shorter list than before must not leave its old tail behind
+            self.conn.executemany(
+                'DELETE FROM scores WHERE course_id = ? AND student_id = ? AND category = ? AND position >= ?',
+                truncates
+            )
+            # Writing the enrollment also invalidates its cached final grade.
+            # Absences are kept when the update does not include attendance.
+            self.conn.executemany(
+                'INSERT INTO enrollments (course_id, student_id, absences, final_grade) '
+                'VALUES (?, ?, COALESCE(?, 0), NULL) '
+                'ON CONFLICT (course_id, student_id) DO UPDATE '
+                'SET absences = COALESCE(?, absences), final_grade = NULL',
+                enrollments
+            )
+        return len(batch)
+
+    def save_grades(self, course, student, grades):
+        self.bulk_upsert(course, [(student, grades)])
+
+    def load_grades(self, course, student):
+        """Load one student's grades in the Streamlit format, or ``None`` if not enrolled."""
+        student_id = self._student_id(student, create=False)
+        if student_id is None:
+            return None
+        course_id = self.course_id(course)
+        enrollment = self.conn.execute(
+            'SELECT absences FROM enrollments WHERE course_id = ? AND student_id = ?', (course_id, student_id)
+        ).fetchone()
+        if enrollment is None:
+            return None
+
+        grades = {category: [None] * count for category, count in self.calc.assignment_counts.items()}
+        grades['extra_credit'] = [None]
+        rows = self.conn.execute(
+            'SELECT category, position, score FROM scores WHERE course_id = ? AND student_id = ?',
+            (course_id, student_id)
+        )
+        for category, position, score in rows:
+            slots = grades.setdefault(category, [])
+            if position >= len(slots):
+                slots.extend([None] * (position + 1 - len(slots)))
+            slots[position] = score
+        grades['attendance'] = enrollment[0]
+        return grades
+
+    def students(self, course):
+        return [row[0] for row in self.conn.execute(
+            'SELECT s.external_id FROM enrollments e JOIN students s ON s.id = e.student_id '
+            'WHERE e.course_id = ? ORDER BY s.external_id', (self.course_id(course),)
+        )]
+
+    def count(self, course):
+        """Number of students enrolled in ``course``."""
+        return self.conn.execute('SELECT COUNT(*) FROM enrollments WHERE course_id = ?',
+                                 (self.course_id(course),)).fetchone()[0]
+
+    def student_page(self, course, after=None, limit=50, skip=0):
+        """Up to ``limit`` enrolled student ids in id order, after the id ``after``.
+
+        Keyset paging: the query starts from ``after`` in the student id index,
+        so reading the next page costs the same wherever it is in the course.
+        ``skip`` passes over that many ids first, to jump ahead from a known page.
+        """
+        where = '' if after is None else 'WHERE s.external_id > ? '
+        # CROSS JOIN keeps students as the outer loop, so rows come off the
+        # external_id index already in order instead of from a full sort
+        return [row[0] for row in self.conn.execute(
+            'SELECT s.external_id FROM students s CROSS JOIN enrollments e '
+            'ON e.course_id = ? AND e.student_id = s.id '
+            f'{where}ORDER BY s.external_id LIMIT ? OFFSET ?',
+            (self.course_id(course), *(() if after is None else (str(after),)), limit, skip)
+        )]
+
+    def load_many(self, course, students):
+        """``(student, grades)`` pairs for the listed students who are enrolled, in the given order.
+
+        Reads their enrollments and scores with one query each, so loading a
+        page of a roster costs the same however large the course is.
+        """
+        course_id = self.course_id(course)
+        students = [str(student) for student in students]
+        if not students:
+            return []
+        placeholders = ','.join('?' * len(students))
+        enrollments = self.conn.execute(
+            f'SELECT s.id, s.external_id, e.absences FROM students s JOIN enrollments e ON e.student_id = s.id '
+            f'WHERE e.course_id = ? AND s.external_id IN ({placeholders})', (course_id, *students)
+        ).fetchall()
+        if not enrollments:
+            return []
+        rows = {}
+        by_student = {}
+        for student_id, external_id, absences in enrollments:
+            grades = {category: [None] * count for category, count in self.calc.assignment_counts.items()}
+            grades['extra_credit'] = [None]
+            grades['attendance'] = absences
+            rows[student_id] = by_student[external_id] = grades
+        placeholders = ','.join('?' * len(rows))
+        scores = self.conn.execute(
+            f'SELECT student_id, category, position, score FROM scores '
+            f'WHERE course_id = ? AND student_id IN ({placeholders})', (course_id, *rows)
+        )
+        for student_id, category, position, score in scores:
+            slots = rows[student_id].setdefault(category, [])
+            if position >= len(slots):
+                slots.extend([None] * (position + 1 - len(slots)))
+            slots[position] = score
+        return [(student, by_student[student]) for student in students if student in by_student]
+
+    def final_grade(self, course, student):
+        """Return the cached final grade, grading and caching it first if stale."""
+        student_id = self._student_id(student, create=False)
+        if student_id is None:
+            return None
+        course_id = self.course_id(course)
+        row = self.conn.execute(
+            'SELECT final_grade FROM enrollments WHERE course_id = ? AND student_id = ?', (course_id, student_id)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[0] is not None:
+            return row[0]
+        final_grade = self.calc.final_grade(self.load_grades(course, student))
+        with self.conn:
+            self.conn.execute('UPDATE enrollments SET final_grade = ? WHERE course_id = ? AND student_id = ?',
+                              (final_grade, course_id, student_id))
+        return final_grade
+
+    def final_grades(self, course, students=None, batch_size=10000):
+        """Return ``{student: final_grade}`` for a course, batch-grading only stale entries.
+
+        With ``students``, only those students are read and graded.
+        """
+        course_id = self.course_id(course)
+        where, params = '', ()
+        if students is not None:
+            ids = [self._student_id(student, create=False) for student in students]
+            params = tuple(i for i in ids if i is not None)
+            if not params:
+                return {}
+            where = f'AND e.student_id IN ({",".join("?" * len(params))}) '
+        stale = self.conn.execute(
+            'SELECT e.student_id, e.absences FROM enrollments e WHERE e.course_id = ? AND e.final_grade IS NULL '
+            f'{where}ORDER BY e.student_id', (course_id, *params)
+        ).fetchall()
+        for start in range(0, len(stale), batch_size):
+            chunk = stale[start:start + batch_size]
+            rows = {student_id: row for row, (student_id, _) in enumerate(chunk)}
+            students = []
+            for _, absences in chunk:
+                grades = {category: [] for category in self.calc.assignment_counts}
+                grades['extra_credit'] = []
+                grades['attendance'] = absences
+                students.append(grades)
+            if students is None:
+                # One primary-key range scan per chunk instead of a lookup per student
+                scores = self.conn.execute(
+                    'SELECT student_id, category, position, score FROM scores '
+                    'WHERE course_id = ? AND student_id BETWEEN ? AND ?', (course_id, chunk[0][0], chunk[-1][0])
+                )
+            else:
+                scores = self.conn.execute(
+                    'SELECT student_id, category, position, score FROM scores '
+                    f'WHERE course_id = ? AND student_id IN ({",".join("?" * len(rows))})', (course_id, *rows)
+                )
+            for student_id, category, position, score in scores:
+                row = rows.get(student_id)
+                if row is not None:
+                    slots = students[row].setdefault(category, [])
+                    if position >= len(slots):
+                        slots.extend([None] * (position + 1 - len(slots)))
+                    slots[position] = score
+
+            final_grades, _ = self.calc.calculate_grades_batch(self.calc.roster_from_grades(students))
+            with self.conn:
+                self.conn.executemany(
+                    'UPDATE enrollments SET final_grade = ? WHERE course_id = ? AND student_id = ?',
+                    [(float(g), course_id, student_id) for (student_id, _), g in zip(chunk, final_grades)]
+                )
+        return dict(self.conn.execute(
+            'SELECT s.external_id, e.final_grade FROM enrollments e JOIN students s ON s.id = e.student_id '
+            f'WHERE e.course_id = ? {where}', (course_id, *params)
+        ))
@@ -1,244 +1,535 @@
+import os
+import time
+
 import streamlit as st
 import numpy as np
 
-class GradeCalculator:
-    def __init__(self):
-        self.weights = {
-            'homeworks': 0.15,
-            'quizzes': 0.15,
-            'projects': 0.20,
-            'exams': 0.50,
-            'extra_credit': 0.07,
-            'attendance': -0.05
-        }
-        self.assignment_counts = {
-            'homeworks': 5,
-            'quizzes': 4,
-            'projects': 4,
-            'exams': 2
-        }
+from grade_calculator import SAMPLE_GRADES, GradeCalculator, assignment_label
+from instrumentation import flush_periodically, instrument, sink_from_name, timed
+
+@st.cache_resource
+def get_metrics_sink():
+    """Opt-in metrics: set GRADE_METRICS to prometheus or json (and GRADE_METRICS_OUTPUT to a file).
+
+    Written every GRADE_METRICS_INTERVAL seconds (default 60) and at exit.
+    """
+    sink = sink_from_name(os.environ.get('GRADE_METRICS'), os.environ.get('GRADE_METRICS_OUTPUT'))
+    return flush_periodically(sink, float(os.environ.get('GRADE_METRICS_INTERVAL', 60)))
+
+@st.cache_resource
+def get_calculator():
+    """One calculator shared by all sessions; GRADE_POLICY names an optional policy file."""
+    path = os.environ.get('GRADE_POLICY')
+    return instrument(GradeCalculator.from_file(path) if path else GradeCalculator(), get_metrics_sink())
+
+@st.cache_resource
+def get_needed_table():
+    """Needed-grade lookups shared by all sessions (and the CLI's table in the same process).
+
+    GRADE_NEEDED_PRECISION and GRADE_NEEDED_MAXSIZE size the table;
+    GRADE_NEEDED_WARM lists targets (e.g. ``70,80,90``) to precompute, as
+    far as they fit. Policies with category rules are never warmed.
+    """
+    from needed import needed_table
+
+    calc = get_calculator()
+    table = needed_table(calc, float(os.environ.get('GRADE_NEEDED_PRECISION', 0.1)),
+                         int(os.environ.get('GRADE_NEEDED_MAXSIZE', 100000)))
+    warm = os.environ.get('GRADE_NEEDED_WARM')
+    if warm and not calc.plan.rules:
+        table.warm([float(target) for target in warm.split(',')])
+    return table
+
+NEEDED_TARGETS = [70, 80, 90]
+
+WIDGET_PREFIXES = {'homeworks': 'hw', 'quizzes': 'quiz', 'projects': 'proj', 'exams': 'exam'}
+
+def widget_prefix(category):
+    return WIDGET_PREFIXES.get(category, category)
+
+def get_store(path):
+    """This session's connection to the SQLite gradebook at ``path``."""
+    from storage import GradeStore
+
+    if st.session_state.get('store_path') != path:
+        st.session_state.store = GradeStore(path)
+        st.session_state.store_path = path
+    return st.session_state.store
+
+def load_grades(path, course, student):
+    grades = get_store(path).load_grades(course, student)
+    if grades is None:
+        st.session_state.store_message = f"No saved grades for {student} in {course}"
+        return
+    grades['extra_credit'] = [grades['extra_credit'][0] or 0.0]
+    st.session_state.grades = grades
+    # Widgets keep their own state; dropping it makes them start again from
+    # the loaded values
+    for category in get_calculator().assignment_counts:
+        for i in range(len(grades[category])):
+            st.session_state.pop(f'{widget_prefix(category)}_{i}', None)
+    st.session_state.pop('ec', None)
+    st.session_state.pop('attendance', None)
+    st.session_state.store_message = f"Loaded grades for {student} in {course}"
+    load_cohort(path, course)
+    log = get_change_log(course)
+    if log is not None and str(student) not in log.student_index:
+        # Start the student's history from the loaded grades; later edits are logged as deltas
+        log.record_grades(student, grades)
+        log.flush()
+
+def save_grades(path, course, student):
+    get_store(path).save_grades(course, student, st.session_state.grades)
+    # The instructor grid rereads its page (and student list) after a single-student save
+    st.session_state.pop('roster_page', None)
+    st.session_state.pop('roster_starts', None)
+    st.session_state.store_message = f"Saved grades for {student} in {course}"
+    if st.session_state.get('cohort_course') == (path, course):
+        # Only this student's grade changed; no need to regrade the class
+        st.session_state.cohort.update(student, get_calculator().final_grade(st.session_state.grades))
+    else:
+        load_cohort(path, course)
+
+def load_cohort(path, course):
+    """Class standings for ``course``, built once from the gradebook's cached final grades."""
+    from ranking import CohortStats
+
+    st.session_state.cohort = CohortStats(get_store(path).final_grades(course))
+    st.session_state.cohort_course = (path, course)
+
+def storage_sidebar():
+    with st.sidebar:
+        st.subheader("Gradebook")
+        path = st.text_input("Database", value=os.environ.get('GRADE_DB', 'grades.db'))
+        course = st.text_input("Course", value='default', key='store_course')
+        student = st.text_input("Student", value='me', key='store_student')
+        col1, col2 = st.columns(2)
+        col1.button("Load", on_click=load_grades, args=(path, course, student))
+        col2.button("Save", on_click=save_grades, args=(path, course, student))
+        if 'store_message' in st.session_state:
+            st.caption(st.session_state.pop('store_message'))
+
+def grades_key(grades):
+    """Normalize the session grades into a hashable tuple for memoization."""
+    return tuple(
+        (category, value if category == 'attendance' else tuple(value))
+        for category, value in grades.items()
+    )
+
+@st.cache_data(max_entries=10000)
+def compute_grade(key):
+    """Memoized ``calculate_grade`` keyed on the normalized grade tuple."""
+    grades = {category: value if category == 'attendance' else list(value) for category, value in key}
+    return get_calculator().calculate_grade(grades)
+
+@st.cache_resource
+def get_change_log(course):
+    """Shared log of score edits for ``course`` when GRADE_LOG names a directory."""
+    root = os.environ.get('GRADE_LOG')
+    if not root:
+        return None
+    from changelog import ChangeLog
+    return ChangeLog(os.path.join(root, course), get_calculator())
+
+def log_edits(before, after):
+    """Append the scores that differ between two ``grades_key`` tuples to the change log."""
+    log = get_change_log(st.session_state.get('store_course', 'default'))
+    if log is None:
+        return
+    student = st.session_state.get('store_student', 'me')
+    previous = dict(before)
+    at = time.time()
+    if str(student) not in log.student_index:
+        # Start the student's history from the full grades the edit applies to
+        log.record_grades(student, {c: v if c == 'attendance' else list(v) for c, v in before}, at)
+    for category, values in after:
+        if category == 'attendance':
+            if values != previous.get(category):
+                log.record_absences(student, values, at)
+            continue
+        old = previous.get(category, ())
+        for index, score in enumerate(values):
+            if index >= len(old) or old[index] != score:
+                log.record_score(student, category, index, score, at)
+    log.flush()
+
+def refresh_results(calc, results, before):
+    """Redraw the results (and log the edit) if the calling fragment changed any grade."""
+    after = grades_key(st.session_state.grades)
+    if after != before:
+        log_edits(before, after)
+        render_results(calc, results)
+
+@st.fragment
+def category_inputs(calc, results, category):
+    """Score inputs for one assignment category of the policy."""
+    before = grades_key(st.session_state.grades)
+    cap = float(calc.max_scores[category])
+    st.write(f"### {category.replace('_', ' ').title()} ({calc.weights[category]:.0%})")
+    if cap > 100:
+        st.info(f"""
+    💡 Base score is out of 100 points
+    * Extra credit questions can boost score up to {cap:g}%
+    * Example: Score of 115 means 100 regular + 15 extra credit points
+    """)
+    else:
+        st.write(f"Regular scoring: 0-{cap:g} points")
+    slots = st.session_state.grades[category]
+    for i in range(calc.assignment_counts[category]):
+        grade = st.number_input(
+            assignment_label(category, i),
+            min_value=0.0,
+            max_value=cap,
+            value=slots[i] or 0.0,
+            step=1.0,
+            key=f'{widget_prefix(category)}_{i}'
+        )
+        slots[i] = grade if grade > 0 else None
+    refresh_results(calc, results, before)
+
+@st.fragment
+def extra_credit_inputs(calc, results):
+    before = grades_key(st.session_state.grades)
+    # Extra Credit Assignments (separate from homework/project bonus points)
+    st.write(f"### Extra Credit Assignments ({calc.weights['extra_credit']:.0%})")
+    st.info(f"""
+    💡 These are separate extra credit assignments
+    * Different from bonus points in homework/projects
+    * Worth {calc.weights['extra_credit']:.0%} of your total grade
+    * Enter your total score for all extra credit assignments
+    """)
+    ec = st.number_input(
+        "Extra Credit Score",
+        min_value=0.0,
+        max_value=float(calc.max_scores['extra_credit']),
+        value=float(st.session_state.grades['extra_credit'][0]),
+        step=1.0,
+        key='ec'
+    )
+    st.session_state.grades['extra_credit'] = [float(ec)]
+    refresh_results(calc, results, before)
+
+@st.fragment
+def attendance_inputs(calc, results):
+    before = grades_key(st.session_state.grades)
+    # Attendance (0-5 absences)
+    st.write(f"### Attendance ({calc.weights['attendance']:.0%} max penalty)")
+    absences = st.number_input(
+        "Number of Absences",
+        min_value=0,
+        max_value=calc.plan.max_absences,
+        value=st.session_state.grades['attendance'],
+        step=1,
+        key='attendance'
+    )
+    st.session_state.grades['attendance'] = absences
+    refresh_results(calc, results, before)
+
+def render_results(calc, results):
+    """Draw the breakdown and final grade into the ``results`` placeholder."""
+    with timed(get_metrics_sink(), 'render', section='results'):
+        draw_results(calc, results)
+
+def draw_category(calc, category, breakdown):
+    if category not in breakdown:
+        return
+    st.write(f"### {category.replace('_', ' ').title()} ({calc.weights[category]*100}%)")
+    b = breakdown[category]
+    grades = b['grades']
     
-    def calculate_grade(self, grades):
-        """Calculate the final grade based on provided category grades"""
-        final_grade = 0
-        breakdown = {}
-        
-        for category, grades_list in grades.items():
-            if category == 'attendance':
-                absences = grades_list
-                penalty_per_absence = self.weights[category] / 5
-                impact = absences * penalty_per_absence
-                final_grade += impact
-                breakdown[category] = {
-                    'absences': absences,
-                    'impact': impact
-                }
+    # Categories with bonus points show the regular and bonus part of each score
+    if calc.max_scores[category] > 100:
+        for i, g in enumerate(grades):
+            label = assignment_label(category, i)
+            if g is not None:
+                base_score = min(100, g)
+                extra_credit = max(0, g - 100)
+                st.write(f"{label}:")
+                st.write(f"* Regular: {base_score:.1f}/100")
+                if extra_credit > 0:
+                    st.write(f"* Extra Credit: +{extra_credit:.1f}")
+                st.write(f"* Total: {g:.1f}%")
             else:
-                if grades_list and any(g is not None for g in grades_list):
-                    valid_grades = [g for g in grades_list if g is not None]
-                    if valid_grades:
-                        avg = sum(valid_grades) / len(valid_grades)
-                        weighted = avg * self.weights[category]
-                        final_grade += weighted
-                        breakdown[category] = {
-                            'grades': grades_list,
-                            'average': avg,
-                            'weighted': weighted
-                        }
+                st.write(f"{label}: Not entered")
+    else:
+        st.write(f"Grades: {[f'{g:.1f}' if g is not None else 'Not entered' for g in grades]}")
+    
+    st.write(f"Average: {b['average']:.2f}%")
+    st.write(f"Weighted: {b['weighted']:.2f}%")
+    st.write(f"Completed: {sum(1 for g in grades if g is not None)}/{calc.assignment_counts[category]}")
+    st.write("---")
+
+def draw_results(calc, results):
+    final_grade, breakdown = compute_grade(grades_key(st.session_state.grades))
+    st.session_state.results_drawn = True
+    
+    with results.container():
+        # Display results in an expander
+        with st.expander("View Grade Breakdown", expanded=True):
+            st.write("## Grade Breakdown")
+            
+            # Create columns for the breakdown
+            col1, col2 = st.columns(2)
+            
+            # The last category shares the right column with extra credit and attendance
+            categories = list(calc.assignment_counts)
+            with col1:
+                for category in categories[:-1]:
+                    draw_category(calc, category, breakdown)
+            
+            with col2:
+                draw_category(calc, categories[-1], breakdown)
+                
+                # Display extra credit
+                if 'extra_credit' in breakdown:
+                    st.write(f"### Extra Credit Assignments ({calc.weights['extra_credit']:.0%})")
+                    b = breakdown['extra_credit']
+                    st.write(f"Total Score: {b['grades'][0]:.1f}%")
+                    st.write(f"Contribution to Final Grade: {b['weighted']:.2f}%")
+                    st.write("(Separate from homework/project bonus points)")
+                    st.write("---")
+                
+                # Display attendance
+                if 'attendance' in breakdown:
+                    st.write("### Attendance")
+                    b = breakdown['attendance']
+                    st.write(f"Absences: {b['absences']}/{calc.plan.max_absences}")
+                    st.write(f"Impact: {b['impact']:.2f}%")
+                    st.write("---")
+        
+        # Display final grade with color
+        st.markdown("---")
+        st.markdown("## Final Grade")
+        grade_color = 'red' if final_grade < 60 else 'orange' if final_grade < 70 else 'yellow' if final_grade < 80 else 'green'
+        st.markdown(f"<h1 style='color: {grade_color}'>{final_grade:.2f}%</h1>", unsafe_allow_html=True)
         
-        return final_grade, breakdown
+        # What the remaining work has to average for each target grade
+        needed = get_needed_table().needed_many(st.session_state.grades, NEEDED_TARGETS)
+        if needed[0] is not None:
+            st.write("### Needed on Remaining Work")
+            for target, result in zip(NEEDED_TARGETS, needed):
+                if result['secured']:
+                    st.write(f"{target}%: already secured")
+                elif result['unreachable']:
+                    st.write(f"{target}%: out of reach (would need {result['needed_average']:.1f}% on average)")
+                else:
+                    st.write(f"{target}%: average {result['needed_average']:.1f}% on the remaining work")
+
+        # Class standing, once grades for a course have been loaded or saved
+        cohort = st.session_state.get('cohort')
+        if cohort is not None and len(cohort):
+            summary = cohort.summary()
+            st.write(f"Class percentile: {cohort.percentile_rank(final_grade):.0f} "
+                     f"of {summary['count']} saved grades in {st.session_state.cohort_course[1]} "
+                     f"(median {summary['median']:.2f}%, mean {summary['mean']:.2f}%)")
+
+ROSTER_PAGE_SIZES = [25, 50, 100]
+
+def roster_columns(calc):
+    """Grid column label -> ``(category, index)`` for every assignment slot."""
+    columns = {}
+    for category, count in calc.plan.layout:
+        name = category.replace('_', ' ').title()
+        for i in range(count):
+            columns[name if count == 1 else f'{name} {i+1}'] = (category, i)
+    return columns
+
+def roster_page_ids(store, course, page, size):
+    """Student ids on ``page``, read by keyset paging from the nearest page start already seen."""
+    # (page size, page) -> the last student id before that page
+    starts = st.session_state.setdefault('roster_starts', {})
+    known = max((p for s, p in starts if s == size and p <= page), default=0)
+    ids = store.student_page(course, starts.get((size, known)), size, skip=(page - known) * size)
+    if ids:
+        starts[(size, page + 1)] = ids[-1]
+    return ids
+
+def load_roster_page(path, course, page, size):
+    """Read one page of the roster from the store and keep it (only it) in the session."""
+    import pandas as pd
+
+    calc = get_calculator()
+    store = get_store(path)
+    ids = roster_page_ids(store, course, page, size)
+    students = store.load_many(course, ids)
+    final_grades = store.final_grades(course, ids)
+    rows = []
+    for student, grades in students:
+        row = {'Student': student}
+        for column, (category, i) in roster_columns(calc).items():
+            slots = grades.get(category) or []
+            row[column] = slots[i] if i < len(slots) else None
+        row['Absences'] = grades['attendance']
+        row['Final grade'] = final_grades.get(student)
+        rows.append(row)
+    st.session_state.roster_page = {
+        'key': (path, course, page, size),
+        'grades': students,
+        'frame': pd.DataFrame(rows, columns=['Student', *roster_columns(calc), 'Absences', 'Final grade'])
+    }
+    st.session_state.roster_version = st.session_state.get('roster_version', 0) + 1
+
+def apply_roster_edits(path, course, editor_key):
+    """Save the grid's pending edits as one batch and regrade only the edited students."""
+    edits = st.session_state[editor_key]['edited_rows']
+    if not edits:
+        return
+    calc = get_calculator()
+    page = st.session_state.roster_page
+    columns = roster_columns(calc)
+    frame = page['frame']
+    log = get_change_log(course)
+    at = time.time()
+    changed = []
+    for row, values in edits.items():
+        row = int(row)
+        student, grades = page['grades'][row]
+        if log is not None and str(student) not in log.student_index:
+            # Start the student's history from their saved grades, as log_edits does
+            log.record_grades(student, grades, at)
+        for column, value in values.items():
+            if value is not None and np.isnan(value):
+                value = None
+            if column == 'Absences':
+                grades['attendance'] = int(value or 0)
+                if log is not None:
+                    log.record_absences(student, grades['attendance'], at)
+            else:
+                category, i = columns[column]
+                grades[category][i] = None if value is None else float(value)
+                if log is not None:
+                    log.record_score(student, category, i, grades[category][i], at)
+            frame.at[row, column] = value
+        changed.append((row, student, grades))
+
+    get_store(path).bulk_upsert(course, [(student, grades) for _, student, grades in changed])
+    final_grades, _ = calc.calculate_grades_batch(calc.roster_from_grades([grades for _, _, grades in changed]))
+    cohort = st.session_state.get('cohort') if st.session_state.get('cohort_course') == (path, course) else None
+    for (row, student, _), grade in zip(changed, final_grades):
+        if cohort is not None:
+            cohort.update(student, grade)
+        frame.at[row, 'Final grade'] = float(grade)
+    if log is not None:
+        log.flush()
+    # A fresh editor key starts the grid from the saved values
+    st.session_state.roster_version += 1
+    st.session_state.roster_message = f"Saved {len(changed)} students"
+
+def draw_roster_summary(summary):
+    cohort = st.session_state.cohort
+    stats = cohort.summary()
+    with summary.container():
+        cols = st.columns(5)
+        cols[0].metric("Students", stats['count'])
+        cols[1].metric("Mean", f"{stats['mean']:.2f}%")
+        cols[2].metric("Median", f"{stats['median']:.2f}%")
+        cols[3].metric("Std", f"{stats['std']:.2f}")
+        cols[4].metric("Range", f"{stats['min']:.1f}-{stats['max']:.1f}%")
+        bands = cohort.histogram()
+        st.caption("  ".join(f"{label}: {count}" for label, count in
+                             zip(["<60", "60-70", "70-80", "80-90", "90+"], bands)))
+
+@st.fragment
+def roster_grid(calc, path, course, total, summary):
+    col1, col2 = st.columns(2)
+    size = col1.selectbox("Students per page", ROSTER_PAGE_SIZES, index=1, key='roster_size')
+    pages = max(1, -(-total // size))
+    page = col2.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1,
+                             key='roster_page_number') - 1
+    current = st.session_state.get('roster_page')
+    if current is None or current['key'] != (path, course, page, size):
+        load_roster_page(path, course, page, size)
+
+    max_score = {category: float(calc.max_scores.get(category, 100)) for category, _ in calc.plan.layout}
+    column_config = {
+        column: st.column_config.NumberColumn(column, min_value=0.0, max_value=max_score[category], step=0.1)
+        for column, (category, _) in roster_columns(calc).items()
+    }
+    column_config['Absences'] = st.column_config.NumberColumn("Absences", min_value=0,
+                                                              max_value=calc.plan.max_absences, step=1)
+    column_config['Final grade'] = st.column_config.NumberColumn("Final grade", format="%.2f")
+    editor_key = f'roster_editor_{st.session_state.roster_version}'
+    with st.form('roster_form', border=False):
+        st.data_editor(st.session_state.roster_page['frame'], key=editor_key, hide_index=True,
+                       disabled=['Student', 'Final grade'], column_config=column_config,
+                       width='stretch')
+        st.form_submit_button("Save changes", on_click=apply_roster_edits, args=(path, course, editor_key))
+    if 'roster_message' in st.session_state:
+        st.caption(st.session_state.pop('roster_message'))
+    if st.session_state.get('cohort_course') == (path, course):
+        draw_roster_summary(summary)
+
+def render_roster(calc):
+    """Instructor view: the course roster as a paged, editable grid with class statistics."""
+    with st.sidebar:
+        st.subheader("Gradebook")
+        path = st.text_input("Database", value=os.environ.get('GRADE_DB', 'grades.db'))
+        course = st.text_input("Course", value='default', key='store_course')
+    if st.session_state.get('roster_course') != (path, course):
+        st.session_state.roster_course = (path, course)
+        st.session_state.pop('roster_page', None)
+        st.session_state.pop('roster_starts', None)
+    total = get_store(path).count(course)
+    if not total:
+        st.info(f"No students enrolled in {course} yet")
+        return
+    st.subheader(f"Roster: {course}")
+    summary = st.empty()
+    roster_grid(calc, path, course, total, summary)
+    if st.session_state.get('cohort_course') != (path, course):
+        # The class statistics need every final grade in the course, so they
+        # are computed once the grid has already been sent to the browser
+        load_cohort(path, course)
+        draw_roster_summary(summary)
 
 def main():
+    with timed(get_metrics_sink(), 'render', section='app'):
+        render_app()
+
+def render_app():
     st.set_page_config(page_title="Grade Calculator", layout="wide")
     st.title("Grade Calculator")
     
-    calc = GradeCalculator()
+    calc = get_calculator()
+    if st.sidebar.radio("View", ["Student", "Instructor roster"], key='view') == "Instructor roster":
+        render_roster(calc)
+        return
     
     # Initialize session state for grades
     if 'grades' not in st.session_state:
-        st.session_state.grades = {
-            'homeworks': [89.0, 83.0, 62.0, None, None],
-            'quizzes': [40.0, 62.0, None, None],
-            'projects': [120.0, 127.0, None, None],
-            'exams': [None, None],
-            'extra_credit': [0],
-            'attendance': 0
-        }
+        # The CLI's sample student, fitted to the policy's categories
+        st.session_state.grades = {}
+        for category, count in calc.assignment_counts.items():
+            entered = [float(g) for g in SAMPLE_GRADES.get(category, [])[:count]]
+            st.session_state.grades[category] = entered + [None] * (count - len(entered))
+        st.session_state.grades['extra_credit'] = [0]
+        st.session_state.grades['attendance'] = 0
+    
+    storage_sidebar()
     
-    # Create columns for different categories
+    # Create columns for different categories. Each input section is a
+    # fragment, so editing one category reruns only that section and the
+    # results placeholder below, not the whole page.
     col1, col2 = st.columns(2)
+    results = st.empty()
+    st.session_state.results_drawn = False
     
+    categories = list(calc.assignment_counts)
+    half = (len(categories) + 1) // 2
     with col1:
         st.subheader("Input Grades")
-        
-        # Homeworks (0-130)
-        st.write("### Homeworks (15%)")
-        st.info("""
-        💡 Base score is out of 100 points
-        * Extra credit questions can boost score up to 130%
-        * Example: Score of 115 means 100 regular + 15 extra credit points
-        """)
-        for i in range(calc.assignment_counts['homeworks']):
-            grade = st.number_input(
-                f"Homework {i+1}",
-                min_value=0.0,
-                max_value=130.0,
-                value=st.session_state.grades['homeworks'][i] or 0.0,
-                step=1.0,
-                key=f'hw_{i}'
-            )
-            st.session_state.grades['homeworks'][i] = grade if grade > 0 else None
-        
-        # Quizzes (0-100)
-        st.write("### Quizzes (15%)")
-        st.write("Regular scoring: 0-100 points")
-        for i in range(calc.assignment_counts['quizzes']):
-            grade = st.number_input(
-                f"Quiz {i+1}",
-                min_value=0.0,
-                max_value=100.0,
-                value=st.session_state.grades['quizzes'][i] or 0.0,
-                step=1.0,
-                key=f'quiz_{i}'
-            )
-            st.session_state.grades['quizzes'][i] = grade if grade > 0 else None
+        for category in categories[:half]:
+            category_inputs(calc, results, category)
     
     with col2:
-        # Projects (0-130)
-        st.write("### Projects (20%)")
-        st.info("""
-        💡 Base score is out of 100 points
-        * Extra credit questions can boost score up to 130%
-        * Example: Score of 120 means 100 regular + 20 extra credit points
-        """)
-        for i in range(calc.assignment_counts['projects']):
-            grade = st.number_input(
-                f"Project {i+1}",
-                min_value=0.0,
-                max_value=130.0,
-                value=st.session_state.grades['projects'][i] or 0.0,
-                step=1.0,
-                key=f'proj_{i}'
-            )
-            st.session_state.grades['projects'][i] = grade if grade > 0 else None
-        
-        # Exams (0-100)
-        st.write("### Exams (50%)")
-        st.write("Regular scoring: 0-100 points")
-        exam_names = ["Midterm", "Final"]
-        for i in range(calc.assignment_counts['exams']):
-            grade = st.number_input(
-                f"{exam_names[i]} Exam",
-                min_value=0.0,
-                max_value=100.0,
-                value=st.session_state.grades['exams'][i] or 0.0,
-                step=1.0,
-                key=f'exam_{i}'
-            )
-            st.session_state.grades['exams'][i] = grade if grade > 0 else None
-        
-        # Extra Credit Assignments (separate from homework/project bonus points)
-        st.write("### Extra Credit Assignments (7%)")
-        st.info("""
-        💡 These are separate extra credit assignments
-        * Different from bonus points in homework/projects
-        * Worth 7% of your total grade
-        * Enter your total score for all extra credit assignments
-        """)
-        ec = st.number_input(
-            "Extra Credit Score",
-            min_value=0.0,
-            max_value=100.0,
-            value=float(st.session_state.grades['extra_credit'][0]),
-            step=1.0,
-            key='ec'
-        )
-        st.session_state.grades['extra_credit'] = [float(ec)]
-        
-        # Attendance (0-5 absences)
-        st.write("### Attendance (-5% max penalty)")
-        absences = st.number_input(
-            "Number of Absences",
-            min_value=0,
-            max_value=5,
-            value=st.session_state.grades['attendance'],
-            step=1,
-            key='attendance'
-        )
-        st.session_state.grades['attendance'] = absences
-    
-    # Calculate and display results
-    final_grade, breakdown = calc.calculate_grade(st.session_state.grades)
-    
-    # Display results in an expander
-    with st.expander("View Grade Breakdown", expanded=True):
-        st.write("## Grade Breakdown")
-        
-        # Create columns for the breakdown
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Display category breakdowns
-            for category in ['homeworks', 'quizzes', 'projects']:
-                if category in breakdown:
-                    st.write(f"### {category.title()} ({calc.weights[category]*100}%)")
-                    b = breakdown[category]
-                    grades = b['grades']
-                    
-                    # Create a more detailed grade display
-                    if category in ['homeworks', 'projects']:
-                        for i, g in enumerate(grades):
-                            if g is not None:
-                                base_score = min(100, g)
-                                extra_credit = max(0, g - 100)
-                                st.write(f"{category[:-1].title()} {i+1}:")
-                                st.write(f"* Regular: {base_score:.1f}/100")
-                                if extra_credit > 0:
-                                    st.write(f"* Extra Credit: +{extra_credit:.1f}")
-                                st.write(f"* Total: {g:.1f}%")
-                            else:
-                                st.write(f"{category[:-1].title()} {i+1}: Not entered")
-                    else:
-                        st.write(f"Grades: {[f'{g:.1f}' if g is not None else 'Not entered' for g in grades]}")
-                    
-                    st.write(f"Average: {b['average']:.2f}%")
-                    st.write(f"Weighted: {b['weighted']:.2f}%")
-                    st.write(f"Completed: {sum(1 for g in grades if g is not None)}/{calc.assignment_counts[category]}")
-                    st.write("---")
-        
-        with col2:
-            # Display exam grades
-            if 'exams' in breakdown:
-                st.write(f"### Exams ({calc.weights['exams']*100}%)")
-                b = breakdown['exams']
-                st.write(f"Grades: {[f'{g:.1f}' if g is not None else 'Not entered' for g in b['grades']]}")
-                st.write(f"Average: {b['average']:.2f}%")
-                st.write(f"Weighted: {b['weighted']:.2f}%")
-                st.write(f"Completed: {sum(1 for g in b['grades'] if g is not None)}/{calc.assignment_counts['exams']}")
-                st.write("---")
-            
-            # Display extra credit
-            if 'extra_credit' in breakdown:
-                st.write(f"### Extra Credit Assignments (7%)")
-                b = breakdown['extra_credit']
-                st.write(f"Total Score: {b['grades'][0]:.1f}%")
-                st.write(f"Contribution to Final Grade: {b['weighted']:.2f}%")
-                st.write("(Separate from homework/project bonus points)")
-                st.write("---")
-            
-            # Display attendance
-            if 'attendance' in breakdown:
-                st.write("### Attendance")
-                b = breakdown['attendance']
-                st.write(f"Absences: {b['absences']}/5")
-                st.write(f"Impact: {b['impact']:.2f}%")
-                st.write("---")
+        for category in categories[half:]:
+            category_inputs(calc, results, category)
+        extra_credit_inputs(calc, results)
+        attendance_inputs(calc, results)
     
-    # Display final grade with color
-    st.markdown("---")
-    st.markdown("## Final Grade")
-    grade_color = 'red' if final_grade < 60 else 'orange' if final_grade < 70 else 'yellow' if final_grade < 80 else 'green'
-    st.markdown(f"<h1 style='color: {grade_color}'>{final_grade:.2f}%</h1>", unsafe_allow_html=True)
+    # A fragment may already have drawn the results during this run
+    if not st.session_state.results_drawn:
+        render_results(calc, results)
 
 if __name__ == "__main__":
     main()
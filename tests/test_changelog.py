@@ -0,0 +1,78 @@
+import random
+
+import numpy as np
+import pytest
+
+from changelog import ChangeLog
+from grade_calculator import GradeCalculator
+
+STUDENTS = ['ana', 'ben', 'cy', 'dee']
+
+
+def random_edits(calc, n, seed=0):
+    """``(time, student, category, index, value)`` edits in time order; category ``attendance`` sets absences."""
+    rng = random.Random(seed)
+    categories = list(calc.assignment_counts) + ['extra_credit', 'attendance']
+    edits = []
+    for i in range(n):
+        category = rng.choice(categories)
+        if category == 'attendance':
+            index, value = 0, rng.randint(0, 5)
+        else:
+            index = rng.randrange(calc.assignment_counts.get(category, 1))
+            value = None if rng.random() < 0.2 else float(rng.randint(0, 100))
+        # Pairs of edits share a timestamp, as record_grades writes them
+        edits.append((float(i // 2), rng.choice(STUDENTS), category, index, value))
+    return edits
+
+
+def record(log, edits):
+    for i, (at, student, category, index, value) in enumerate(edits):
+        if category == 'attendance':
+            log.record_absences(student, value, at)
+        else:
+            log.record_score(student, category, index, value, at)
+        if i % 7 == 6:
+            log.flush()
+    log.flush()
+
+
+def test_replay_across_snapshots_matches_a_full_replay(tmp_path):
+    calc = GradeCalculator()
+    edits = random_edits(calc, 400)
+    with ChangeLog(str(tmp_path / 'snapshots'), calc, fsync_every=5, snapshot_every=50) as log, \
+            ChangeLog(str(tmp_path / 'full'), calc, snapshot_every=0) as full:
+        record(log, edits)
+        record(full, edits)
+        assert len(log.snapshots) >= 5 and not full.snapshots
+        # Before any event, at and between snapshot times, and after the last event
+        times = [-1.0, 0.0] + [t for _, t, _ in log.snapshots] + [t + 0.5 for _, t, _ in log.snapshots] + [None]
+        for at in times:
+            book, final_grades, ids = log.state_at(at)
+            expected_book, expected_grades, expected_ids = full.state_at(at)
+            assert ids == expected_ids
+            np.testing.assert_array_equal(book.scores, expected_book.scores)
+            np.testing.assert_array_equal(book.absences, expected_book.absences)
+            np.testing.assert_allclose(final_grades, expected_grades)
+            for student in STUDENTS:
+                assert log.grades_at(student, at) == full.grades_at(student, at)
+
+
+def test_grades_at_follows_the_edits(tmp_path):
+    calc = GradeCalculator()
+    edits = random_edits(calc, 200, seed=1)
+    expected = {}
+    with ChangeLog(str(tmp_path / 'log'), calc, fsync_every=5, snapshot_every=30) as log:
+        record(log, edits)
+        for at, student, category, index, value in edits:
+            grades = expected.setdefault(student, dict(
+                {category: [None] * (s.stop - s.start) for category, s in log.slices.items()}, attendance=0))
+            if category == 'attendance':
+                grades['attendance'] = value
+            else:
+                grades[category][index] = value
+        for student, grades in expected.items():
+            logged, final_grade = log.grades_at(student)
+            assert logged == grades
+            assert final_grade == pytest.approx(calc.calculate_grade(grades)[0])
+        assert log.grades_at('nobody') is None
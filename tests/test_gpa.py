@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from gpa import Catalog, Transcripts
+
+
+@pytest.fixture
+def transcripts():
+    catalog = Catalog()
+    catalog.add('MATH101', credits=4)
+    catalog.add('ART100', credits=2)
+    return Transcripts(catalog, terms=['fall', 'spring'])
+
+
+def test_gpa_matches_a_hand_computation(transcripts):
+    transcripts.add_results([
+        ('ana', 'fall', 'MATH101', 94),    # A, 4.0
+        ('ana', 'fall', 'ART100', 81),     # B-, 2.7
+        ('ana', 'spring', 'MATH101', 71),  # C-, 1.7
+        ('ben', 'spring', 'ART100', 55)    # F, 0.0
+    ])
+    fall = (4 * 4.0 + 2 * 2.7) / 6
+    term = transcripts.term_gpa()
+    assert term[0] == pytest.approx([fall, 1.7])
+    assert np.isnan(term[1, 0]) and term[1, 1] == 0.0
+    assert transcripts.cumulative_gpa()[0] == pytest.approx([fall, (4 * 4.0 + 2 * 2.7 + 4 * 1.7) / 10])
+
+    # The incremental path agrees with a full rebuild
+    transcripts.set_result('ana', 'fall', 'ART100', 93)
+    transcripts.set_result('ben', 'fall', 'MATH101', 88)
+    quality, attempted = transcripts.quality.copy(), transcripts.attempted.copy()
+    transcripts.recompute()
+    np.testing.assert_allclose(quality[:2], transcripts.quality)
+    np.testing.assert_allclose(attempted[:2], transcripts.attempted)
+    assert transcripts.student_gpa('ana')['term']['fall'] == pytest.approx(4.0)
+
+
+def test_failed_results_leave_no_trace(transcripts):
+    transcripts.set_result('ana', 'fall', 'MATH101', 90)
+    with pytest.raises(ValueError, match="Unknown term"):
+        transcripts.set_result('q', 'winter', 'MATH101', 90)
+    with pytest.raises(ValueError, match="Unknown course"):
+        transcripts.set_result('q', 'fall', 'CHEM200', 90)
+    with pytest.raises(ValueError, match="Unknown term"):
+        transcripts.add_results([('r', 'fall', 'MATH101', 80), ('q', 'winter', 'ART100', 70)])
+    with pytest.raises(ValueError, match="Unknown course"):
+        transcripts.add_results([('r', 'fall', 'MATH101', 80), ('q', 'fall', 'CHEM200', 70)])
+
+    assert transcripts.students == ['ana']
+    assert transcripts.size == 1 and list(transcripts.rows) == [('ana', 'fall', 'MATH101')]
+    with pytest.raises(ValueError, match="Unknown student"):
+        transcripts.student_gpa('q')
+    assert transcripts.term_gpa().shape == (1, 2)
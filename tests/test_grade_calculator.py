@@ -0,0 +1,120 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+import grade_calculator
+from grade_calculator import GradeCalculator, assignment_label, sample_grades
+
+LABS_POLICY = {
+    'weights': {'labs': 0.4, 'exams': 0.5, 'extra_credit': 0.05, 'attendance': -0.05},
+    'assignment_counts': {'labs': 3, 'exams': 2},
+    'max_scores': {'labs': 120, 'exams': 100, 'extra_credit': 100}
+}
+
+
+@pytest.fixture
+def labs_policy(tmp_path):
+    path = tmp_path / 'labs.json'
+    path.write_text(json.dumps(LABS_POLICY))
+    return str(path)
+
+
+def test_sample_grades_follow_the_policy_categories(labs_policy):
+    calc = GradeCalculator.from_file(labs_policy)
+    grades = sample_grades(calc)
+    assert set(grades) == {'labs', 'exams', 'extra_credit', 'attendance'}
+    assert calc.final_grade(grades) == pytest.approx(calc.calculate_grade(grades)[0])
+    assert assignment_label('labs', 0) == "Labs 1"
+    assert assignment_label('exams', 1) == "Final Exam"
+    assert assignment_label('quizzes', 2) == "Quiz 3"
+
+
+def test_menu_runs_under_a_policy_with_other_categories(labs_policy, monkeypatch, capsys):
+    # Breakdown, needed grades, then hypothetical lab 1 and 3 (lab 2 skipped) and a midterm
+    answers = iter(['1', '', '2', '', '3', '95', '', '101', '80', '', '', '', '5'])
+    prompts = []
+
+    def answer(prompt=''):
+        prompts.append(prompt)
+        return next(answers)
+
+    monkeypatch.setattr('builtins.input', answer)
+    grade_calculator.main(['--policy', labs_policy])
+    out = capsys.readouterr().out
+    assert "Labs (40%):" in out and "Homeworks" not in out
+    assert "Labs 3 grade (0-120): " in prompts and "Midterm Exam grade (0-100): " in prompts
+    assert "Grades: [95.0, None, 101.0]" in out
+    assert "Hypothetical grade: 84.20%" in out
+
+
+def random_grades(calc, rng, missing_rate=0.2):
+    """One student part-way through the term, with some entered slots left ``None``."""
+    grades = {}
+    for category, count in calc.assignment_counts.items():
+        grades[category] = [None if rng.random() < missing_rate else round(rng.uniform(0, calc.max_scores[category]), 1)
+                            for _ in range(rng.randint(0, count))]
+    grades['extra_credit'] = [rng.choice([None, 0.0, 55.5, 100.0])]
+    grades['attendance'] = rng.randint(0, calc.plan.max_absences)
+    return grades
+
+
+@pytest.mark.parametrize('rules', [{}, {'quizzes': {'drop_lowest': 1}, 'homeworks': {'keep_best': 3, 'item_cap': 100}}],
+                         ids=['plain', 'rules'])
+def test_batch_grades_match_the_scalar_grader(rules):
+    calc = GradeCalculator(dict(GradeCalculator().plan.policy, category_rules=rules))
+    rng = random.Random(1)
+    students = [random_grades(calc, rng, missing_rate=0.3) for _ in range(300)]
+    for grades in students[::5]:
+        # Some students have no extra credit entry at all
+        del grades['extra_credit']
+    students.append({'attendance': 0})
+    students.append({category: [None] * count for category, count in calc.assignment_counts.items()} |
+                    {'extra_credit': [None], 'attendance': 3})
+
+    final_grades, breakdown = calc.calculate_grades_batch(calc.roster_from_grades(students))
+    for row, grades in enumerate(students):
+        expected, expected_breakdown = calc.calculate_grade(grades)
+        assert final_grades[row] == pytest.approx(expected, abs=1e-9)
+        for category in list(calc.assignment_counts) + ['extra_credit']:
+            average = breakdown[category]['average'][row]
+            if category in expected_breakdown:
+                assert average == pytest.approx(expected_breakdown[category]['average'], abs=1e-9)
+            else:
+                assert np.isnan(average) and breakdown[category]['weighted'][row] == 0
+        assert breakdown['attendance']['impact'][row] == pytest.approx(
+            grades['attendance'] * calc.plan.penalty_per_absence)
+
+
+def test_scalar_needed_grades_match_the_batch_solver():
+    calc = GradeCalculator()
+    rng = random.Random(4)
+    targets = [40, 70, 80, 90, 99, 120]
+    for _ in range(500):
+        grades = random_grades(calc, rng)
+        batch = calc.needed_results(calc.calculate_needed_grades_batch(calc.roster_from_grades([grades]), targets))
+        for target, expected in zip(targets, batch):
+            result = calc.calculate_needed_grades(grades, target)
+            if expected is None:
+                assert result is None
+                continue
+            assert result.pop('remaining_weights') == pytest.approx(expected.pop('remaining_weights'))
+            assert result == pytest.approx(expected, abs=1e-6)
+
+
+def test_needed_average_reaches_the_target_exactly():
+    calc = GradeCalculator()
+    grades = {'homeworks': [89, 83, 62], 'quizzes': [40, 62], 'projects': [120, 127], 'exams': [],
+              'extra_credit': [100], 'attendance': 0}
+    result = calc.calculate_needed_grades(grades, 80)
+    assert result['needed_average'] == pytest.approx(67.7619, abs=1e-4)
+    fill = result['needed_average']
+    completed = {category: [g for g in grades[category]] + [min(fill, calc.max_scores[category])] *
+                 (count - len(grades[category])) for category, count in calc.assignment_counts.items()}
+    completed.update(extra_credit=[100], attendance=0)
+    assert calc.final_grade(completed) == pytest.approx(80)
+    # Past the 100-point caps only homeworks and projects can still add points
+    high = calc.calculate_needed_grades(grades, 104)
+    assert high['needed_average'] == pytest.approx(100 + (104 - 103.695) / 0.16)
+    assert not high['unreachable']
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from grade_calculator import GradeCalculator
+from gradebook import Gradebook
+
+STUDENTS = [
+    {
+        'homeworks': [89.5, 83, 62, 100, 127.25],
+        'quizzes': [40, 62, 90, 75],
+        'projects': [120, 127, 100, 110.5],
+        'exams': [88, 91],
+        'extra_credit': [100],
+        'attendance': 0
+    },
+    {
+        'homeworks': [None, 70, None, 80, None],
+        'quizzes': [None, None, None, None],
+        'projects': [95, None, 130, None],
+        'exams': [None, 64.5],
+        'extra_credit': [None],
+        'attendance': 3
+    },
+    {
+        'homeworks': [89, 83, 62],
+        'quizzes': [40, 62],
+        'projects': [120],
+        'exams': [],
+        'extra_credit': [],
+        'attendance': 5
+    },
+    {'homeworks': [100], 'attendance': 1}
+]
+
+
+@pytest.fixture
+def calc():
+    return GradeCalculator()
+
+
+def padded(calc, grades):
+    """``grades`` with every category filled out to its slot count with ``None``."""
+    full = {}
+    for category, width in list(calc.assignment_counts.items()) + [('extra_credit', 1)]:
+        values = list(grades.get(category) or [])
+        full[category] = values + [None] * (width - len(values))
+    full['attendance'] = grades.get('attendance', 0)
+    return full
+
+
+def test_round_trip_keeps_none_slots_and_attendance(calc):
+    book = Gradebook.from_grades(calc, STUDENTS[:2])
+    for row, grades in enumerate(STUDENTS[:2]):
+        assert book.to_grades(row) == grades
+
+
+def test_ragged_categories_are_padded_with_none(calc):
+    book = Gradebook.from_grades(calc, STUDENTS)
+    for row, grades in enumerate(STUDENTS):
+        assert book.to_grades(row) == padded(calc, grades)
+
+
+def test_compact_round_trip_matches_the_cli_format(calc):
+    book = Gradebook.from_grades(calc, STUDENTS)
+    for row, grades in enumerate(STUDENTS):
+        compact = {category: [g for g in values if g is not None]
+                   for category, values in padded(calc, grades).items() if category != 'attendance'}
+        compact['attendance'] = grades.get('attendance', 0)
+        assert book.to_grades(row, compact=True) == compact
+    assert book.to_grades(2, compact=True)['homeworks'] == [89, 83, 62]
+
+
+def test_round_trip_grades_match(calc):
+    book = Gradebook.from_grades(calc, STUDENTS)
+    final_grades, _ = calc.calculate_grades_batch(book.roster())
+    for row, grades in enumerate(STUDENTS):
+        assert calc.final_grade(book.to_grades(row)) == pytest.approx(calc.final_grade(grades))
+        assert final_grades[row] == pytest.approx(calc.final_grade(grades))
+
+
+def test_to_grades_reads_edits_and_snapshots(calc, tmp_path):
+    book = Gradebook.from_grades(calc, STUDENTS, ids=['a', 'b', 'c', 'd'])
+    book.set_score(1, 'quizzes', 2, 55)
+    book.set_score(0, 'homeworks', 0, None)
+    book.set_absences(3, 4)
+    path = tmp_path / 'book.grd'
+    book.save(path)
+    loaded = Gradebook.load(path)
+    for row in range(len(STUDENTS)):
+        assert loaded.to_grades(row) == book.to_grades(row)
+    assert loaded.to_grades(1)['quizzes'] == [None, None, 55.0, None]
+    assert loaded.to_grades(0)['homeworks'][0] is None
+    assert loaded.to_grades(3)['attendance'] == 4
+    assert np.array_equal(loaded.missing_mask(), book.missing_mask())
+
+
+def test_too_many_scores_are_rejected(calc):
+    with pytest.raises(IndexError):
+        Gradebook.from_grades(calc, [{'exams': [90, 80, 70]}])
@@ -0,0 +1,51 @@
+import copy
+import random
+
+import pytest
+
+from grade_calculator import GradeCalculator
+from incremental import IncrementalGrade
+from policy import DEFAULT_POLICY
+
+RULES = {
+    'quizzes': {'drop_lowest': 1},
+    'homeworks': {'keep_best': 3, 'item_cap': 100},
+    'projects': {'category_cap': 110}
+}
+
+
+def rule_policy():
+    policy = copy.deepcopy(DEFAULT_POLICY)
+    policy['category_rules'] = RULES
+    return policy
+
+
+@pytest.mark.parametrize('policy', [None, rule_policy()], ids=['plain', 'rules'])
+def test_random_edits_match_calculate_grade(policy):
+    calc = GradeCalculator(policy)
+    rng = random.Random(0)
+    live = IncrementalGrade(calc)
+    for _ in range(3000):
+        category = rng.choice(list(live.scores))
+        index = rng.randrange(len(live.scores[category]))
+        action = rng.random()
+        if action < 0.6:
+            live.set_score(category, index, round(rng.uniform(0, calc.max_scores[category]), 1))
+        elif action < 0.9:
+            live.clear_score(category, index)
+        else:
+            live.set_absences(rng.randint(0, 5))
+
+        expected, breakdown = calc.calculate_grade(live.to_grades())
+        assert live.final_grade == pytest.approx(expected, abs=1e-9), live.to_grades()
+        assert set(live.breakdown()) == set(breakdown)
+        for category, entry in breakdown.items():
+            if category != 'attendance':
+                assert live.breakdown()[category]['average'] == pytest.approx(entry['average'], abs=1e-9)
+
+
+def test_starting_grades_are_entered():
+    grades = {'homeworks': [90, None, 80], 'exams': [75], 'attendance': 2}
+    calc = GradeCalculator(rule_policy())
+    live = IncrementalGrade(calc, grades)
+    assert live.final_grade == pytest.approx(calc.calculate_grade(grades)[0])
@@ -0,0 +1,65 @@
+import csv
+
+import pytest
+
+from grade_calculator import GradeCalculator
+from ingest import group_students, read_rows, run_pipeline
+
+STUDENTS = {
+    'ana': {'homeworks': [90, 80, None, None, 100], 'quizzes': [70], 'exams': [85], 'attendance': 1},
+    'ben': {'projects': [120, 110], 'exams': [60, 75], 'extra_credit': [50], 'attendance': 0},
+    'cy': {'homeworks': [60], 'quizzes': [90, 95, 100, 80], 'attendance': 3}
+}
+
+
+def export_rows(students):
+    for student, grades in students.items():
+        for category, values in grades.items():
+            if category == 'attendance':
+                yield {'student': student, 'category': 'attendance', 'assignment': '', 'score': values}
+                continue
+            for index, score in enumerate(values, 1):
+                if score is not None:
+                    yield {'student': student, 'category': category, 'assignment': index, 'score': score}
+
+
+def write_export(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['student', 'category', 'assignment', 'score'])
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_chunked_run_grades_each_student_once(tmp_path):
+    calc = GradeCalculator()
+    source = write_export(tmp_path / 'export.csv', export_rows(STUDENTS))
+    output = tmp_path / 'results.csv'
+    # Chunks of 3 rows split every student across chunks
+    stats = run_pipeline(source, str(output), chunk_size=3, calc=calc)
+    with open(output) as f:
+        results = list(csv.DictReader(f))
+    assert stats['students'] == 3 and stats['rows'] == len(list(export_rows(STUDENTS)))
+    assert [row['student'] for row in results] == list(STUDENTS)
+    for row in results:
+        assert float(row['final_grade']) == pytest.approx(calc.final_grade(STUDENTS[row['student']]), abs=1e-4)
+
+
+@pytest.mark.parametrize('assignment', [0, -1, 6])
+def test_assignment_outside_the_category_is_rejected(tmp_path, assignment):
+    rows = list(export_rows(STUDENTS))
+    rows[2] = dict(rows[2], assignment=assignment)
+    source = write_export(tmp_path / 'export.csv', rows)
+    with pytest.raises(ValueError, match=rf"export.csv, line 4: homeworks assignment {assignment} .* outside 1..5"):
+        run_pipeline(source, str(tmp_path / 'results.csv'), chunk_size=2)
+
+
+def test_student_listed_again_is_rejected(tmp_path):
+    rows = list(export_rows(STUDENTS))
+    rows.append({'student': 'ana', 'category': 'exams', 'assignment': 2, 'score': 90})
+    source = write_export(tmp_path / 'export.csv', rows)
+    with pytest.raises(ValueError, match=rf"line {len(rows) + 1}: Rows for student ana are not contiguous"):
+        list(read_rows(source, calc=GradeCalculator()))
+    # Callers grouping their own rows get the same checks
+    with pytest.raises(ValueError, match="ana are not contiguous"):
+        list(group_students([list(read_rows(source))], GradeCalculator()))
@@ -0,0 +1,51 @@
+import io
+import json
+import time
+
+import numpy as np
+
+from grade_calculator import GradeCalculator
+from instrumentation import JsonLogSink, PrometheusSink, flush_periodically, instrument
+
+RULES = {'category_rules': {'quizzes': {'drop_lowest': 1}}}
+
+
+def counters(sink):
+    return {(name, dict(labels)['method']): value for (name, labels), value in sink.metrics.counters.items()}
+
+
+def test_only_the_outermost_call_is_counted():
+    for policy in (None, dict(GradeCalculator().plan.policy, **RULES)):
+        sink = PrometheusSink()
+        calc = instrument(GradeCalculator(policy), sink)
+        calc.calculate_needed_grades({'homeworks': [90, 80], 'quizzes': [70], 'attendance': 1}, 80)
+        assert counters(sink) == {
+            ('grading_calls_total', 'calculate_needed_grades'): 1,
+            ('grading_students_total', 'calculate_needed_grades'): 1,
+            ('grading_assignments_total', 'calculate_needed_grades'): 3
+        }
+
+
+def test_missing_scores_are_explicit_nones():
+    sink = PrometheusSink()
+    calc = instrument(GradeCalculator(), sink)
+    # Short lists are work not entered yet
+    calc.calculate_grade({'homeworks': [90, 80], 'quizzes': [70]})
+    calc.calculate_grade({'homeworks': [90, None, 80], 'exams': [None], 'attendance': 0})
+    roster = calc.roster_from_grades([{'homeworks': [90]}, {'quizzes': [60, None]}])
+    calc.calculate_grades_batch(roster)
+    calc.calculate_grades_batch({'homeworks': np.array([[90, None], [None, None]], dtype=object),
+                                 'attendance': np.zeros(2)})
+    assert counters(sink)[('grading_missing_scores_total', 'calculate_grade')] == 2
+    assert counters(sink)[('grading_missing_scores_total', 'calculate_grades_batch')] == 3
+
+
+def test_flush_periodically_writes_on_an_interval():
+    stream = io.StringIO()
+    sink = flush_periodically(JsonLogSink(stream), interval=0.01)
+    sink.inc('grading_calls_total', method='calculate_grade')
+    deadline = time.time() + 5
+    while not stream.getvalue() and time.time() < deadline:
+        time.sleep(0.01)
+    snapshot = json.loads(stream.getvalue().splitlines()[0])
+    assert snapshot['counters'][0]['value'] == 1
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import pytest
+
+from lms_sync import Connection, FetchError, ResultWriter, StandInLMS, fetch_section, sync_sections
+
+
+async def _drop_after_answer(reader, writer):
+    """Answer one page, then close the keep-alive connection without saying so."""
+    request = await reader.readline()
+    while (await reader.readline()).strip():
+        pass
+    page = int(request.split()[1].decode().rsplit('=', 1)[1])
+    body = json.dumps({
+        'rows': [{'student': f'S-{page}', 'category': 'exams', 'assignment': 1, 'score': 90}],
+        'next_page': page + 1 if page < 3 else None
+    }).encode()
+    writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+    await writer.drain()
+    writer.close()
+
+
+def test_reused_connection_closed_by_server_is_reopened():
+    async def run():
+        server = await asyncio.start_server(_drop_after_answer, '127.0.0.1', 0)
+        url = f'http://127.0.0.1:{server.sockets[0].getsockname()[1]}'
+        try:
+            conn = Connection(url)
+            stats = {'pages': 0, 'retries': 0}
+            rows = await fetch_section(conn, 'A', stats=stats)
+            synced = await sync_sections(url, ['A', 'B'], concurrency=1)
+        finally:
+            server.close()
+            await server.wait_closed()
+        return rows, stats, conn.opened, synced
+
+    rows, stats, opened, synced = asyncio.run(run())
+    assert [row[0] for row in rows] == ['S-1', 'S-2', 'S-3']
+    assert stats == {'pages': 3, 'retries': 0}
+    assert opened == 3
+    assert synced['sections'] == 2 and synced['failed'] == []
+
+
+def test_refused_connection_is_a_retryable_fetch_error():
+    async def run():
+        server = await asyncio.start_server(_drop_after_answer, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        server.close()
+        await server.wait_closed()
+        await Connection(f'http://127.0.0.1:{port}').get_json('/sections/A/scores?page=1')
+
+    with pytest.raises(FetchError) as error:
+        asyncio.run(run())
+    assert error.value.retryable
+
+
+def test_sync_retries_failed_pages(tmp_path):
+    output = tmp_path / 'results.csv'
+    with StandInLMS(n_sections=5, students=3, failure_rate=0.3, seed=1) as lms:
+        stats = asyncio.run(sync_sections(lms.url, lms.sections, output=str(output), backoff=0.001, seed=1))
+    assert stats['sections'] == 5 and stats['failed'] == []
+    assert stats['retries'] > 0
+    assert len(output.read_text().splitlines()) == 1 + 5 * 3
+
+
+def test_writer_failure_is_raised_instead_of_hanging(monkeypatch):
+    def fail(self, batch):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(ResultWriter, '_write', fail)
+
+    async def run():
+        with StandInLMS(n_sections=20, students=2) as lms:
+            return await asyncio.wait_for(
+                sync_sections(lms.url, lms.sections, output='-', concurrency=4, queue_size=1, batch_size=1), 20)
+
+    with pytest.raises(RuntimeError, match="disk full"):
+        asyncio.run(run())
@@ -0,0 +1,69 @@
+import copy
+import logging
+import random
+
+import pytest
+
+from grade_calculator import GradeCalculator
+from needed import NeededGradeTable
+from policy import DEFAULT_POLICY
+
+SAMPLE = {
+    'homeworks': [89, 83, 62],
+    'quizzes': [40, 62],
+    'projects': [120, 127],
+    'exams': [],
+    'extra_credit': [100],
+    'attendance': 0
+}
+
+
+def test_answers_reach_the_target_within_precision():
+    calc = GradeCalculator()
+    table = NeededGradeTable(calc, precision=0.1)
+    rng = random.Random(0)
+    for _ in range(200):
+        grades = {category: [rng.uniform(0, calc.max_scores[category]) for _ in range(rng.randint(0, count - 1))]
+                  for category, count in calc.assignment_counts.items()}
+        grades['attendance'] = rng.randint(0, 5)
+        for result, target in zip(table.needed_many(grades, [70, 80, 90]), [70, 80, 90]):
+            exact = calc.calculate_needed_grades(grades, target)
+            assert result['current_grade'] == pytest.approx(exact['current_grade'])
+            assert result['points_needed'] == pytest.approx(exact['points_needed'], abs=0.05)
+            if exact['secured'] or exact['unreachable']:
+                continue
+            filled = dict(grades)
+            for category, count in calc.assignment_counts.items():
+                fill = min(result['needed_average'], calc.max_scores[category])
+                filled[category] = grades[category] + [fill] * (count - len(grades[category]))
+            assert calc.final_grade(filled) == pytest.approx(target, abs=0.05 + 1e-9)
+
+
+def test_no_op_rule_gives_the_same_answer():
+    policy = copy.deepcopy(DEFAULT_POLICY)
+    policy['category_rules'] = {'quizzes': {'item_cap': 1000}}
+    plain = NeededGradeTable(GradeCalculator()).needed(SAMPLE, 80)
+    ruled = NeededGradeTable(GradeCalculator(policy)).needed(SAMPLE, 80)
+    assert plain['needed_average'] == pytest.approx(67.76, abs=0.01)
+    assert ruled['needed_average'] == pytest.approx(67.76, abs=0.01)
+
+
+def test_warm_fills_only_up_to_maxsize(caplog):
+    table = NeededGradeTable(GradeCalculator())
+    with caplog.at_level(logging.WARNING, logger='needed'):
+        added = table.warm([70, 80, 90])
+    assert 0 < added <= table.maxsize
+    assert table.stats()['size'] == added
+    assert 'do not fit in maxsize' in caplog.text
+    # Combinations that were skipped are still answered on demand
+    assert table.needed(SAMPLE, 80)['needed_average'] == pytest.approx(67.76, abs=0.01)
+
+
+def test_warm_full_table_when_it_fits(caplog):
+    table = NeededGradeTable(GradeCalculator(), precision=1, maxsize=200000)
+    with caplog.at_level(logging.WARNING, logger='needed'):
+        added = table.warm([70, 80, 90])
+    assert added == 449 * 101 * 3
+    assert not caplog.text
+    table.needed(SAMPLE, 80)
+    assert table.stats()['hits'] == 1
@@ -0,0 +1,43 @@
+import numpy as np
+
+from grade_calculator import GradeCalculator
+from outcomes import explore_outcomes
+
+SAMPLE = {
+    'homeworks': [89, 83, 62],
+    'quizzes': [40, 62],
+    'projects': [120, 127],
+    'exams': [],
+    'extra_credit': [100],
+    'attendance': 0
+}
+
+
+def test_distribution_without_frontier_by_default():
+    result = explore_outcomes(GradeCalculator(), SAMPLE)
+    assert np.isclose(result['probability'].sum(), 1.0)
+    assert result['max_grade'] == GradeCalculator().calculate_needed_grades(SAMPLE, 80)['max_achievable']
+    assert all('frontier' not in t for t in result['targets'].values())
+
+
+def test_oversized_frontier_is_truncated_not_an_error():
+    result = explore_outcomes(GradeCalculator(), SAMPLE, frontier=True)
+    for target in (70, 80, 90):
+        frontier = result['targets'][target]['frontier']
+        assert frontier['truncated']
+        assert frontier['averages'].shape == (0, 4)
+        assert result['targets'][target]['probability'] > 0
+
+
+def test_frontier_points_reach_the_target():
+    calc = GradeCalculator()
+    grades = dict(SAMPLE, homeworks=[89, 83, 62, 90, 95], projects=[120, 127, 110])
+    result = explore_outcomes(calc, grades, targets=(80,), step=5, frontier=True)
+    frontier = result['targets'][80]['frontier']
+    assert not frontier['truncated'] and len(frontier['averages'])
+    for averages in frontier['averages']:
+        filled = dict(grades)
+        for category, average in zip(frontier['categories'], averages):
+            entered = grades[category]
+            filled[category] = entered + [average] * (calc.assignment_counts[category] - len(entered))
+        assert calc.final_grade(filled) >= 80 - 1e-9
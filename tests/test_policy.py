@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from grade_calculator import GradeCalculator
+from policy import CategoryRule
+
+RULES = {
+    'drop_lowest': {'drop_lowest': 2},
+    'keep_best': {'keep_best': 2},
+    'keep_one': {'keep_best': 1},
+    'min_count': {'drop_lowest': 4, 'min_count': 3},
+    'item_cap': {'item_cap': 100},
+    'category_cap': {'category_cap': 90},
+    'combined': {'drop_lowest': 1, 'keep_best': 3, 'item_cap': 110, 'category_cap': 105}
+}
+
+
+@pytest.mark.parametrize('options', RULES.values(), ids=RULES.keys())
+def test_batch_average_matches_the_scalar_average(options):
+    rule = CategoryRule('labs', **options)
+    rng = np.random.default_rng(7)
+    scores = rng.uniform(0, 130, size=(500, 6)).round(1)
+    # Every row count of entered scores from none to all, at random positions
+    entered = rng.permuted(np.arange(6) < rng.integers(0, 7, size=(500, 1)), axis=1)
+    scores[~entered] = np.nan
+    # Ties between dropped and kept scores
+    scores[:50] = np.where(entered[:50], 80.0, np.nan)
+
+    averages = rule.average_batch(scores, entered.sum(axis=1))
+    for row, average in zip(scores, averages):
+        expected = rule.average([float(g) for g in row if not np.isnan(g)])
+        if expected is None:
+            assert np.isnan(average)
+        else:
+            assert average == pytest.approx(expected, abs=1e-9)
+
+
+def test_rules_by_hand():
+    assert CategoryRule('q', drop_lowest=1).average([50, 90, 80, 100]) == 90
+    assert CategoryRule('q', keep_best=2, item_cap=95).average([50, 90, 120, 80]) == 92.5
+    assert CategoryRule('q', category_cap=85).average([90, 100]) == 85
+    # Dropping three of three would leave nothing; min_count keeps the best two
+    assert CategoryRule('q', drop_lowest=3, min_count=2).average([70, 90, 80]) == 85
+    assert CategoryRule('q', drop_lowest=1).average([70]) == 70
+    assert CategoryRule('q', drop_lowest=1).average([]) is None
+
+
+def test_policy_with_rules_by_hand():
+    calc = GradeCalculator({
+        'weights': {'labs': 0.5, 'exams': 0.5, 'attendance': -0.1},
+        'assignment_counts': {'labs': 3, 'exams': 2},
+        'max_scores': {'labs': 120, 'exams': 100},
+        'max_absences': 5,
+        'category_rules': {'labs': {'drop_lowest': 1, 'item_cap': 100}, 'exams': {'category_cap': 95}}
+    })
+    grades = {'labs': [110, 60, 80], 'exams': [100, 96], 'attendance': 1}
+    # Labs: 110 capped to 100, 60 dropped -> 90; exams: 98 capped to 95; one absence costs 0.02
+    final_grade, breakdown = calc.calculate_grade(grades)
+    assert breakdown['labs']['average'] == 90 and breakdown['exams']['average'] == 95
+    assert final_grade == pytest.approx(0.5 * 90 + 0.5 * 95 - 0.02)
+    assert calc.final_grade(grades) == pytest.approx(final_grade)
+    batch, _ = calc.calculate_grades_batch(calc.roster_from_grades([grades]))
+    assert batch[0] == pytest.approx(final_grade)
+
+
+@pytest.mark.parametrize('rules, message', [
+    ({'labs': {'drop_lowest': 3}}, "must be below its assignment count"),
+    ({'labs': {'drop_lowest': -1}}, "non-negative integer"),
+    ({'labs': {'keep_best': 0}}, "positive integer"),
+    ({'labs': {'drop_worst': 1}}, "unknown option"),
+    ({'essays': {'drop_lowest': 1}}, "unknown category")
+])
+def test_bad_rules_are_rejected(rules, message):
+    policy = {
+        'weights': {'labs': 1.0},
+        'assignment_counts': {'labs': 3},
+        'max_scores': {'labs': 100},
+        'max_absences': 5,
+        'category_rules': rules
+    }
+    with pytest.raises(ValueError, match=message):
+        GradeCalculator(policy)
@@ -0,0 +1,64 @@
+import math
+import random
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pytest
+
+from ranking import CohortStats, SortedGrades
+
+
+def test_sorted_grades_matches_a_sorted_list():
+    rng = random.Random(0)
+    values = [rng.choice([rng.uniform(0, 100), 75.0]) for _ in range(500)]
+    grades = SortedGrades(values, load=8)
+    reference = sorted(values)
+    for step in range(3000):
+        if reference and rng.random() < 0.45:
+            value = rng.choice(reference)
+            grades.remove(value)
+            reference.remove(value)
+        else:
+            value = rng.choice([rng.uniform(0, 100), 75.0])
+            grades.add(value)
+            reference.insert(bisect_right(reference, value), value)
+        if step % 97 == 0:
+            assert list(grades) == reference
+            assert [grades[i] for i in range(len(reference))] == reference
+        probe = rng.uniform(-1, 101)
+        assert grades.bisect_left(probe) == bisect_left(reference, probe)
+        assert grades.bisect_right(75.0) == bisect_right(reference, 75.0)
+        assert len(grades) == len(reference)
+    assert grades[-1] == reference[-1]
+
+
+def test_sorted_grades_empties_and_refills():
+    grades = SortedGrades(load=2)
+    for value in [3.0, 1.0, 2.0, 5.0, 4.0]:
+        grades.add(value)
+    for value in [1.0, 2.0, 3.0, 4.0, 5.0]:
+        grades.remove(value)
+    assert len(grades) == 0 and list(grades) == []
+    with pytest.raises(IndexError):
+        grades[0]
+    grades.add(7.0)
+    assert grades[0] == 7.0 and grades.bisect_right(7.0) == 1
+
+
+def test_cohort_stats_after_updates_match_numpy():
+    rng = random.Random(1)
+    cohort = CohortStats({f's{i}': rng.uniform(40, 100) for i in range(2000)})
+    for _ in range(1000):
+        cohort.update(f's{rng.randrange(2500)}', round(rng.uniform(40, 100), 1))
+    values = np.array(sorted(cohort.grades.values()))
+    assert len(cohort) == len(values)
+    assert cohort.mean == pytest.approx(values.mean())
+    assert cohort.std == pytest.approx(values.std())
+    assert cohort.quantiles() == pytest.approx(np.quantile(values, [0.25, 0.5, 0.75]).tolist())
+    assert sum(cohort.histogram((0, 60, 70, 80, 90, math.inf))) == len(values)
+    student, grade = next(iter(cohort.grades.items()))
+    assert cohort.rank(student) == int((values > grade).sum()) + 1
+    below, ties = (values < grade).sum(), (values == grade).sum()
+    assert cohort.percentile_rank(grade) == pytest.approx(100 * (below + ties / 2) / len(values))
+    cohort.remove(student)
+    assert len(cohort) == len(values) - 1
@@ -0,0 +1,50 @@
+import csv
+import json
+
+import pytest
+
+from reports import render_reports
+
+ANA = {'homeworks': [100] * 5, 'quizzes': [90] * 4, 'projects': [100] * 4, 'exams': [90, 80],
+       'extra_credit': [100], 'attendance': 1}
+BEN = {'exams': [70, None], 'attendance': 0}
+
+
+def read_csv(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_two_student_report(tmp_path):
+    stats = render_reports([[('ana', ANA), ('ben', BEN)]], str(tmp_path), workers=0)
+    assert stats['students'] == 2 and stats['groups'] == 1
+
+    ana, ben = read_csv(tmp_path / 'report_cards.csv')
+    # 15 + 13.5 + 20 + 0.5 * 85 + 7 - one absence at 0.05 / 5
+    assert float(ana['final_grade']) == pytest.approx(97.99)
+    assert ana['letter'] == 'A' and ana['exams_average'] == '85.0000' and ana['absences'] == '1'
+    assert ben['student'] == 'ben' and float(ben['final_grade']) == pytest.approx(35)
+    assert ben['letter'] == 'F' and ben['exams_completed'] == '1' and ben['homeworks_average'] == ''
+
+    with open(tmp_path / 'report_cards.jsonl') as f:
+        records = [json.loads(line) for line in f]
+    assert [r['student'] for r in records] == ['ana', 'ben']
+    assert records[1]['categories']['homeworks']['average'] is None
+    assert records[1]['categories']['exams'] == {'grades': [70, None], 'average': 70.0, 'weighted': 35.0,
+                                                 'completed': 1, 'count': 2}
+
+    page = (tmp_path / 'html' / 'ana.html').read_text()
+    assert 'Final grade: <strong>97.99%</strong> (A)' in page
+    assert '<td>90, 80</td><td>85.00</td><td>42.50</td><td>2/2</td>' in page
+    assert '&mdash;' in (tmp_path / 'html' / 'ben.html').read_text()
+
+
+def test_repeated_ids_get_their_own_pages(tmp_path):
+    groups = [[('ana', ANA), ('a/b~2', BEN)], [('ana', BEN), ('a/b', ANA)], [('ana', ANA)]]
+    stats = render_reports(groups, str(tmp_path), workers=1)
+    assert stats['students'] == 5
+    assert sorted(p.name for p in (tmp_path / 'html').iterdir()) == [
+        'a%2Fb%7E2.html', 'a%2Fb.html', 'ana.html', 'ana~2.html', 'ana~3.html']
+    assert '(A)' in (tmp_path / 'html' / 'ana.html').read_text()
+    assert '(F)' in (tmp_path / 'html' / 'ana~2.html').read_text()
+    assert [row['student'] for row in read_csv(tmp_path / 'report_cards.csv')] == ['ana', 'a/b~2', 'ana', 'a/b', 'ana']
@@ -0,0 +1,131 @@
+"""The instructor roster's save path, run inside a Streamlit script with ``AppTest``.
+
+``AppTest`` cannot type into an ``st.data_editor`` grid, so the script hands
+``apply_roster_edits`` the ``edited_rows`` the grid would have produced.
+"""
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from changelog import ChangeLog
+from grade_calculator import GradeCalculator
+from storage import GradeStore
+
+SCRIPT = """
+import streamlit as st
+import streamlit_app as app
+
+path, course = {path!r}, 'CS101'
+if 'cohort' not in st.session_state:
+    app.load_cohort(path, course)
+    app.load_roster_page(path, course, 0, 25)
+    st.session_state.before = dict(st.session_state.cohort.grades)
+    st.session_state.edits = {{'edited_rows': {edits!r}}}
+    app.apply_roster_edits(path, course, 'edits')
+"""
+
+STUDENTS = {
+    'ana': {'homeworks': [90, 80, 70, None, None], 'quizzes': [60, 70], 'exams': [75], 'attendance': 0},
+    'ben': {'homeworks': [100, 100], 'projects': [120], 'exams': [90, 95], 'attendance': 2},
+    'cy': {'quizzes': [50], 'extra_credit': [100], 'attendance': 1}
+}
+
+
+@pytest.fixture
+def gradebook(tmp_path, monkeypatch):
+    monkeypatch.delenv('GRADE_LOG', raising=False)
+    path = str(tmp_path / 'grades.db')
+    store = GradeStore(path, GradeCalculator())
+    store.bulk_upsert('CS101', list(STUDENTS.items()))
+    store.close()
+    yield path
+    # The change log is a shared resource keyed only on the course
+    st.cache_resource.clear()
+
+
+def run_edits(path, edits):
+    app = AppTest.from_string(SCRIPT.format(path=path, edits=edits), default_timeout=30).run()
+    assert not app.exception
+    return app
+
+
+def test_edits_are_saved_regraded_and_folded_into_the_cohort(gradebook):
+    # Rows follow the sorted student ids: ana, ben, cy
+    app = run_edits(gradebook, {0: {'Homeworks 4': 95.0, 'Quizzes 1': None}, 2: {'Absences': 4, 'Exams 2': 88.0}})
+    calc = GradeCalculator()
+    store = GradeStore(gradebook, calc)
+    try:
+        ana = store.load_grades('CS101', 'ana')
+        cy = store.load_grades('CS101', 'cy')
+        assert ana['homeworks'] == [90, 80, 70, 95, None]
+        assert ana['quizzes'] == [None, 70, None, None]
+        assert cy['attendance'] == 4 and cy['exams'] == [None, 88]
+        expected = {student: calc.final_grade(store.load_grades('CS101', student)) for student in STUDENTS}
+        # The store's cached grades are recomputed for the edited students
+        assert store.final_grades('CS101') == pytest.approx(expected)
+    finally:
+        store.close()
+
+    cohort = app.session_state.cohort
+    assert cohort.grades == pytest.approx(expected)
+    assert cohort.grades['ben'] == app.session_state.before['ben']
+    assert cohort.grades['ana'] != app.session_state.before['ana']
+    assert cohort.mean == pytest.approx(sum(expected.values()) / 3)
+    assert cohort.rank('ben') == sorted(expected.values(), reverse=True).index(expected['ben']) + 1
+
+    frame = app.session_state.roster_page['frame']
+    assert list(frame['Student']) == ['ana', 'ben', 'cy']
+    assert frame.at[0, 'Final grade'] == pytest.approx(expected['ana'])
+    assert frame.at[2, 'Final grade'] == pytest.approx(expected['cy'])
+    assert frame.at[0, 'Homeworks 4'] == 95.0 and frame.at[2, 'Absences'] == 4
+    assert app.session_state.roster_message == "Saved 2 students"
+
+
+def test_no_edits_change_nothing(gradebook):
+    app = run_edits(gradebook, {})
+    assert app.session_state.cohort.grades == app.session_state.before
+    assert 'roster_message' not in app.session_state
+
+
+def test_edit_history_starts_from_the_saved_grades(gradebook, tmp_path, monkeypatch):
+    monkeypatch.setenv('GRADE_LOG', str(tmp_path / 'log'))
+    run_edits(gradebook, {1: {'Projects 2': 110.0}})
+    store = GradeStore(gradebook)
+    log = ChangeLog(str(tmp_path / 'log' / 'CS101'), GradeCalculator())
+    try:
+        grades, final_grade = log.grades_at('ben')
+        assert grades == store.load_grades('CS101', 'ben')
+        assert grades['projects'][:2] == [120, 110] and grades['exams'] == [90, 95]
+        assert final_grade == pytest.approx(store.final_grade('CS101', 'ben'))
+        assert log.grades_at('ana') is None
+    finally:
+        log.close()
+        store.close()
+
+
+PAGES_SCRIPT = """
+import streamlit as st
+import streamlit_app as app
+
+path, course = {path!r}, 'CS101'
+pages = []
+for page in {pages!r}:
+    app.load_roster_page(path, course, page, 2)
+    pages.append(list(st.session_state.roster_page['frame']['Student']))
+st.session_state.pages = pages
+st.session_state.grades = list(st.session_state.roster_page['frame']['Final grade'])
+"""
+
+
+def test_pages_load_without_the_class_statistics(gradebook):
+    store = GradeStore(gradebook)
+    store.bulk_upsert('CS101', [(name, {'exams': [80]}) for name in ['dee', 'eve', 'fay']])
+    store.close()
+    # Forward, a jump past unseen pages, and back
+    app = AppTest.from_string(PAGES_SCRIPT.format(path=gradebook, pages=[0, 1, 2, 0, 2]), default_timeout=30).run()
+    assert not app.exception
+    assert 'cohort' not in app.session_state
+    assert app.session_state.pages == [['ana', 'ben'], ['cy', 'dee'], ['eve', 'fay'], ['ana', 'ben'], ['eve', 'fay']]
+    assert app.session_state.grades == pytest.approx([GradeCalculator().final_grade({'exams': [80]})] * 2)
+    app = AppTest.from_string(PAGES_SCRIPT.format(path=gradebook, pages=[2, 1]), default_timeout=30).run()
+    assert app.session_state.pages == [['eve', 'fay'], ['cy', 'dee']]
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from grade_calculator import GradeCalculator
+from service import create_app
+
+GRADES = {'homeworks': [89, 83, 62], 'quizzes': [40, 62], 'projects': [120, 127], 'exams': [],
+          'extra_credit': [100], 'attendance': 0}
+
+
+@pytest.fixture
+def client():
+    return create_app(max_bulk_students=3).test_client()
+
+
+def test_grade(client):
+    response = client.post('/grade', json={'grades': GRADES})
+    assert response.status_code == 200
+    expected, breakdown = GradeCalculator().calculate_grade(GRADES)
+    body = response.get_json()
+    assert body['final_grade'] == pytest.approx(expected)
+    assert body['breakdown']['quizzes']['average'] == pytest.approx(breakdown['quizzes']['average'])
+    # The same payload is answered from the cache
+    client.post('/grade', json={'grades': GRADES})
+    assert client.get('/health').get_json()['cache'] == {'entries': 1, 'hits': 1, 'misses': 1}
+
+
+@pytest.mark.parametrize('grades, message', [
+    ({'homeworks': [90, True]}, "homeworks scores must be between"),
+    ({'quizzes': [False]}, "quizzes scores must be between"),
+    ({'attendance': True}, "attendance must be a number"),
+    ({'homeworks': [131]}, "homeworks scores must be between"),
+    ({'homeworks': ['90']}, "homeworks scores must be between"),
+    ({'homeworks': 90}, "homeworks must be a list"),
+    ({'essays': [90]}, "unknown category 'essays'"),
+    ([90], "grades must be an object")
+])
+def test_bad_grades_are_rejected(client, grades, message):
+    response = client.post('/grade', json={'grades': grades})
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
+
+
+def test_needed(client):
+    calc = GradeCalculator()
+    response = client.post('/needed', json={'grades': GRADES, 'targets': [80, 104, 200]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['current_grade'] == pytest.approx(calc.final_grade(GRADES))
+    assert body['targets']['80']['needed_average'] == pytest.approx(67.7619, abs=1e-4)
+    assert body['targets']['104']['needed_average'] == pytest.approx(
+        calc.calculate_needed_grades(GRADES, 104)['needed_average'])
+    assert body['targets']['200']['unreachable']
+
+    for targets in ([80, True], 80, ['80']):
+        response = client.post('/needed', json={'grades': GRADES, 'targets': targets})
+        assert response.status_code == 400
+        assert response.get_json()['error'] == "targets must be a list of numbers"
+    assert client.post('/needed', json={'grades': {'exams': [True]}}).status_code == 400
+
+
+def test_bulk(client):
+    students = [{'id': 'ana', 'grades': GRADES}, {'id': 'ben', 'grades': {'exams': [True]}}, 'cy']
+    response = client.post('/grade/bulk', json=students)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    # Rejected students are reported as they are read; graded ones follow in batches
+    assert lines[0] == {'id': 'ben', 'error': "exams scores must be between 0 and 100"}
+    assert lines[1] == {'id': None, 'error': "each student must be a JSON object"}
+    assert lines[2]['id'] == 'ana'
+    assert lines[2]['final_grade'] == pytest.approx(GradeCalculator().final_grade(GRADES))
+
+
+def test_bulk_ndjson_and_limits(client):
+    body = '\n'.join([json.dumps({'id': 'ana', 'grades': GRADES}), 'not json', ''])
+    response = client.post('/grade/bulk', data=body, content_type='application/x-ndjson')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0] == {'id': None, 'error': "each student must be a JSON object"}
+    assert lines[1]['id'] == 'ana'
+
+    response = client.post('/grade/bulk', json=[{'id': i, 'grades': {}} for i in range(4)])
+    assert response.status_code == 400
+    assert response.get_json()['error'] == "bulk requests are limited to 3 students"
+    response = client.post('/grade/bulk', json={'id': 'ana'})
+    assert response.status_code == 400
+
+    body = '\n'.join(json.dumps({'id': i, 'grades': {}}) for i in range(4))
+    response = client.post('/grade/bulk', data=body, content_type='application/x-ndjson')
+    lines = response.get_data(as_text=True).splitlines()
+    assert json.loads(lines[-1]) == {'error': "bulk requests are limited to 3 students"}
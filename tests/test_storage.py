@@ -0,0 +1,96 @@
+import pytest
+
+from grade_calculator import GradeCalculator, _trim_missing
+from storage import GradeStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = GradeStore(str(tmp_path / 'grades.db'), GradeCalculator())
+    yield store
+    store.close()
+
+
+def test_upsert_writes_and_deletes_positions(store):
+    store.save_grades('CS101', 'ana', {'homeworks': [90, None, 80], 'attendance': 2})
+    store.save_grades('CS101', 'ana', {'homeworks': [None, 70, 80]})
+    grades = store.load_grades('CS101', 'ana')
+    assert grades['homeworks'] == [None, 70, 80, None, None]
+    assert grades['attendance'] == 2
+
+
+def test_shorter_list_removes_the_old_tail(store):
+    store.save_grades('CS101', 'ana', {'homeworks': [90, 85, 80, 75], 'quizzes': [60, 70]})
+    store.save_grades('CS101', 'ana', {'homeworks': [90, 85]})
+    grades = store.load_grades('CS101', 'ana')
+    assert grades['homeworks'] == [90, 85, None, None, None]
+    # Categories left out are not touched
+    assert grades['quizzes'] == [60, 70, None, None]
+
+
+def test_cli_load_and_save_keeps_scores_in_their_slots(store):
+    store.save_grades('CS101', 'ana', {'homeworks': [90, None, 80], 'exams': [None, 95]})
+    loaded = store.load_grades('CS101', 'ana')
+    # As the CLI menu sees them, then saves them back with one more homework
+    grades = {k: _trim_missing(v) if isinstance(v, list) else v for k, v in loaded.items()}
+    assert grades['homeworks'] == [90, None, 80]
+    grades['homeworks'].append(70)
+    store.save_grades('CS101', 'ana', grades)
+    reloaded = store.load_grades('CS101', 'ana')
+    assert reloaded['homeworks'] == [90, None, 80, 70, None]
+    assert reloaded['exams'] == [None, 95]
+    assert store.final_grade('CS101', 'ana') == pytest.approx(GradeCalculator().final_grade(reloaded))
+
+
+def test_load_many_returns_enrolled_students_in_order(store):
+    store.bulk_upsert('CS101', [
+        ('ana', {'homeworks': [90, None, 80], 'extra_credit': [50], 'attendance': 1}),
+        ('ben', {'quizzes': [70], 'attendance': 0}),
+        ('cy', {'exams': [None, 88]})
+    ])
+    store.save_grades('CS102', 'dee', {'homeworks': [100]})
+    loaded = store.load_many('CS101', ['cy', 'dee', 'ana', 'nobody'])
+    assert [student for student, _ in loaded] == ['cy', 'ana']
+    for student, grades in loaded:
+        assert grades == store.load_grades('CS101', student)
+    assert loaded[1][1]['homeworks'] == [90, None, 80, None, None]
+    assert loaded[1][1]['extra_credit'] == [50]
+    assert loaded[1][1]['attendance'] == 1
+    assert loaded[0][1]['exams'] == [None, 88]
+
+
+def test_load_many_handles_empty_and_unknown_lists(store):
+    store.save_grades('CS101', 'ana', {'homeworks': [90]})
+    assert store.load_many('CS101', []) == []
+    assert store.load_many('CS101', ['nobody']) == []
+    # Enrolled with no scores at all
+    store.save_grades('CS101', 'ben', {'attendance': 2})
+    [(student, grades)] = store.load_many('CS101', ['ben'])
+    assert student == 'ben' and grades['attendance'] == 2
+    assert all(value is None for value in grades['homeworks'])
+
+
+def test_student_page_walks_the_course_in_id_order(store):
+    store.bulk_upsert('CS101', [(f's{i:02d}', {'attendance': 0}) for i in range(7, -1, -1)])
+    store.save_grades('CS102', 's03b', {'attendance': 0})
+    assert store.count('CS101') == 8 and store.count('CS102') == 1
+    pages, after = [], None
+    while True:
+        page = store.student_page('CS101', after, 3)
+        if not page:
+            break
+        pages.append(page)
+        after = page[-1]
+    assert pages == [['s00', 's01', 's02'], ['s03', 's04', 's05'], ['s06', 's07']]
+    assert store.student_page('CS101', 's01', 2, skip=3) == ['s05', 's06']
+
+
+def test_final_grades_for_some_students_grades_only_them(store):
+    store.bulk_upsert('CS101', [('ana', {'exams': [90, 80]}), ('ben', {'exams': [70]}), ('cy', {'exams': [60]})])
+    assert store.final_grades('CS101', ['cy', 'ana', 'nobody']) == {
+        'ana': store.calc.final_grade(store.load_grades('CS101', 'ana')),
+        'cy': store.calc.final_grade(store.load_grades('CS101', 'cy'))
+    }
+    stale = store.conn.execute('SELECT COUNT(*) FROM enrollments WHERE final_grade IS NULL').fetchone()[0]
+    assert stale == 1
+    assert store.final_grades('CS101', []) == {}
@@ -0,0 +1,48 @@
+import json
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from changelog import ChangeLog
+from grade_calculator import GradeCalculator
+from storage import GradeStore
+from test_grade_calculator import LABS_POLICY
+
+
+def test_inputs_follow_the_policy_categories(tmp_path, monkeypatch):
+    path = tmp_path / 'labs.json'
+    path.write_text(json.dumps(LABS_POLICY))
+    monkeypatch.setenv('GRADE_POLICY', str(path))
+    app = AppTest.from_file('../streamlit_app.py', default_timeout=30).run()
+    assert not app.exception
+    assert [w.key for w in app.number_input] == ['labs_0', 'labs_1', 'labs_2', 'exam_0', 'exam_1', 'ec', 'attendance']
+    assert app.number_input(key='labs_0').max == 120
+    app.number_input(key='labs_1').set_value(90.0).run()
+    assert not app.exception
+    assert app.session_state.grades['labs'] == [None, 90.0, None]
+
+
+LOAD_SCRIPT = """
+import streamlit_app as app
+
+for _ in range(3):
+    app.load_grades({path!r}, 'CS101', 'ana')
+"""
+
+
+def test_loading_again_does_not_relog_the_grades(tmp_path, monkeypatch):
+    monkeypatch.setenv('GRADE_LOG', str(tmp_path / 'log'))
+    path = str(tmp_path / 'grades.db')
+    store = GradeStore(path, GradeCalculator())
+    store.save_grades('CS101', 'ana', {'homeworks': [90, 80], 'exams': [75], 'attendance': 1})
+    store.close()
+    try:
+        app = AppTest.from_string(LOAD_SCRIPT.format(path=path), default_timeout=30).run()
+        assert not app.exception
+    finally:
+        st.cache_resource.clear()
+    with ChangeLog(str(tmp_path / 'log' / 'CS101'), GradeCalculator()) as log:
+        # One event per slot plus one for absences, from the first load only
+        assert log.n_events == log.n_slots + 1
+        grades, _ = log.grades_at('ana')
+        assert grades['homeworks'][:3] == [90, 80, None] and grades['attendance'] == 1